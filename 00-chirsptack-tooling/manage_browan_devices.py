@@ -7,17 +7,35 @@ Manage Browan Device Profiles in ChirpStack
 """
 
 import os
+import re
 import sys
+import json
+import functools
+import itertools
+import tempfile
+import threading
 import yaml
 import grpc
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import dotenv_values
 from chirpstack_api import api
 from chirpstack_api import common
 
+# Prefer the libyaml C parser when available
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
 # Configuration
 BROWAN_REPO = "/opt/browan-lorawan-devices/vendor/browan"
+# Parsed-YAML cache, kept out of the vendor checkout
+CACHE_DIR = Path(os.getenv("BROWAN_CACHE_DIR", Path.home() / ".cache" / "manage_browan_devices"))
 CHIRPSTACK_SERVER = "localhost:8080"
 DEFAULT_REGION = "EU863-870"
+CHANNEL_POOL_SIZE = 4
+MAX_WORKERS = 16
 
 # Region mapping
 REGION_MAP = {
@@ -51,38 +69,259 @@ REG_PARAMS_MAP = {
     "RP001-1.1-RevB": common.RegParamsRevision.B,
 }
 
+class ChannelPool:
+    """Round-robin pool of gRPC channels to the ChirpStack server"""
+
+    def __init__(self, target, size=CHANNEL_POOL_SIZE):
+        self.channels = [grpc.insecure_channel(target) for _ in range(size)]
+        # Stubs are built once per channel and shared across calls
+        self.profile_stubs = [api.DeviceProfileServiceStub(c) for c in self.channels]
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def _next_index(self):
+        with self._lock:
+            return next(self._counter) % len(self.channels)
+
+    def next(self):
+        return self.channels[self._next_index()]
+
+    def next_profile_stub(self):
+        return self.profile_stubs[self._next_index()]
+
+    def close(self):
+        for channel in self.channels:
+            channel.close()
+
+@functools.lru_cache(maxsize=1)
 def load_env():
     """Load API key from .env if available"""
     env_file = "/opt/iot-platform/00-chirsptack-tooling/.env"
     if os.path.exists(env_file):
-        with open(env_file) as f:
-            for line in f:
-                if line.startswith('CHIRPSTACK_API_KEY='):
-                    return line.split('=', 1)[1].strip()
+        return dotenv_values(env_file).get('CHIRPSTACK_API_KEY')
     return None
 
+# Name fragments of non-device YAML files (profiles, codecs, index)
+_SKIP = re.compile(r'-profile|-codec|index')
+
 def get_device_files():
     """Get all Browan device definition files"""
-    devices = []
-    for f in Path(BROWAN_REPO).glob("*.yaml"):
-        # Skip profile, codec, and index files
-        if not any(x in f.name for x in ['-profile', '-codec', 'index']):
-            devices.append(f)
-    return devices
-
-def load_codec(codec_file):
-    """Load JavaScript codec from file"""
+    with os.scandir(BROWAN_REPO) as it:
+        return [
+            Path(e.path) for e in it
+            if e.name.endswith('.yaml') and not _SKIP.search(e.name)
+        ]
+
+# Bumped whenever the fast path changes what it returns, so .v<N>.json
+# caches written by an older parser are not reused
+_CACHE_VERSION = 3
+
+# Regex fast path for the handful of fields read from Browan YAML files.
+# Anything it cannot read unambiguously falls back to the YAML parser.
+# test_browan_fast_path.py checks it against yaml.load.
+_TOP_LEVEL_RE = re.compile(r'^([A-Za-z]\w*):[ \t]*(.*?)[ \t]*$', re.M)
+_NESTED_RE = re.compile(r'^( *)(?:- +)?([\w.-]+):[ \t]*(.*?)[ \t]*$')
+_BOOLEANS = {'true': True, 'True': True, 'false': False, 'False': False}
+_RESOLVER = yaml.resolver.Resolver()
+_STR_TAG = 'tag:yaml.org,2002:str'
+
+def _scalar(raw):
+    """Plain or quoted single-line string scalar, or None if it needs a real parser"""
+    if raw is None:
+        return None
+    if raw[:1] in ('"', "'"):
+        quote = raw[0]
+        if len(raw) < 2 or raw[-1] != quote or quote in raw[1:-1] or '\\' in raw:
+            return None
+        return raw[1:-1]
+    raw = raw.split(' #', 1)[0].rstrip()
+    if not raw or raw[0] in '|>[{&*!%@`#' or '\t#' in raw:
+        return None
+    # Unquoted 1.1, yes, null, 42 ... are not strings to YAML
+    if _RESOLVER.resolve(yaml.ScalarNode, raw, (True, False)) != _STR_TAG:
+        return None
+    return raw
+
+def _continues(lines, i, column):
+    """True if the next non-blank line after lines[i] is indented past `column`,
+    i.e. the value on lines[i] is a multi-line scalar the fast path can't fold"""
+    for line in itertools.islice(lines, i + 1, None):
+        if line.strip():
+            return len(line) - len(line.lstrip()) > column
+    return False
+
+def _top_level_fields(text, keys):
+    """Raw values of top-level `key: value` lines; None for multi-line or repeated keys"""
+    lines = text.splitlines()
+    fields = {}
+    for i, line in enumerate(lines):
+        match = _TOP_LEVEL_RE.match(line)
+        if not match:
+            continue
+        key, raw = match.groups()
+        if key in keys:
+            repeated = key in fields
+            fields[key] = None if repeated or (raw and _continues(lines, i, 0)) else raw
+    return fields
+
+def _parse_browan_device(text):
+    fields = _top_level_fields(text, ('name', 'description'))
+    name = _scalar(fields.get('name', ''))
+    if name is None:
+        return None
+    data = {'name': name}
+    if 'description' in fields:
+        description = _scalar(fields['description'])
+        if description is None:
+            return None
+        data['description'] = description
+
+    # Walk the `profiles:` block of firmwareVersions[0] by indentation:
+    # region keys at one level, their id/codec exactly one level below
+    profiles = {}
+    in_versions = False
+    item_indent = block_indent = region_indent = field_indent = None
+    region = None
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        match = _NESTED_RE.match(line)
+        if block_indent is None:
+            if not in_versions:
+                in_versions = line.rstrip() == 'firmwareVersions:'
+                continue
+            if not line.startswith(' ') and not line.startswith('-'):
+                return None  # left firmwareVersions without finding profiles
+            if line.lstrip().startswith('-'):
+                dash = len(line) - len(line.lstrip(' '))
+                if item_indent is None:
+                    item_indent = dash
+                elif dash == item_indent:
+                    return None  # firmwareVersions[0] has no profiles
+            if match and match.group(2) == 'profiles' and not match.group(3):
+                block_indent = len(match.group(1))
+            continue
+        indent = len(line) - len(line.lstrip(' '))
+        if indent <= block_indent:
+            break
+        if field_indent is not None and indent > field_indent:
+            # Deeper than id/codec: not read
+            continue
+        if not match or line.lstrip().startswith('-'):
+            return None
+        key, raw = match.group(2), match.group(3)
+        if region_indent is None:
+            region_indent = indent
+        if indent == region_indent:
+            if raw or _scalar(key) != key:
+                return None
+            region = profiles[key] = {}
+            field_indent = None
+            continue
+        if indent < region_indent:
+            return None
+        if field_indent is None:
+            field_indent = indent
+        elif indent < field_indent:
+            return None
+        if key not in ('id', 'codec'):
+            continue
+        if _continues(lines, i, indent):
+            return None
+        value = _scalar(raw)
+        if value is None:
+            return None
+        region[key] = value
+
+    if not profiles or not all('id' in p for p in profiles.values()):
+        return None
+    data['firmwareVersions'] = [{'profiles': profiles}]
+    return data
+
+def _parse_browan_profile(text):
+    keys = ('macVersion', 'regionalParametersVersion', 'supportsJoin', 'supportsClassB', 'supportsClassC')
+    fields = _top_level_fields(text, keys)
+    if 'macVersion' not in fields or 'regionalParametersVersion' not in fields:
+        return None
+    data = {}
+    for key, raw in fields.items():
+        if key.startswith('supports'):
+            if raw not in _BOOLEANS:
+                return None
+            data[key] = _BOOLEANS[raw]
+            continue
+        value = _scalar(raw)
+        if value is None:
+            return None
+        data[key] = value
+    return data
+
+def _str_keys_only(data):
+    """True if every mapping key is a str, i.e. a JSON round trip returns the same data"""
+    if isinstance(data, dict):
+        return all(isinstance(k, str) and _str_keys_only(v) for k, v in data.items())
+    if isinstance(data, list):
+        return all(_str_keys_only(v) for v in data)
+    return True
+
+def _load_yaml_cached(path, fast_parse=None):
+    """Load a YAML file, reusing a <name>.v<N>.json cache in CACHE_DIR while it is fresh"""
+    path = Path(path)
+    cache = CACHE_DIR / f'{path.name}.v{_CACHE_VERSION}.json'
+    if cache.exists() and os.path.getmtime(cache) >= os.path.getmtime(path):
+        with open(cache, 'r') as f:
+            return json.load(f)
+
+    with open(path, 'r') as f:
+        text = f.read()
+    data = fast_parse(text) if fast_parse else None
+    if data is None:
+        data = yaml.load(text, Loader=_Loader)
+
+    # JSON would turn int/bool keys into strings; don't cache what won't round-trip
+    if not _str_keys_only(data):
+        return data
+
+    tmp = None
+    try:
+        encoded = json.dumps(data)
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent imports never see a partial cache
+        with tempfile.NamedTemporaryFile('w', dir=CACHE_DIR, delete=False) as f:
+            tmp = f.name
+            f.write(encoded)
+        os.replace(tmp, cache)
+    except (OSError, TypeError):
+        # Unwritable cache dir or non-JSON types: just skip the cache
+        if tmp:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+    return data
+
+@functools.lru_cache(maxsize=None)
+def _load_profile_yaml(profile_id):
+    """Load a profile YAML once; many devices share the same profile"""
+    return _load_yaml_cached(Path(BROWAN_REPO) / f"{profile_id}.yaml", _parse_browan_profile)
+
+@functools.lru_cache(maxsize=None)
+def _load_codec_cached(codec_file):
     if os.path.exists(codec_file):
         with open(codec_file, 'r') as f:
             return f.read()
     return None
 
-def create_device_profile(channel, auth_token, tenant_id, device_info, region, add_prefix=True):
+def load_codec(codec_file):
+    """Load JavaScript codec from file"""
+    return _load_codec_cached(str(codec_file))
+
+def create_device_profile(client, auth_token, tenant_id, device_info, region, add_prefix=True):
     """Create a device profile in ChirpStack"""
 
     # Load device YAML
-    with open(device_info['yaml_file'], 'r') as f:
-        device_data = yaml.safe_load(f)
+    device_data = _load_yaml_cached(device_info['yaml_file'], _parse_browan_device)
 
     # Get profile for region
     firmware = device_data['firmwareVersions'][0]
@@ -92,10 +331,8 @@ def create_device_profile(channel, auth_token, tenant_id, device_info, region, a
     profile_data = firmware['profiles'][region]
     profile_id = profile_data['id']
 
-    # Load profile YAML
-    profile_file = Path(BROWAN_REPO) / f"{profile_id}.yaml"
-    with open(profile_file, 'r') as f:
-        profile_yaml = yaml.safe_load(f)
+    # Load profile YAML (memoized per profile_id)
+    profile_yaml = _load_profile_yaml(profile_id)
 
     # Load codec JavaScript
     codec_name = profile_data.get('codec')
@@ -105,7 +342,6 @@ def create_device_profile(channel, auth_token, tenant_id, device_info, region, a
         codec_js = load_codec(codec_file) or ""
 
     # Create device profile
-    client = api.DeviceProfileServiceStub(channel)
     req = api.CreateDeviceProfileRequest()
 
     # Add Browan prefix if requested
@@ -117,8 +353,8 @@ def create_device_profile(channel, auth_token, tenant_id, device_info, region, a
     req.device_profile.name = profile_name
     req.device_profile.description = device_data.get('description', '')
     req.device_profile.region = REGION_MAP.get(region, "EU868")
-    req.device_profile.mac_version = MAC_VERSION_MAP.get(profile_yaml['macVersion'], common.MacVersion.LORAWAN_1_0_3)
-    req.device_profile.reg_params_revision = REG_PARAMS_MAP.get(profile_yaml['regionalParametersVersion'], common.RegParamsRevision.A)
+    req.device_profile.mac_version = MAC_VERSION_MAP.get(str(profile_yaml['macVersion']), common.MacVersion.LORAWAN_1_0_3)
+    req.device_profile.reg_params_revision = REG_PARAMS_MAP.get(str(profile_yaml['regionalParametersVersion']), common.RegParamsRevision.A)
     req.device_profile.supports_otaa = profile_yaml.get('supportsJoin', True)
     req.device_profile.supports_class_b = profile_yaml.get('supportsClassB', False)
     req.device_profile.supports_class_c = profile_yaml.get('supportsClassC', False)
@@ -143,9 +379,8 @@ def create_device_profile(channel, auth_token, tenant_id, device_info, region, a
         else:
             return {'error': str(e), 'name': profile_name}
 
-def list_profiles(channel, auth_token, tenant_id):
+def list_profiles(profile_client, auth_token, tenant_id):
     """List all Browan device profiles"""
-    profile_client = api.DeviceProfileServiceStub(channel)
     req = api.ListDeviceProfilesRequest()
     req.tenant_id = tenant_id
     req.limit = 100
@@ -154,25 +389,37 @@ def list_profiles(channel, auth_token, tenant_id):
     browan_profiles = [p for p in resp.result if 'browan' in p.name.lower()]
     return browan_profiles
 
-def delete_profiles(channel, auth_token, tenant_id):
+def delete_profile(profile_client, auth_token, profile):
+    """Delete a single device profile"""
+    req = api.DeleteDeviceProfileRequest()
+    req.id = profile.id
+    try:
+        profile_client.Delete(req, metadata=auth_token)
+        return {'success': True, 'name': profile.name}
+    except Exception as e:
+        return {'error': str(e), 'name': profile.name}
+
+def delete_profiles(pool, auth_token, tenant_id, max_workers=MAX_WORKERS):
     """Delete all Browan device profiles"""
-    profile_client = api.DeviceProfileServiceStub(channel)
-    profiles = list_profiles(channel, auth_token, tenant_id)
+    profiles = list_profiles(pool.next_profile_stub(), auth_token, tenant_id)
 
     deleted = 0
-    for profile in profiles:
-        req = api.DeleteDeviceProfileRequest()
-        req.id = profile.id
-        try:
-            profile_client.Delete(req, metadata=auth_token)
-            print(f"  ✓ Deleted: {profile.name}")
-            deleted += 1
-        except Exception as e:
-            print(f"  ✗ Error deleting {profile.name}: {e}")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(delete_profile, pool.next_profile_stub(), auth_token, profile)
+            for profile in profiles
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            if result.get('success'):
+                print(f"  ✓ Deleted: {result['name']}")
+                deleted += 1
+            else:
+                print(f"  ✗ Error deleting {result['name']}: {result['error']}")
 
     return deleted
 
-def import_profiles(channel, auth_token, tenant_id, region, add_prefix=True):
+def import_profiles(pool, auth_token, tenant_id, region, add_prefix=True, max_workers=MAX_WORKERS):
     """Import all Browan device profiles"""
     device_files = get_device_files()
     print(f"Found {len(device_files)} Browan devices")
@@ -182,32 +429,40 @@ def import_profiles(channel, auth_token, tenant_id, region, add_prefix=True):
     skipped = 0
     errors = 0
 
-    for device_file in sorted(device_files):
-        device_name = device_file.stem.replace('-', ' ').title()
-        print(f"Processing: {device_name}")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                create_device_profile,
+                pool.next_profile_stub(),
+                auth_token,
+                tenant_id,
+                {'yaml_file': device_file},
+                region,
+                add_prefix
+            ): device_file.stem.replace('-', ' ').title()
+            for device_file in sorted(device_files)
+        }
 
-        result = create_device_profile(
-            channel,
-            auth_token,
-            tenant_id,
-            {'yaml_file': device_file},
-            region,
-            add_prefix
-        )
+        for future in as_completed(futures):
+            device_name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'error': str(e)}
 
-        if result.get('skipped'):
-            print(f"  ⚠ Region {region} not supported, skipping")
-            skipped += 1
-        elif 'error' in result:
-            if result['error'] == 'exists':
-                print(f"  ✓ Already exists")
+            if result.get('skipped'):
+                print(f"{device_name}: ⚠ Region {region} not supported, skipping")
                 skipped += 1
-            else:
-                print(f"  ✗ Error: {result['error']}")
-                errors += 1
-        elif result.get('success'):
-            print(f"  ✓ Created: {result['name']} (ID: {result['id']})")
-            created += 1
+            elif 'error' in result:
+                if result['error'] == 'exists':
+                    print(f"{device_name}: ✓ Already exists")
+                    skipped += 1
+                else:
+                    print(f"{device_name}: ✗ Error: {result['error']}")
+                    errors += 1
+            elif result.get('success'):
+                print(f"{device_name}: ✓ Created: {result['name']} (ID: {result['id']})")
+                created += 1
 
     return created, skipped, errors
 
@@ -219,6 +474,7 @@ def main():
     parser.add_argument('--api-key', help='ChirpStack API key (or set in .env)')
     parser.add_argument('--region', default=DEFAULT_REGION, help=f'LoRaWAN region (default: {DEFAULT_REGION})')
     parser.add_argument('--no-prefix', action='store_true', help='Do not add "Browan" prefix to device names')
+    parser.add_argument('--serial', action='store_true', help='Use a single channel and worker (for debugging)')
 
     args = parser.parse_args()
 
@@ -231,11 +487,14 @@ def main():
         sys.exit(1)
 
     # Connect to ChirpStack
-    channel = grpc.insecure_channel(CHIRPSTACK_SERVER)
+    if args.serial:
+        pool, max_workers = ChannelPool(CHIRPSTACK_SERVER, size=1), 1
+    else:
+        pool, max_workers = ChannelPool(CHIRPSTACK_SERVER), MAX_WORKERS
     auth_token = [("authorization", f"Bearer {api_key}")]
 
     # Get tenant ID
-    tenant_client = api.TenantServiceStub(channel)
+    tenant_client = api.TenantServiceStub(pool.next())
     req = api.ListTenantsRequest()
     req.limit = 1
     resp = tenant_client.List(req, metadata=auth_token)
@@ -251,11 +510,12 @@ def main():
         print(f"Region: {args.region} → {REGION_MAP.get(args.region, args.region)}")
         print()
         created, skipped, errors = import_profiles(
-            channel,
+            pool,
             auth_token,
             tenant_id,
             args.region,
-            not args.no_prefix
+            not args.no_prefix,
+            max_workers
         )
         print()
         print("=" * 50)
@@ -267,7 +527,7 @@ def main():
         print(f"View at: https://chirpstack.sensemy.cloud")
 
     elif args.action == 'list':
-        profiles = list_profiles(channel, auth_token, tenant_id)
+        profiles = list_profiles(pool.next_profile_stub(), auth_token, tenant_id)
         print()
         print(f"Found {len(profiles)} Browan device profiles:")
         for p in profiles:
@@ -277,11 +537,13 @@ def main():
         print()
         confirm = input("Are you sure you want to delete all Browan profiles? (yes/no): ")
         if confirm.lower() == 'yes':
-            deleted = delete_profiles(channel, auth_token, tenant_id)
+            deleted = delete_profiles(pool, auth_token, tenant_id, max_workers)
             print()
             print(f"Deleted {deleted} device profiles")
         else:
             print("Cancelled")
 
+    pool.close()
+
 if __name__ == "__main__":
     main()
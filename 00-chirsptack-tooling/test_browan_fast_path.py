@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Browan YAML fast path parity test
+
+Checks that the regex fast path in manage_browan_devices.py returns the same
+fields as yaml.load for representative device and profile files, and that it
+falls back (returns None) whenever it cannot be sure.
+
+Run directly or with pytest:
+    ./test_browan_fast_path.py
+"""
+
+import yaml
+from manage_browan_devices import _Loader, _parse_browan_device, _parse_browan_profile
+
+DEVICE_YAML = """\
+name: Door/Window Sensor
+description: 'TBDW100 door & window sensor: open/close, temperature'
+
+# Hardware versions (optional)
+hardwareVersions:
+  - version: '1.0'
+    numeric: 1
+
+firmwareVersions:
+  - version: '1.0.3'
+    numeric: 1
+    hardwareVersions:
+      - '1.0'
+    profiles:
+      EU863-870:
+        id: tbdw100-profile
+        lorawanCertified: true
+        codec: tbdw100-codec
+      US902-928:
+        id: tbdw100-profile-us915
+        # codec shared with EU
+        codec: tbdw100-codec
+        regional:
+          id: not-this-one
+          codec: nor-this-one
+  - version: '1.0.2'
+    profiles:
+      EU863-870:
+        id: old-profile
+        codec: old-codec
+
+sensors:
+  - temperature
+  - door
+"""
+
+PROFILE_YAML = """\
+supportsClassB: false
+supportsClassC: false
+macVersion: '1.0.3'
+regionalParametersVersion: 'RP001-1.0.2-RevB'
+supportsJoin: true
+maxEIRP: 16
+supports32bitFCnt: true
+"""
+
+# Files the fast path must hand to the YAML parser
+DEVICE_FALLBACKS = [
+    # Multi-line plain scalar
+    DEVICE_YAML.replace("description: 'TBDW100 door & window sensor: open/close, temperature'",
+                        "description: TBDW100 door & window\n  sensor"),
+    # Block scalar
+    DEVICE_YAML.replace("description: 'TBDW100 door & window sensor: open/close, temperature'",
+                        "description: >\n  folded text"),
+    # Not a string to YAML
+    DEVICE_YAML.replace("name: Door/Window Sensor", "name: yes"),
+    DEVICE_YAML.replace("id: tbdw100-profile\n", "id: 100\n"),
+    # Repeated top-level key (YAML keeps the last one)
+    DEVICE_YAML.replace("name: Door/Window Sensor", "name: First\nname: Second"),
+    # Continued id
+    DEVICE_YAML.replace("id: tbdw100-profile\n", "id: tbdw100\n          -profile\n"),
+    # firmwareVersions[0] without profiles
+    DEVICE_YAML.replace("    hardwareVersions:\n      - '1.0'\n    profiles:", "    other:"),
+]
+
+PROFILE_FALLBACKS = [
+    PROFILE_YAML.replace("macVersion: '1.0.3'", "macVersion: 1.1"),
+    PROFILE_YAML.replace("supportsJoin: true", "supportsJoin: yes"),
+    PROFILE_YAML.replace("supportsJoin: true", "supportsJoin: true # OTAA"),
+]
+
+def _device_fields(data):
+    """The part of a full YAML load that the fast path returns"""
+    fields = {'name': data['name']}
+    if 'description' in data:
+        fields['description'] = data['description']
+    fields['firmwareVersions'] = [{'profiles': {
+        region: {k: v for k, v in profile.items() if k in ('id', 'codec')}
+        for region, profile in data['firmwareVersions'][0]['profiles'].items()
+    }}]
+    return fields
+
+def _profile_fields(data):
+    keys = ('macVersion', 'regionalParametersVersion', 'supportsJoin', 'supportsClassB', 'supportsClassC')
+    return {k: data[k] for k in keys if k in data}
+
+def _check_parity(text, fast_parse, project):
+    fast = fast_parse(text)
+    if fast is not None:
+        assert fast == project(yaml.load(text, Loader=_Loader)), text
+    return fast
+
+def test_device_fast_path_matches_yaml():
+    fast = _check_parity(DEVICE_YAML, _parse_browan_device, _device_fields)
+    assert fast is not None
+    assert fast['firmwareVersions'][0]['profiles']['US902-928'] == {
+        'id': 'tbdw100-profile-us915', 'codec': 'tbdw100-codec'
+    }
+
+def test_device_fallbacks():
+    for text in DEVICE_FALLBACKS:
+        assert _check_parity(text, _parse_browan_device, _device_fields) is None, text
+
+def test_profile_fast_path_matches_yaml():
+    assert _check_parity(PROFILE_YAML, _parse_browan_profile, _profile_fields) is not None
+
+def test_profile_fallbacks():
+    for text in PROFILE_FALLBACKS:
+        assert _check_parity(text, _parse_browan_profile, _profile_fields) is None, text
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
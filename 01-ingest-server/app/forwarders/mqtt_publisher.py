@@ -1,20 +1,47 @@
-"""mqtt_publisher.py - Publish uplinks to MQTT broker"""
+"""mqtt_publisher.py - Publish uplinks to MQTT broker
+
+Publishes are handed to a single background thread through a SimpleQueue, so
+request handlers never serialize or wait on the paho client lock.
+"""
 import json
 import logging
+import queue
+import threading
 import paho.mqtt.client as mqtt
 import os
 
+try:
+    import orjson
+
+    def _dumps(payload: dict) -> bytes:
+        return orjson.dumps(payload, option=orjson.OPT_UTC_Z)
+except ImportError:
+    def _dumps(payload: dict) -> bytes:
+        return json.dumps(payload, separators=(",", ":")).encode()
+
 logger = logging.getLogger(__name__)
 
 MQTT_BROKER = os.getenv("MQTT_BROKER", "10.44.1.110")
 MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
 
-# Global MQTT client
+# Global MQTT client (only used from the publisher thread)
 mqtt_client = None
 
+_publish_queue = queue.SimpleQueue()
+_publisher_thread = None
+
+def _publisher_loop():
+    while True:
+        topic, payload = _publish_queue.get()
+        try:
+            mqtt_client.publish(topic, _dumps(payload), qos=0)
+            logger.info(f"📡 Published to MQTT: {topic}")
+        except Exception as e:
+            logger.error(f"❌ MQTT publish failed: {e}")
+
 def init_mqtt():
     """Initialize MQTT client connection"""
-    global mqtt_client
+    global mqtt_client, _publisher_thread
     logger.info(f"🔄 Attempting MQTT connection to {MQTT_BROKER}:{MQTT_PORT}...")
     try:
         mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
@@ -24,21 +51,17 @@ def init_mqtt():
     except Exception as e:
         logger.error(f"❌ Failed to connect to MQTT broker: {e}", exc_info=True)
         mqtt_client = None
+        return
 
-def publish_to_mqtt(app_id: str, dev_eui: str, event_type: str, payload: dict):
-    """Publish message to MQTT topic matching ChirpStack format"""
-    global mqtt_client
+    if _publisher_thread is None:
+        _publisher_thread = threading.Thread(target=_publisher_loop, name="mqtt-publisher", daemon=True)
+        _publisher_thread.start()
 
+def publish_to_mqtt(app_id: str, dev_eui: str, event_type: str, payload: dict):
+    """Queue message for the MQTT topic matching ChirpStack format"""
     if not mqtt_client:
         logger.warning("⚠️ MQTT client not initialized, skipping publish")
         return
 
-    try:
-        topic = f"application/{app_id}/device/{dev_eui}/event/{event_type}"
-        message = json.dumps(payload)
-
-        mqtt_client.publish(topic, message, qos=0)
-        logger.info(f"📡 Published to MQTT: {topic}")
-
-    except Exception as e:
-        logger.error(f"❌ MQTT publish failed: {e}")
+    topic = f"application/{app_id}/device/{dev_eui}/event/{event_type}"
+    _publish_queue.put((topic, payload))
@@ -1,6 +1,7 @@
 # forwarders/transform_forwarder.py
-# Version: 0.1.1 - 2025-07-19 18:45 UTC
+# Version: 0.2.0 - 2026-10-15 09:00 UTC
 # - Remaps "ingest_id" → "ingest_uplink_id" before sending to transform
+# - Reuses one module-level AsyncClient (keep-alive pool) instead of one per uplink
 
 import os
 import httpx
@@ -13,19 +14,36 @@ TRANSFORM_URL = os.getenv(
     "http://transform-service:9001/process-uplink/uplink"
 )
 
+_client: httpx.AsyncClient | None = None
+
+async def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=5.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
 async def forward_to_transform(payload: dict):
     try:
         # 🔁 Map ingest_id → ingest_uplink_id for transform
         if "ingest_id" in payload:
             payload["ingest_uplink_id"] = payload.pop("ingest_id")
 
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.post(
-                TRANSFORM_URL,
-                headers={"Content-Type": "application/json"},
-                json=payload
-            )
-            logger.info(f"✅ Transform response: {resp.status_code} {resp.text}")
+        client = await get_client()
+        resp = await client.post(
+            TRANSFORM_URL,
+            headers={"Content-Type": "application/json"},
+            json=payload
+        )
+        logger.info(f"✅ Transform response: {resp.status_code} {resp.text}")
     except Exception as e:
         logger.error(f"❌ Error forwarding to Transform: {e}", exc_info=True)
         raise
@@ -1,24 +1,24 @@
 """main.py - Ingest Server Entry (Actility + Netmore + TTI + ChirpStack Support + MQTT)
-Version: 0.9.0 - 2025-10-06 21:05 UTC
+Version: 0.10.1 - 2026-10-15 09:00 UTC
 Changelog:
+- /uplink/batch: capped batch size, bounded forward concurrency, uplink_ids pre-allocated per row
+- /uplink/batch: malformed JSON or a non-list "uplinks" is a 400
 - Added MQTT publishing capability for ChirpStack integration
 - Publishes to application/{app_id}/device/{dev_eui}/event/up topic
+- Added POST /uplink/batch: one multi-row INSERT per batch (used by replay tools)
 """
 
 # [unchanged import block]
 from fastapi import FastAPI, HTTPException, Request
-import os, json, logging
+import os, json, logging, asyncio
 from datetime import datetime, timedelta
 import psycopg2
+from psycopg2.extras import execute_values
 from fastapi.middleware.cors import CORSMiddleware
-from dateutil.parser import isoparse
 
-from forwarders.transform_forwarder import forward_to_transform
+from forwarders.transform_forwarder import forward_to_transform, close_client
 from forwarders.mqtt_publisher import init_mqtt, publish_to_mqtt
-from parsers.actility_parser import parse_actility
-from parsers.netmore_parser import parse_netmore
-from parsers.tti_parser import parse_tti
-from parsers.chirpstack_parser import parse_chirpstack
+from parsers import PARSERS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -39,6 +39,12 @@ DB_PASS = os.getenv("INGEST_DB_PASSWORD", "secret")
 # ChirpStack application ID (for MQTT topic)
 CHIRPSTACK_APP_ID = os.getenv("CHIRPSTACK_APP_ID", "345b028b-9f0a-4c56-910c-6a05dc2dc22f")
 
+# /uplink/batch limits: rows per request, and forwards in flight across all
+# requests (kept well under the forwarder's 100-connection pool)
+MAX_BATCH_SIZE = int(os.getenv("INGEST_MAX_BATCH_SIZE", "500"))
+MAX_FORWARD_CONCURRENCY = int(os.getenv("INGEST_MAX_FORWARD_CONCURRENCY", "32"))
+_forward_sem = asyncio.Semaphore(MAX_FORWARD_CONCURRENCY)
+
 # Initialize MQTT on module load
 init_mqtt()
 
@@ -48,6 +54,64 @@ def get_conn():
         dbname=DB_NAME, user=DB_USER, password=DB_PASS
     )
 
+def detect_source(payload) -> str:
+    """Auto-detect LNS type from the payload shape"""
+    if isinstance(payload, dict):
+        if "DevEUI_uplink" in payload:
+            return "actility"
+        elif "end_device_ids" in payload:
+            return "tti"
+        elif "deviceInfo" in payload and "rxInfo" in payload:
+            return "chirpstack"
+    elif isinstance(payload, list):
+        if payload and isinstance(payload[0], dict) and "devEui" in payload[0]:
+            return "netmore"
+    return ""
+
+def parse_uplink(source: str, payload):
+    """Normalize uplink using correct parser"""
+    parser = PARSERS.get("actility" if source.startswith("actility") else source)
+    if parser is None:
+        logger.error(f"🚫 Unknown or unsupported source: {source}")
+        raise ValueError(f"Unknown or unsupported source: {source}")
+
+    # Netmore posts an array; only the first uplink is handled
+    if source == "netmore":
+        if type(payload) is list and payload:
+            payload = payload[0]
+        else:
+            raise ValueError("Expected array of Netmore payloads")
+
+    uplink_data = parser(payload)
+    if not uplink_data.deveui:
+        raise ValueError("Missing DevEUI in parsed payload")
+    return uplink_data
+
+def publish_chirpstack_uplink(uplink_data, ingest_id):
+    mqtt_payload = {
+        "applicationID": CHIRPSTACK_APP_ID,
+        "devEUI": uplink_data.deveui,
+        "fPort": uplink_data.fport,
+        "data": uplink_data.payload,
+        "receivedAt": uplink_data.received_at.isoformat(),
+        "metadata": uplink_data.uplink_metadata,
+        "gatewayEUI": uplink_data.gateway_eui,
+        "ingestId": ingest_id
+    }
+    publish_to_mqtt(CHIRPSTACK_APP_ID, uplink_data.deveui, "up", mqtt_payload)
+
+def build_forward_payload(uplink_data, source, ingest_id) -> dict:
+    return {
+        "deveui": uplink_data.deveui,
+        "received_at": uplink_data.received_at.isoformat(),
+        "fport": uplink_data.fport,
+        "payload": uplink_data.payload,
+        "uplink_metadata": uplink_data.uplink_metadata,
+        "source": source,
+        "ingest_id": ingest_id,
+        "gateway_eui": uplink_data.gateway_eui,
+    }
+
 @app.post("/uplink")
 async def receive_uplink(req: Request):
     try:
@@ -58,41 +122,14 @@ async def receive_uplink(req: Request):
 
         payload = json.loads(body.decode("utf-8")) if body else {}
 
-        # Auto-detect LNS type
         if not source:
-            if isinstance(payload, dict):
-                if "DevEUI_uplink" in payload:
-                    source = "actility"
-                elif "end_device_ids" in payload:
-                    source = "tti"
-                elif "deviceInfo" in payload and "rxInfo" in payload:
-                    source = "chirpstack"
-            elif isinstance(payload, list):
-                if payload and isinstance(payload[0], dict) and "devEui" in payload[0]:
-                    source = "netmore"
-
-        # Normalize uplink using correct parser
-        if source.startswith("actility"):
-            uplink_data = parse_actility(payload)
-        elif source == "netmore":
-            if isinstance(payload, list) and len(payload) > 0:
-                uplink_data = parse_netmore(payload[0])
-            else:
-                raise ValueError("Expected array of Netmore payloads")
-        elif source == "tti":
-            uplink_data = parse_tti(payload)
-        elif source == "chirpstack":
-            uplink_data = parse_chirpstack(payload)
-        else:
-            logger.error(f"🚫 Unknown or unsupported source: {source}")
-            raise ValueError(f"Unknown or unsupported source: {source}")
+            source = detect_source(payload)
 
-        deveui = uplink_data["deveui"]
-        if not deveui:
-            raise ValueError("Missing DevEUI in parsed payload")
+        uplink_data = parse_uplink(source, payload)
+        deveui = uplink_data.deveui
 
-        received_at = uplink_data["received_at"]
-        payload_hex = uplink_data["payload"]
+        received_at = uplink_data.received_at
+        payload_hex = uplink_data.payload
 
         # Deduplication check
         try:
@@ -124,11 +161,11 @@ async def receive_uplink(req: Request):
                     """, (
                         deveui,
                         received_at,
-                        uplink_data.get("fport"),
+                        uplink_data.fport,
                         payload_hex,
-                        json.dumps(uplink_data["uplink_metadata"]),
+                        json.dumps(uplink_data.uplink_metadata),
                         source,
-                        uplink_data.get("gateway_eui")
+                        uplink_data.gateway_eui
                     ))
                     ingest_id = cur.fetchone()[0]
                     conn.commit()
@@ -139,31 +176,12 @@ async def receive_uplink(req: Request):
         # Publish to MQTT (for ChirpStack sources)
         if source == "chirpstack":
             try:
-                mqtt_payload = {
-                    "applicationID": CHIRPSTACK_APP_ID,
-                    "devEUI": deveui,
-                    "fPort": uplink_data.get("fport"),
-                    "data": payload_hex,
-                    "receivedAt": received_at.isoformat(),
-                    "metadata": uplink_data["uplink_metadata"],
-                    "gatewayEUI": uplink_data.get("gateway_eui"),
-                    "ingestId": ingest_id
-                }
-                publish_to_mqtt(CHIRPSTACK_APP_ID, deveui, "up", mqtt_payload)
+                publish_chirpstack_uplink(uplink_data, ingest_id)
             except Exception as e:
                 logger.warning(f"⚠️ MQTT publish failed (non-fatal): {e}")
 
         # Forward to Transform
-        forward_payload = {
-            "deveui": deveui,
-            "received_at": received_at.isoformat(),
-            "fport": uplink_data.get("fport"),
-            "payload": payload_hex,
-            "uplink_metadata": uplink_data["uplink_metadata"],
-            "source": source,
-            "ingest_id": ingest_id,
-            "gateway_eui": uplink_data.get("gateway_eui"),
-        }
+        forward_payload = build_forward_payload(uplink_data, source, ingest_id)
 
         logger.info(f"📤 Forwarding to Transform: {json.dumps(forward_payload, indent=2)}")
         await forward_to_transform(forward_payload)
@@ -175,6 +193,102 @@ async def receive_uplink(req: Request):
         logger.error(f"Unhandled error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/uplink/batch")
+async def receive_uplink_batch(req: Request):
+    """
+    Store a batch of uplinks ({"uplinks": [...]}) with one multi-row INSERT,
+    then forward each to Transform. Meant for replays of historical data, so
+    the 30-second live dedup window of /uplink is not applied.
+    """
+    source_param = req.query_params.get("source", "").lower()
+    try:
+        body = await req.json()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+    entries = body.get("uplinks", []) if isinstance(body, dict) else None
+    if not isinstance(entries, list):
+        raise HTTPException(status_code=400, detail='Expected {"uplinks": [...]}')
+    if len(entries) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(entries)} > {MAX_BATCH_SIZE}")
+    logger.info(f"🛰️  Incoming batch of {len(entries)} uplinks from source={source_param or 'auto'}")
+
+    parsed = []
+    failed = 0
+    for entry in entries:
+        try:
+            source = source_param or detect_source(entry)
+            parsed.append((source, parse_uplink(source, entry)))
+        except Exception as e:
+            logger.warning(f"⚠️ Skipping unparseable uplink in batch: {e}")
+            failed += 1
+
+    if not parsed:
+        return {"status": "stored-and-forwarded", "stored": 0, "failed": failed}
+
+    try:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                # Take the ids up front so each uplink knows its own uplink_id
+                # (RETURNING order of a multi-row INSERT is not guaranteed)
+                cur.execute(
+                    "SELECT nextval(pg_get_serial_sequence('ingest.raw_uplinks', 'uplink_id')) FROM generate_series(1, %s)",
+                    (len(parsed),)
+                )
+                ingest_ids = [r[0] for r in cur.fetchall()]
+                rows = [
+                    (
+                        ingest_id,
+                        u.deveui,
+                        u.received_at,
+                        u.fport,
+                        u.payload,
+                        json.dumps(u.uplink_metadata),
+                        source,
+                        u.gateway_eui
+                    )
+                    for (source, u), ingest_id in zip(parsed, ingest_ids)
+                ]
+                execute_values(cur, """
+                    INSERT INTO ingest.raw_uplinks (uplink_id, deveui, received_at, fport, payload, uplink_metadata, source, gateway_eui)
+                    VALUES %s
+                """, rows, page_size=len(rows))
+                conn.commit()
+    except Exception as e:
+        logger.error(f"❌ DB batch insert failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Database insert error: {e}")
+
+    for (source, uplink_data), ingest_id in zip(parsed, ingest_ids):
+        if source == "chirpstack":
+            try:
+                publish_chirpstack_uplink(uplink_data, ingest_id)
+            except Exception as e:
+                logger.warning(f"⚠️ MQTT publish failed (non-fatal): {e}")
+
+    async def _forward(payload):
+        async with _forward_sem:
+            await forward_to_transform(payload)
+
+    results = await asyncio.gather(
+        *(
+            _forward(build_forward_payload(uplink_data, source, ingest_id))
+            for (source, uplink_data), ingest_id in zip(parsed, ingest_ids)
+        ),
+        return_exceptions=True
+    )
+    not_forwarded = sum(1 for r in results if isinstance(r, Exception))
+
+    logger.info(f"✔️ Stored {len(ingest_ids)} uplinks, {not_forwarded} not forwarded")
+    return {
+        "status": "stored-and-forwarded",
+        "stored": len(ingest_ids),
+        "failed": failed,
+        "not_forwarded": not_forwarded,
+    }
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_client()
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
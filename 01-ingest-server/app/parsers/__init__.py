@@ -0,0 +1,17 @@
+# parsers/__init__.py - LNS parser dispatch map
+# Version: 0.1.0 - 2026-10-15 09:00 UTC
+
+from typing import Callable, Dict
+
+from parsers._common import ParsedUplink
+from parsers.actility_parser import parse_actility
+from parsers.chirpstack_parser import parse_chirpstack
+from parsers.netmore_parser import parse_netmore
+from parsers.tti_parser import parse_tti
+
+PARSERS: Dict[str, Callable[[dict], ParsedUplink]] = {
+    "actility": parse_actility,
+    "chirpstack": parse_chirpstack,
+    "netmore": parse_netmore,
+    "tti": parse_tti,
+}
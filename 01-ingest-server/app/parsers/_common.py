@@ -0,0 +1,19 @@
+# _common.py - Shared result type for LNS parsers
+# Version: 0.1.0 - 2026-10-15 09:00 UTC
+# Changelog:
+# - ParsedUplink slots dataclass replaces the per-uplink result dict
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+@dataclass(slots=True)
+class ParsedUplink:
+    deveui: Optional[str]
+    payload: Optional[str]
+    received_at: datetime
+    fport: Any
+    uplink_metadata: dict
+    gateway_eui: Optional[str]
+    gateway_rssi: Optional[float] = None
+    gateway_snr: Optional[float] = None
@@ -0,0 +1,86 @@
+# _metadata.py - Projection of raw LNS payloads into stored uplink_metadata
+# Version: 0.1.0 - 2026-10-15 09:00 UTC
+# Changelog:
+# - Keep only the fields read downstream (transform /devices/full-metadata,
+#   MQTT consumers) instead of aliasing the full raw payload
+# - INGEST_KEEP_FULL_METADATA=1 restores the full payload
+
+import os
+
+KEEP_FULL_METADATA = os.getenv("INGEST_KEEP_FULL_METADATA", "0") == "1"
+
+# Key specs: a value of None keeps the whole sub-tree, a dict recurses
+ACTILITY_METADATA = {
+    "DevEUI_uplink": {
+        "DevEUI": None,
+        "Time": None,
+        "FPort": None,
+        "FCntUp": None,
+        "payload_hex": None,
+        "LrrRSSI": None,
+        "LrrSNR": None,
+        "SpFact": None,
+        "Channel": None,
+        "Lrrid": None,
+        "BaseStationData": None,
+        "CustomerData": None,
+        "DriverCfg": None,
+    }
+}
+
+CHIRPSTACK_METADATA = {
+    "deduplicationId": None,
+    "time": None,
+    "deviceInfo": None,
+    "devAddr": None,
+    "fCnt": None,
+    "fPort": None,
+    "data": None,
+    "rxInfo": None,
+    "txInfo": None,
+}
+
+NETMORE_METADATA = {
+    "devEui": None,
+    "timestamp": None,
+    "fPort": None,
+    "FPort": None,
+    "fCntUp": None,
+    "payload": None,
+    "rssi": None,
+    "snr": None,
+    "gatewayIdentifier": None,
+    "sensorType": None,
+}
+
+_TTI_UPLINK = {
+    "received_at": None,
+    "f_port": None,
+    "f_cnt": None,
+    "frm_payload": None,
+    "rx_metadata": None,
+    "settings": None,
+    "version_ids": None,
+}
+
+TTI_METADATA = {
+    "end_device_ids": None,
+    "received_at": None,
+    "uplink_message": _TTI_UPLINK,
+    "uplink_normalized": _TTI_UPLINK,
+}
+
+def _project(data, spec):
+    if not isinstance(data, dict):
+        return data
+    return {
+        key: data[key] if sub is None else _project(data[key], sub)
+        for key, sub in spec.items()
+        if key in data
+    }
+
+def project_metadata(payload: dict, spec: dict) -> dict:
+    """Return the whitelisted projection of payload (or payload itself if configured)"""
+    if KEEP_FULL_METADATA:
+        return payload
+    return _project(payload, spec)
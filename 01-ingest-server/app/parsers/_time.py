@@ -0,0 +1,11 @@
+# _time.py - Shared ISO-8601 timestamp parsing for LNS parsers
+# Version: 0.1.0 - 2026-10-15 09:00 UTC
+# Changelog:
+# - Prefer ciso8601 (C extension); fall back to datetime.fromisoformat,
+#   which accepts a trailing "Z" since Python 3.11
+
+try:
+    from ciso8601 import parse_datetime as parse_iso
+except ImportError:
+    from datetime import datetime as _datetime
+    parse_iso = _datetime.fromisoformat
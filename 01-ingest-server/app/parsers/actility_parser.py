@@ -2,17 +2,19 @@
 # Changelog:
 # - Truncate gateway_eui to last 16 chars (standardize format)
 
-from dateutil.parser import isoparse
+from parsers._common import ParsedUplink
+from parsers._time import parse_iso
+from parsers._metadata import ACTILITY_METADATA, project_metadata
 from datetime import datetime
 
-def parse_actility(payload: dict):
+def parse_actility(payload: dict) -> ParsedUplink:
     uplink = payload.get("DevEUI_uplink", {})
     deveui = uplink.get("DevEUI")
     payload_hex = uplink.get("payload_hex")
     raw_ts = uplink.get("Time")
 
     try:
-        received_at = isoparse(raw_ts) if raw_ts else datetime.utcnow()
+        received_at = parse_iso(raw_ts) if raw_ts else datetime.utcnow()
     except Exception:
         received_at = datetime.utcnow()
 
@@ -25,13 +27,13 @@ def parse_actility(payload: dict):
     rssi = uplink.get("LrrRSSI")
     snr = uplink.get("LrrSNR")
 
-    return {
-        "deveui": deveui.upper() if deveui else None,
-        "payload": payload_hex,
-        "received_at": received_at,
-        "fport": fport,
-        "uplink_metadata": payload,
-        "gateway_eui": gateway_eui,
-        "gateway_rssi": rssi,
-        "gateway_snr": snr,
-    }
\ No newline at end of file
+    return ParsedUplink(
+        deveui=deveui.upper() if deveui else None,
+        payload=payload_hex,
+        received_at=received_at,
+        fport=fport,
+        uplink_metadata=project_metadata(payload, ACTILITY_METADATA),
+        gateway_eui=gateway_eui,
+        gateway_rssi=rssi,
+        gateway_snr=snr,
+    )
\ No newline at end of file
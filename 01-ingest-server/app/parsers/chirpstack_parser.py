@@ -5,11 +5,14 @@
 # - Extracts DevEUI, timestamp, fPort, payload (base64 decoded)
 # - Extracts gateway EUI, RSSI, and SNR from rxInfo[0]
 
-import base64
+import binascii
+from binascii import a2b_base64, b2a_hex
 from datetime import datetime
-from dateutil.parser import isoparse
+from parsers._common import ParsedUplink
+from parsers._time import parse_iso
+from parsers._metadata import CHIRPSTACK_METADATA, project_metadata
 
-def parse_chirpstack(payload: dict):
+def parse_chirpstack(payload: dict) -> ParsedUplink:
     try:
         # Extract device info
         device_info = payload.get("deviceInfo", {})
@@ -18,7 +21,7 @@ def parse_chirpstack(payload: dict):
         # Extract timestamp
         raw_ts = payload.get("time")
         try:
-            received_at = isoparse(raw_ts) if raw_ts else datetime.utcnow()
+            received_at = parse_iso(raw_ts) if raw_ts else datetime.utcnow()
         except Exception:
             received_at = datetime.utcnow()
 
@@ -29,8 +32,8 @@ def parse_chirpstack(payload: dict):
         payload_b64 = payload.get("data")
         if payload_b64:
             try:
-                payload_hex = base64.b64decode(payload_b64).hex()
-            except Exception:
+                payload_hex = b2a_hex(a2b_base64(payload_b64)).decode("ascii")
+            except (binascii.Error, ValueError):
                 payload_hex = None
         else:
             payload_hex = None
@@ -47,16 +50,16 @@ def parse_chirpstack(payload: dict):
             rssi = first_rx.get("rssi")
             snr = first_rx.get("snr")
 
-        return {
-            "deveui": deveui.upper() if deveui else None,
-            "payload": payload_hex,
-            "received_at": received_at,
-            "fport": fport,
-            "uplink_metadata": payload,
-            "gateway_eui": gateway_eui,
-            "gateway_rssi": rssi,
-            "gateway_snr": snr,
-        }
+        return ParsedUplink(
+            deveui=deveui.upper() if deveui else None,
+            payload=payload_hex,
+            received_at=received_at,
+            fport=fport,
+            uplink_metadata=project_metadata(payload, CHIRPSTACK_METADATA),
+            gateway_eui=gateway_eui,
+            gateway_rssi=rssi,
+            gateway_snr=snr,
+        )
 
     except Exception as e:
         raise ValueError(f"Error parsing ChirpStack payload: {e}")
@@ -1,25 +1,22 @@
 # netmore_parser.py - Extract fields from Netmore uplink payloads
-# Version: 0.2.0 - 2025-07-21 21:35 UTC
+# Version: 0.3.0 - 2026-10-15 09:00 UTC
 # Changelog:
 # - Normalized deveui to uppercase
 # - Extracted gateway_eui, RSSI, and SNR
+# - Takes a single uplink dict; list unwrapping happens once in main.receive_uplink
 
-from dateutil.parser import isoparse
+from parsers._common import ParsedUplink
+from parsers._time import parse_iso
+from parsers._metadata import NETMORE_METADATA, project_metadata
 from datetime import datetime
 
-def parse_netmore(payload: dict):
-    # Handle list wrapping
-    if isinstance(payload, list) and len(payload) == 1:
-        payload = payload[0]
-    elif isinstance(payload, list) and len(payload) > 1:
-        raise ValueError("Netmore payloads with multiple uplinks not supported yet")
-
+def parse_netmore(payload: dict) -> ParsedUplink:
     deveui = payload.get("devEui")
     payload_hex = payload.get("payload")
     raw_ts = payload.get("timestamp")
 
     try:
-        received_at = isoparse(raw_ts) if raw_ts else datetime.utcnow()
+        received_at = parse_iso(raw_ts) if raw_ts else datetime.utcnow()
     except Exception:
         received_at = datetime.utcnow()
 
@@ -31,13 +28,13 @@ def parse_netmore(payload: dict):
     rssi = float(payload.get("rssi")) if payload.get("rssi") else None
     snr = float(payload.get("snr")) if payload.get("snr") else None
 
-    return {
-        "deveui": deveui.upper() if deveui else None,
-        "payload": payload_hex,
-        "received_at": received_at,
-        "fport": fport,
-        "uplink_metadata": payload,
-        "gateway_eui": gateway_eui,
-        "gateway_rssi": rssi,
-        "gateway_snr": snr,
-    }
\ No newline at end of file
+    return ParsedUplink(
+        deveui=deveui.upper() if deveui else None,
+        payload=payload_hex,
+        received_at=received_at,
+        fport=fport,
+        uplink_metadata=project_metadata(payload, NETMORE_METADATA),
+        gateway_eui=gateway_eui,
+        gateway_rssi=rssi,
+        gateway_snr=snr,
+    )
\ No newline at end of file
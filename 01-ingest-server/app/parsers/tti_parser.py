@@ -4,11 +4,14 @@
 # - Deduplicates dual uplinks from `uplink_message` and `uplink_normalized`
 # - Prefers `uplink_message` when available; falls back to `uplink_normalized`
 
-import base64
+import binascii
+from binascii import a2b_base64, b2a_hex
 from datetime import datetime
-from dateutil.parser import isoparse
+from parsers._common import ParsedUplink
+from parsers._time import parse_iso
+from parsers._metadata import TTI_METADATA, project_metadata
 
-def parse_tti(payload: dict):
+def parse_tti(payload: dict) -> ParsedUplink:
     try:
         uplink = payload.get("uplink_message") or payload.get("uplink_normalized") or {}
         end_device_ids = payload.get("end_device_ids", {})
@@ -20,14 +23,14 @@ def parse_tti(payload: dict):
         # Decode Base64 payload
         if payload_b64:
             try:
-                payload_hex = base64.b64decode(payload_b64).hex()
-            except Exception:
+                payload_hex = b2a_hex(a2b_base64(payload_b64)).decode("ascii")
+            except (binascii.Error, ValueError):
                 payload_hex = None
         else:
             payload_hex = None
 
         try:
-            received_at = isoparse(raw_ts) if raw_ts else datetime.utcnow()
+            received_at = parse_iso(raw_ts) if raw_ts else datetime.utcnow()
         except Exception:
             received_at = datetime.utcnow()
 
@@ -37,14 +40,14 @@ def parse_tti(payload: dict):
         if rx_metadata and isinstance(rx_metadata, list):
             gateway_eui = rx_metadata[0].get("gateway_ids", {}).get("eui")
 
-        return {
-            "deveui": deveui,
-            "payload": payload_hex,
-            "received_at": received_at,
-            "fport": fport,
-            "uplink_metadata": payload,
-            "gateway_eui": gateway_eui,
-        }
+        return ParsedUplink(
+            deveui=deveui,
+            payload=payload_hex,
+            received_at=received_at,
+            fport=fport,
+            uplink_metadata=project_metadata(payload, TTI_METADATA),
+            gateway_eui=gateway_eui,
+        )
 
     except Exception as e:
         raise ValueError(f"Error parsing TTI payload: {e}")
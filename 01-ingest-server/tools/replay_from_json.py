@@ -1,22 +1,31 @@
 """
 Replay Uplinks from JSON
-Version: 0.1.0
-Last Updated: 2025-08-06 15:10 UTC
+Version: 0.3.1
+Last Updated: 2026-10-15 09:00 UTC
 Authors: SenseMy IoT Team
 
 Changelog:
 - Initial version to POST CSV-derived JSON uplinks to ingest API
 - Supports optional deduplication against ingest.raw_uplinks
 - Respects INGEST_REPLAY_URL env var or defaults to Actility-compatible endpoint
+- 0.2.0: Deduplication prefetches candidates in a single query instead of one per uplink
+- 0.2.0: Streams the JSON array with ijson instead of loading it into memory
+- 0.2.0: POSTs concurrently over a keep-alive requests.Session
+- 0.3.0: --batch-size N posts N uplinks per request to /uplink/batch
+- 0.3.1: --check-db also skips repeats within the replay file itself
 """
 
 import os
 import sys
-import json
 import argparse
+import ijson
 import psycopg2
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 # Load env if available
@@ -25,6 +34,10 @@ load_dotenv()
 # Constants
 DEFAULT_REPLAY_URL = "https://dev.sensemy.cloud/uplink?source=actility-replay"
 REPLAY_URL = os.getenv("INGEST_REPLAY_URL", DEFAULT_REPLAY_URL)
+# Same endpoint and query string, with /batch appended to the path
+BATCH_URL = urlunsplit(urlsplit(REPLAY_URL)._replace(path=urlsplit(REPLAY_URL).path.rstrip("/") + "/batch"))
+MAX_WORKERS = 16
+MAX_IN_FLIGHT = MAX_WORKERS * 4
 
 # DB config for deduplication
 INGEST_DB_HOST = os.getenv("INGEST_DB_HOST", "ingest-database")
@@ -33,6 +46,13 @@ INGEST_DB_NAME = os.getenv("INGEST_DB_NAME", "ingest_db")
 INGEST_DB_USER = os.getenv("INGEST_DB_USER", "ingestuser")
 INGEST_DB_PASSWORD = os.getenv("INGEST_DB_PASSWORD", "secret")
 
+def make_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 def get_db_conn():
     return psycopg2.connect(
         host=INGEST_DB_HOST,
@@ -42,24 +62,111 @@ def get_db_conn():
         password=INGEST_DB_PASSWORD
     )
 
-def is_duplicate(deveui, payload, timestamp):
-    with get_db_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT 1 FROM ingest.raw_uplinks
-                WHERE deveui = %s
-                AND payload = %s
-                AND ABS(EXTRACT(EPOCH FROM (received_at - %s))) < 1.0
-                LIMIT 1;
-            """, (deveui, payload, timestamp))
-            return cur.fetchone() is not None
+def iter_uplinks(path):
+    """Stream entries from a top-level JSON array without loading the whole file"""
+    with open(path, "rb") as f:
+        yield from ijson.items(f, "item", use_float=True)
+
+def parse_entry(entry):
+    item = entry.get("DevEUI_uplink", {})
+    deveui = item.get("DevEUI")
+    timestamp = datetime.fromisoformat(item["Time"])
+    payload = item.get("payload_hex")
+    return deveui, payload, timestamp
+
+def fetch_existing_uplinks(conn, uplinks):
+    """
+    Prefetch every stored (deveui, payload) -> [epoch, ...] that could match
+    the replay set, using one query over the replay's time window.
+    """
+    deveuis = set()
+    timestamps = []
+    for entry in uplinks:
+        try:
+            deveui, _, timestamp = parse_entry(entry)
+        except Exception:
+            continue
+        deveuis.add(deveui)
+        timestamps.append(timestamp)
+
+    existing = {}
+    if not timestamps:
+        return existing
+
+    window = timedelta(seconds=1)
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT deveui, payload, EXTRACT(EPOCH FROM received_at)
+            FROM ingest.raw_uplinks
+            WHERE received_at BETWEEN %s AND %s
+            AND deveui = ANY(%s);
+        """, (min(timestamps) - window, max(timestamps) + window, list(deveuis)))
+        for deveui, payload, epoch in cur:
+            existing.setdefault((deveui, payload), []).append(float(epoch))
+    return existing
+
+def is_duplicate(existing, deveui, payload, timestamp):
+    epoch = timestamp.timestamp()
+    return any(abs(e - epoch) < 1.0 for e in existing.get((deveui, payload), ()))
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Replay uplinks from a JSON file to the ingest API.")
     parser.add_argument("json_file", help="Path to uplinks_clean.json")
     parser.add_argument("--check-db", action="store_true", help="Enable deduplication by checking ingest.raw_uplinks")
+    parser.add_argument("--batch-size", type=int, default=0, help="POST N uplinks per request to /uplink/batch (0 = one per request; server caps N at INGEST_MAX_BATCH_SIZE, default 500)")
     return parser.parse_args()
 
+def check_entry(entry, check_db, existing):
+    """
+    Return 'ok', 'skipped' (duplicate) or 'failed' (unparseable). Accepted
+    entries are added to existing, so repeats within the file are skipped too.
+    Runs on the main thread before submission, so no lock is needed.
+    """
+    try:
+        deveui, payload, timestamp = parse_entry(entry)
+    except Exception as e:
+        print(f"❌ Exception for {entry}: {e}")
+        return "failed"
+
+    if check_db and is_duplicate(existing, deveui, payload, timestamp):
+        print(f"⚠️  Skipping duplicate: {deveui} @ {timestamp.isoformat()}")
+        return "skipped"
+    if check_db:
+        existing.setdefault((deveui, payload), []).append(timestamp.timestamp())
+    return "ok"
+
+def replay_entry(session, entry):
+    """Replay a single uplink; returns Counter of sent/failed"""
+    try:
+        deveui, _, timestamp = parse_entry(entry)
+        res = session.post(REPLAY_URL, json=entry, timeout=5)
+        if res.status_code == 200:
+            print(f"✅ Sent: {deveui} @ {timestamp.isoformat()}")
+            return Counter(sent=1)
+
+        print(f"❌ Error {res.status_code} for {deveui}: {res.text}")
+        return Counter(failed=1)
+
+    except Exception as e:
+        print(f"❌ Exception for {entry}: {e}")
+        return Counter(failed=1)
+
+def replay_batch(session, batch):
+    """Replay a batch of uplinks via /uplink/batch; returns Counter of sent/failed"""
+    try:
+        res = session.post(BATCH_URL, json={"uplinks": batch}, timeout=60)
+        if res.status_code == 200:
+            result = res.json()
+            print(f"✅ Sent batch: {result.get('stored', 0)} stored, {result.get('failed', 0)} rejected")
+            return Counter(sent=result.get("stored", 0), failed=result.get("failed", 0))
+
+        print(f"❌ Error {res.status_code} for batch of {len(batch)}: {res.text}")
+        return Counter(failed=len(batch))
+
+    except Exception as e:
+        print(f"❌ Exception for batch of {len(batch)}: {e}")
+        return Counter(failed=len(batch))
+
 def main():
     args = parse_args()
     path = args.json_file
@@ -69,49 +176,60 @@ def main():
         print(f"❌ File not found: {path}")
         sys.exit(1)
 
-    with open(path, "r") as f:
-        try:
-            uplinks = json.load(f)
-        except Exception as e:
-            print(f"❌ Failed to parse JSON: {e}")
-            sys.exit(1)
-
-    print(f"📦 Loaded {len(uplinks)} uplinks from {path}")
-    print(f"🌍 Target URL: {REPLAY_URL}")
+    print(f"📦 Streaming uplinks from {path}")
+    print(f"🌍 Target URL: {BATCH_URL if args.batch_size > 0 else REPLAY_URL}")
     print(f"🔍 Deduplication: {'enabled' if check_db else 'disabled'}\n")
 
-    sent = 0
-    skipped = 0
-    failed = 0
-
-    for entry in uplinks:
-        try:
-            item = entry.get("DevEUI_uplink", {})
-            deveui = item.get("DevEUI")
-            timestamp = datetime.fromisoformat(item.get("Time").replace("Z", "+00:00"))
-            payload = item.get("payload_hex")
-
-            if check_db and is_duplicate(deveui, payload, timestamp):
-                print(f"⚠️  Skipping duplicate: {deveui} @ {timestamp.isoformat()}")
-                skipped += 1
-                continue
-
-            res = requests.post(REPLAY_URL, json=entry)
-            if res.status_code == 200:
-                print(f"✅ Sent: {deveui} @ {timestamp.isoformat()}")
-                sent += 1
-            else:
-                print(f"❌ Error {res.status_code} for {deveui}: {res.text}")
-                failed += 1
-
-        except Exception as e:
-            print(f"❌ Exception for {entry}: {e}")
-            failed += 1
+    counts = Counter(sent=0, skipped=0, failed=0)
+    total = 0
+
+    try:
+        existing = {}
+        if check_db:
+            with get_db_conn() as conn:
+                existing = fetch_existing_uplinks(conn, iter_uplinks(path))
+
+        # Bounded in-flight window keeps memory flat while streaming
+        with make_session() as session, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            pending = set()
+            batch = []
+
+            def submit(fn, *fn_args):
+                nonlocal pending
+                pending.add(executor.submit(fn, session, *fn_args))
+                if len(pending) >= MAX_IN_FLIGHT:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        counts.update(future.result())
+
+            try:
+                for entry in iter_uplinks(path):
+                    total += 1
+                    status = check_entry(entry, check_db, existing)
+                    if status != "ok":
+                        counts[status] += 1
+                    elif args.batch_size > 0:
+                        batch.append(entry)
+                        if len(batch) >= args.batch_size:
+                            submit(replay_batch, batch)
+                            batch = []
+                    else:
+                        submit(replay_entry, entry)
+            finally:
+                if batch:
+                    submit(replay_batch, batch)
+
+            for future in pending:
+                counts.update(future.result())
+    except ijson.JSONError as e:
+        print(f"❌ Failed to parse JSON: {e}")
+        sys.exit(1)
 
     print("\n📊 Summary:")
-    print(f" - ✅ Sent: {sent}")
-    print(f" - ⚠️  Skipped (duplicates): {skipped}")
-    print(f" - ❌ Failed: {failed}")
+    print(f" - 📦 Read: {total}")
+    print(f" - ✅ Sent: {counts['sent']}")
+    print(f" - ⚠️  Skipped (duplicates): {counts['skipped']}")
+    print(f" - ❌ Failed: {counts['failed']}")
 
 if __name__ == "__main__":
     main()
@@ -1,24 +1,35 @@
 """
 Replay Uplinks to Ingest API
-Version: 1.2.0
-Last Updated: 2025-08-06 15:33 UTC
+Version: 1.3.0
+Last Updated: 2026-10-15 09:00 UTC
 Authors: SenseMy IoT Team
 
 Changelog:
 - Adds deduplication before sending each uplink
 - Skips entries with missing DevEUI, FPort, or payload_hex
+- Streams the JSON array with ijson instead of loading it into memory
+- Sends concurrently over a keep-alive requests.Session (no fixed sleep)
 """
 
-import json
-import time
+import ijson
 import requests
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
 
 API_URL = "https://dev.sensemy.cloud/uplink?source=actility"
+MAX_WORKERS = 16
+MAX_IN_FLIGHT = MAX_WORKERS * 4
 
-def load_json_file(filename):
-    with open(filename, "r") as f:
-        return json.load(f)
+def make_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def iter_json_file(filename):
+    with open(filename, "rb") as f:
+        yield from ijson.items(f, "item", use_float=True)
 
 def dedup_key(entry):
     try:
@@ -29,34 +40,36 @@ def dedup_key(entry):
     except KeyError:
         return None
 
-def send_uplink(entry):
+def send_uplink(session, entry):
     try:
-        response = requests.post(API_URL, json=entry, timeout=5)
+        response = session.post(API_URL, json=entry, timeout=5)
         print(f"📤 Sent {entry['DevEUI_uplink']['DevEUI']} @ {entry['DevEUI_uplink']['Time']} → {response.status_code}")
     except Exception as e:
         print(f"❌ Error sending uplink: {e}")
 
 def main():
-    uplinks = load_json_file("uplinks_clean.json")
-    print(f"🔢 Loaded {len(uplinks)} uplinks from JSON")
+    print("🔢 Streaming uplinks from JSON")
 
     sent = 0
     dedup_set = set()
 
-    for entry in uplinks:
-        key = dedup_key(entry)
-        if not key:
-            print("⚠️  Skipping malformed entry")
-            continue
+    with make_session() as session, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        pending = set()
+        for entry in iter_json_file("uplinks_clean.json"):
+            key = dedup_key(entry)
+            if not key:
+                print("⚠️  Skipping malformed entry")
+                continue
 
-        if key in dedup_set:
-            print(f"⏩ Duplicate skipped: {key}")
-            continue
+            if key in dedup_set:
+                print(f"⏩ Duplicate skipped: {key}")
+                continue
 
-        dedup_set.add(key)
-        send_uplink(entry)
-        sent += 1
-        time.sleep(0.25)
+            dedup_set.add(key)
+            pending.add(executor.submit(send_uplink, session, entry))
+            sent += 1
+            if len(pending) >= MAX_IN_FLIGHT:
+                _, pending = wait(pending, return_when=FIRST_COMPLETED)
 
     print(f"\n✅ Done. Sent {sent} unique uplinks.")
 
@@ -1,19 +1,22 @@
 # verify_and_replay.py
-# Version: 0.1.1 - 2025-08-02 15:55 UTC
+# Version: 0.2.0 - 2026-10-15 09:00 UTC
 # Purpose: Replay missing uplinks from ingest DB to transform service
 # Notes:
 # - Reuses forward_to_transform() from app.forwarders
 # - Reuses get_conn() from app.main
 # - Compares ingest.raw_uplinks vs transform.ingest_uplinks by uplink_id
+# - Replays on one event loop with bounded concurrency (asyncio.gather)
+# - Diffs server-side: only recent candidate IDs go to transform, only missing rows come back
 
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import asyncio
 import psycopg2
 import json
 from datetime import datetime
-from forwarders.transform_forwarder import forward_to_transform
+from forwarders.transform_forwarder import forward_to_transform, close_client
 from main import get_conn
 
 # Transform DB config
@@ -23,6 +26,8 @@ TRANSFORM_DB_NAME = os.getenv("TRANSFORM_DB_NAME", "transform_db")
 TRANSFORM_DB_USER = os.getenv("TRANSFORM_DB_USER", "transform_user")
 TRANSFORM_DB_PASSWORD = os.getenv("TRANSFORM_DB_PASSWORD", "secret")
 
+MAX_CONCURRENCY = 32
+
 def get_transform_conn():
     return psycopg2.connect(
         host=TRANSFORM_DB_HOST,
@@ -32,53 +37,77 @@ def get_transform_conn():
         password=TRANSFORM_DB_PASSWORD
     )
 
-def get_transform_uplink_ids():
+def get_recent_ingest_uplink_ids(limit=10000):
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT uplink_id
+                FROM ingest.raw_uplinks
+                ORDER BY uplink_id DESC
+                LIMIT %s
+            """, (limit,))
+            return [row[0] for row in cur.fetchall()]
+
+def get_missing_transform_ids(candidate_ids):
+    """Return the candidate ingest IDs that transform.ingest_uplinks does not have"""
     with get_transform_conn() as conn:
         with conn.cursor() as cur:
-            cur.execute("SELECT ingest_uplink_id FROM transform.ingest_uplinks")
-            return set(row[0] for row in cur.fetchall())
+            cur.execute("""
+                SELECT c.id
+                FROM unnest(%s::int[]) AS c(id)
+                LEFT JOIN transform.ingest_uplinks t ON t.ingest_uplink_id = c.id
+                WHERE t.ingest_uplink_id IS NULL
+            """, (candidate_ids,))
+            return [row[0] for row in cur.fetchall()]
 
-def get_recent_ingest_uplinks(limit=10000):
+def get_ingest_uplinks(uplink_ids):
     with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT uplink_id, deveui, received_at, fport, payload, uplink_metadata, source, gateway_eui
                 FROM ingest.raw_uplinks
+                WHERE uplink_id = ANY(%s)
                 ORDER BY uplink_id DESC
-                LIMIT %s
-            """, (limit,))
+            """, (uplink_ids,))
             return cur.fetchall()
 
-def replay_uplinks():
-    transform_ids = get_transform_uplink_ids()
-    rows = get_recent_ingest_uplinks()
+def build_payload(row):
+    uplink_id, deveui, received_at, fport, payload, uplink_metadata, source, gateway_eui = row
+    return {
+        "deveui": deveui,
+        "received_at": received_at.isoformat(),
+        "fport": fport,
+        "payload": payload,
+        "uplink_metadata": uplink_metadata,
+        "source": source,
+        "ingest_id": uplink_id,
+        "gateway_eui": gateway_eui
+    }
 
-    print(f"🔍 Found {len(rows)} recent uplinks in ingest.raw_uplinks")
-    print(f"🧱 Found {len(transform_ids)} uplinks in transform.ingest_uplinks")
+async def replay_uplinks_async():
+    candidate_ids = get_recent_ingest_uplink_ids()
+    print(f"🔍 Found {len(candidate_ids)} recent uplinks in ingest.raw_uplinks")
 
-    missing = [r for r in rows if r[0] not in transform_ids]
+    missing_ids = get_missing_transform_ids(candidate_ids) if candidate_ids else []
+    missing = get_ingest_uplinks(missing_ids) if missing_ids else []
     print(f"🚨 {len(missing)} uplinks missing in transform → replaying...")
 
-    for row in missing:
-        uplink_id, deveui, received_at, fport, payload, uplink_metadata, source, gateway_eui = row
-        forward_payload = {
-            "deveui": deveui,
-            "received_at": received_at.isoformat(),
-            "fport": fport,
-            "payload": payload,
-            "uplink_metadata": uplink_metadata,
-            "source": source,
-            "ingest_id": uplink_id,
-            "gateway_eui": gateway_eui
-        }
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def _one(row):
+        uplink_id, deveui = row[0], row[1]
+        async with sem:
+            try:
+                print(f"➡️  Reposting uplink_id {uplink_id} for {deveui}...")
+                await forward_to_transform(build_payload(row))
+                print(f"✅ Success for {uplink_id}")
+            except Exception as e:
+                print(f"❌ Failed for {uplink_id}: {e}")
 
-        try:
-            print(f"➡️  Reposting uplink_id {uplink_id} for {deveui}...")
-            import asyncio
-            asyncio.run(forward_to_transform(forward_payload))
-            print(f"✅ Success for {uplink_id}")
-        except Exception as e:
-            print(f"❌ Failed for {uplink_id}: {e}")
+    try:
+        await asyncio.gather(*(_one(r) for r in missing))
+    finally:
+        await close_client()
 
 if __name__ == "__main__":
-    replay_uplinks()
+    asyncio.run(replay_uplinks_async())
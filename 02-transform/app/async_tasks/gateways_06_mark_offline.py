@@ -1,17 +1,20 @@
 """
 gateways_06_mark_offline.py
-Version: 1.3.0 – 2025-08-05 12:45 UTC
+Version: 1.4.0 – 2026-10-15 10:00 UTC
 Authors: SenseMy IoT Team
 
 Purpose:
 - Marks gateways as 'offline' if their last_seen_at is NULL or older than 24 hours
 
 Changelog:
+- Both sweeps run in one transaction (with db.begin())
+- Status flips are two set-based UPDATE ... RETURNING statements
 - Logs both gw_eui and last_seen_at for marked gateways
 """
 
 from database.connections import get_sync_db_session
 from models import Gateway
+from sqlalchemy import update
 from datetime import datetime, timedelta
 
 print(f"⏳ Running gateway offline status sweep at {datetime.utcnow().isoformat()}")
@@ -21,33 +24,35 @@ def run():
     db = next(db_gen)
 
     try:
-        cutoff = datetime.utcnow() - timedelta(hours=24)
-
-        # Step 1: Mark stale gateways offline
-        to_offline = (
-            db.query(Gateway)
-            .filter(Gateway.status == "online", (Gateway.last_seen_at == None) | (Gateway.last_seen_at < cutoff))
-            .all()
-        )
-
-        for gw in to_offline:
-            print(f"🔻 Marking offline: {gw.gw_eui} (last_seen_at={gw.last_seen_at})")
-            gw.status = "offline"
-            gw.updated_at = datetime.utcnow()
-
-        # Step 2: Mark recently seen gateways back online
-        to_online = (
-            db.query(Gateway)
-            .filter(Gateway.status == "offline", Gateway.last_seen_at != None, Gateway.last_seen_at >= cutoff)
-            .all()
-        )
-
-        for gw in to_online:
-            print(f"🔼 Marking online: {gw.gw_eui} (last_seen_at={gw.last_seen_at})")
-            gw.status = "online"
-            gw.updated_at = datetime.utcnow()
-
-        db.commit()
+        # One transaction for both sweeps; committed on exit, rolled back on error
+        with db.begin():
+            now = datetime.utcnow()
+            cutoff = now - timedelta(hours=24)
+
+            # Step 1: Mark stale gateways offline
+            to_offline = db.execute(
+                update(Gateway)
+                .where(Gateway.status == "online", (Gateway.last_seen_at == None) | (Gateway.last_seen_at < cutoff))
+                .values(status="offline", updated_at=now)
+                .returning(Gateway.gw_eui, Gateway.last_seen_at)
+                .execution_options(synchronize_session=False)
+            ).all()
+
+            for gw_eui, last_seen_at in to_offline:
+                print(f"🔻 Marked offline: {gw_eui} (last_seen_at={last_seen_at})")
+
+            # Step 2: Mark recently seen gateways back online
+            to_online = db.execute(
+                update(Gateway)
+                .where(Gateway.status == "offline", Gateway.last_seen_at != None, Gateway.last_seen_at >= cutoff)
+                .values(status="online", updated_at=now)
+                .returning(Gateway.gw_eui, Gateway.last_seen_at)
+                .execution_options(synchronize_session=False)
+            ).all()
+
+            for gw_eui, last_seen_at in to_online:
+                print(f"🔼 Marked online: {gw_eui} (last_seen_at={last_seen_at})")
+
         print(f"✅ Sweep complete: {len(to_offline)} offline, {len(to_online)} online")
 
     except Exception as e:
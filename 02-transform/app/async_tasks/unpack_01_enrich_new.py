@@ -1,6 +1,10 @@
 # 2b-transform-server/app/async_tasks/unpack_01_enrich_new.py
-# Version: 0.7.0 – 2025-08-06 16:55 UTC+2
+# Version: 0.8.1 – 2026-10-15 10:00 UTC
 # Changelog:
+# - Loads only the IngestUplink columns enrichment uses (ENRICH_COLUMNS)
+# - Whole run is one transaction (with db.begin())
+# - Device contexts fetched in one query; ORPHANs inserted with one statement
+# - Enriched uplinks stored with one upsert, logs with one bulk insert per run
 # - Automatically inserts missing DevEUIs as ORPHAN into device_context
 # - Logs ORPHAN insertion in context_enrichment step
 
@@ -19,11 +23,11 @@ Sequence:
 
 from database.connections import get_sync_db_session
 from constants.enrichment_steps import Step, Status
-from logging_helpers.enrichment_logger import log_step
-from logging_helpers.query_latest_logs import find_uplinks_by_latest_log
-from services.gateway_handler import insert_or_update_processed_uplink
-from services.device_handler import ensure_device_context_exists
-from models import DeviceContext, ProcessedUplink
+from logging_helpers.enrichment_logger import log_row, log_steps_bulk
+from logging_helpers.query_latest_logs import find_uplinks_by_latest_log, ENRICH_COLUMNS
+from services.gateway_handler import upsert_processed_uplinks
+from services.device_handler import insert_orphan_device_contexts
+from models import DeviceContext
 from datetime import datetime
 
 def run():
@@ -31,54 +35,66 @@ def run():
     db = next(db_gen)
 
     try:
-        uplinks = find_uplinks_by_latest_log(db, Step.INGESTION_RECEIVED, Status.NEW)
-
-        if not uplinks:
-            print("✅ No new uplinks to enrich.")
-            return
-
-        print(f"🚀 Starting enrichment for {len(uplinks)} new uplinks...")
-
-        started, enriched, unresolved = 0, 0, 0
-
-        for uplink in uplinks:
-            started += 1
-            deveui = uplink.deveui
-            gateway_eui = uplink.gateway_eui
-
-            device = db.query(DeviceContext).filter_by(deveui=deveui).first()
-
-            if device and device.device_type_id:
-                enriched_uplink = ProcessedUplink(
-                    uplink_uuid=uplink.uplink_uuid,
-                    deveui=uplink.deveui,
-                    timestamp=uplink.timestamp,
-                    payload=uplink.payload,
-                    fport=uplink.fport,
-                    source=uplink.source,
-                    uplink_metadata=uplink.uplink_metadata,
-                    device_type_id=device.device_type_id,
-                    gateway_eui=device.last_gateway or gateway_eui,
-                    inserted_at=uplink.inserted_at,
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow(),
-                )
-                db.merge(enriched_uplink)
-
-                insert_or_update_processed_uplink(db=db, uplink=enriched_uplink)
-
-                log_step(db, uplink.uplink_uuid, Step.CONTEXT_ENRICHMENT, Status.SUCCESS, "Initial enrichment complete")
-                print(f"✅ Enriched: {uplink.uplink_uuid} ({deveui})")
-                enriched += 1
-            else:
-                # Automatically insert missing device context as ORPHAN
-                ensure_device_context_exists(deveui, gateway_eui, db)
-
-                log_step(db, uplink.uplink_uuid, Step.CONTEXT_ENRICHMENT, Status.PENDING, "No matching device context found — ORPHAN inserted")
-                print(f"❌ Unresolved: {uplink.uplink_uuid} ({deveui}) → ORPHAN inserted")
-                unresolved += 1
-
-        db.commit()
+        # One transaction for the whole run; committed on exit, rolled back on error
+        with db.begin():
+            uplinks = find_uplinks_by_latest_log(db, Step.INGESTION_RECEIVED, Status.NEW, columns=ENRICH_COLUMNS)
+
+            if not uplinks:
+                print("✅ No new uplinks to enrich.")
+                return
+
+            print(f"🚀 Starting enrichment for {len(uplinks)} new uplinks...")
+
+            started, enriched, unresolved = 0, 0, 0
+            processed_rows, log_rows = [], []
+            orphans = {}
+            now = datetime.utcnow()
+
+            # One SELECT for every device context in the batch
+            deveuis = {uplink.deveui for uplink in uplinks}
+            contexts = {
+                device.deveui: device
+                for device in db.query(DeviceContext).filter(DeviceContext.deveui.in_(deveuis))
+            }
+
+            for uplink in uplinks:
+                started += 1
+                deveui = uplink.deveui
+                gateway_eui = uplink.gateway_eui
+
+                device = contexts.get(deveui)
+
+                if device and device.device_type_id:
+                    processed_rows.append({
+                        "uplink_uuid": uplink.uplink_uuid,
+                        "deveui": uplink.deveui,
+                        "timestamp": uplink.timestamp,
+                        "payload": uplink.payload,
+                        "fport": uplink.fport,
+                        "source": uplink.source,
+                        "uplink_metadata": uplink.uplink_metadata,
+                        "device_type_id": device.device_type_id,
+                        "gateway_eui": device.last_gateway or gateway_eui,
+                        "inserted_at": uplink.inserted_at,
+                        "created_at": now,
+                        "updated_at": now,
+                    })
+                    log_rows.append(log_row(uplink.uplink_uuid, Step.CONTEXT_ENRICHMENT, Status.SUCCESS, "Initial enrichment complete", now))
+                    print(f"✅ Enriched: {uplink.uplink_uuid} ({deveui})")
+                    enriched += 1
+                else:
+                    # Missing device contexts are inserted as ORPHAN after the loop
+                    if device is None:
+                        orphans.setdefault(deveui, gateway_eui)
+
+                    log_rows.append(log_row(uplink.uplink_uuid, Step.CONTEXT_ENRICHMENT, Status.PENDING, "No matching device context found — ORPHAN inserted", now))
+                    print(f"❌ Unresolved: {uplink.uplink_uuid} ({deveui}) → ORPHAN inserted")
+                    unresolved += 1
+
+            insert_orphan_device_contexts(orphans, db)
+            upsert_processed_uplinks(processed_rows, db)
+            log_steps_bulk(db, log_rows)
+
         print(f"\n📊 Enrichment Summary: 🧩 {started} processed, ✅ {enriched} enriched, ❌ {unresolved} unresolved")
 
     finally:
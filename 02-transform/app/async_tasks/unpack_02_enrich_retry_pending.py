@@ -1,6 +1,11 @@
 # async_tasks/unpack_02_enrich_retry_pending.py
-# Version: 0.6.1 – 2025-08-06 15:05 UTC
+# Version: 0.7.0 – 2026-10-15 10:00 UTC
 # Changelog:
+# - Whole run is one transaction; gateways, ORPHANs, uplinks and logs written with batch helpers
+# - Gateway existence check is SELECT EXISTS instead of a full-row fetch
+# - Loads only the IngestUplink columns enrichment uses (ENRICH_COLUMNS)
+# - Dropped redundant db.merge before insert_or_update_processed_uplink
+# - One timestamp per run instead of utcnow() per row
 # - Adds ensure_device_context_exists for missing DevEUIs
 # - Logs ORPHAN insertion to enrichment_logs
 # - Aligns logic with unpack_01_enrich_new.py
@@ -17,94 +22,109 @@ Sequence:
 
 from database.connections import get_sync_db_session
 from constants.enrichment_steps import Step, Status
-from logging_helpers.enrichment_logger import log_step
-from logging_helpers.query_latest_logs import find_uplinks_by_latest_log
-from services.gateway_handler import insert_or_update_processed_uplink
-from services.device_handler import ensure_device_context_exists
-from models import DeviceContext, ProcessedUplink, Gateway
-from datetime import datetime
-
-def ensure_gateway_exists(db, gateway_eui: str, uplink_uuid=None) -> bool:
-    if not gateway_eui:
-        return False
-
-    print(f"🔍 Checking gateway: {gateway_eui} ...", end=" ")
-    existing = db.query(Gateway).filter_by(gw_eui=gateway_eui).first()
-    if existing:
-        print("✅ already exists")
-        return False
-
-    gateway = Gateway(
-        gw_eui=gateway_eui,
-        gateway_name="Orphan Gateway",
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
-    )
-    db.add(gateway)
-    db.commit()
-
-    print("➕ inserted")
-    if uplink_uuid:
-        log_step(db, uplink_uuid, Step.CONTEXT_ENRICHMENT, Status.PENDING, f"New orphan gateway: {gateway_eui}")
-
-    return True
+from logging_helpers.enrichment_logger import log_row, log_steps_bulk
+from logging_helpers.query_latest_logs import find_uplinks_by_latest_log, ENRICH_COLUMNS
+from services.gateway_handler import upsert_processed_uplinks
+from services.device_handler import insert_orphan_device_contexts
+from models import DeviceContext, Gateway
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import datetime, timedelta
+
+def insert_orphan_gateways(db, gateway_euis, now) -> set:
+    """
+    Insert every unknown gateway EUI as an "Orphan Gateway" with one
+    INSERT ... ON CONFLICT (gw_eui) DO NOTHING. Returns the EUIs actually
+    inserted. Does not commit.
+    """
+    euis = set(gateway_euis) - {None, ""}
+    if not euis:
+        return set()
+
+    stmt = pg_insert(Gateway.__table__).values([
+        {"gw_eui": eui, "gateway_name": "Orphan Gateway", "created_at": now, "updated_at": now}
+        for eui in euis
+    ]).on_conflict_do_nothing(
+        index_elements=[Gateway.__table__.c.gw_eui]
+    ).returning(Gateway.__table__.c.gw_eui)
+    return set(db.execute(stmt).scalars())
 
 def run():
     db_gen = get_sync_db_session()
     db = next(db_gen)
 
     try:
-        uplinks = find_uplinks_by_latest_log(db, Step.CONTEXT_ENRICHMENT, Status.PENDING)
-
-        if not uplinks:
-            print("✅ No pending uplinks to retry.")
-            return
-
-        print(f"🔁 Retrying {len(uplinks)} pending enrichments...")
-
-        retried, fixed, unresolved, gateways_added = 0, 0, 0, 0
-
-        for uplink in uplinks:
-            retried += 1
-            deveui = uplink.deveui
-            gateway_eui = uplink.gateway_eui
-
-            if ensure_gateway_exists(db, gateway_eui, uplink.uplink_uuid):
-                gateways_added += 1
-
-            device = db.query(DeviceContext).filter_by(deveui=deveui).first()
-
-            if device and device.device_type_id:
-                enriched_uplink = ProcessedUplink(
-                    uplink_uuid=uplink.uplink_uuid,
-                    deveui=uplink.deveui,
-                    timestamp=uplink.timestamp,
-                    payload=uplink.payload,
-                    fport=uplink.fport,
-                    source=uplink.source,
-                    uplink_metadata=uplink.uplink_metadata,
-                    device_type_id=device.device_type_id,
-                    gateway_eui=device.last_gateway or gateway_eui,
-                    inserted_at=uplink.inserted_at,
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow(),
-                )
-
-                db.merge(enriched_uplink)
-
-                insert_or_update_processed_uplink(db=db, uplink=enriched_uplink)
-
-                log_step(db, uplink.uplink_uuid, Step.CONTEXT_ENRICHMENT, Status.SUCCESS, "Retry resolved with device type")
-                print(f"✅ Fixed: {uplink.uplink_uuid} ({deveui})")
-                fixed += 1
-            else:
-                ensure_device_context_exists(deveui, gateway_eui, db)
-                log_step(db, uplink.uplink_uuid, Step.CONTEXT_ENRICHMENT, Status.PENDING, "No matching device context found — ORPHAN inserted")
-                print(f"❌ Unresolved: {uplink.uplink_uuid} ({deveui}) → ORPHAN inserted")
-                unresolved += 1
-
-        db.commit()
-        print(f"\n📊 Retry Summary: 🔁 {retried} retried, ✅ {fixed} fixed, ❌ {unresolved} unresolved, 🛰️ {gateways_added} gateways added")
+        # One transaction for the whole run; committed on exit, rolled back on error
+        with db.begin():
+            uplinks = find_uplinks_by_latest_log(db, Step.CONTEXT_ENRICHMENT, Status.PENDING, columns=ENRICH_COLUMNS)
+
+            if not uplinks:
+                print("✅ No pending uplinks to retry.")
+                return
+
+            print(f"🔁 Retrying {len(uplinks)} pending enrichments...")
+
+            retried, fixed, unresolved = 0, 0, 0
+            processed_rows, log_rows = [], []
+            orphans = {}
+            now = datetime.utcnow()
+
+            # Unknown gateways first, logged against the first uplink that carries each
+            new_gateways = insert_orphan_gateways(db, (uplink.gateway_eui for uplink in uplinks), now)
+            for gateway_eui in sorted(new_gateways):
+                print(f"➕ Orphan gateway inserted: {gateway_eui}")
+
+            # One SELECT for every device context in the batch
+            deveuis = {uplink.deveui for uplink in uplinks}
+            contexts = {
+                device.deveui: device
+                for device in db.query(DeviceContext).filter(DeviceContext.deveui.in_(deveuis))
+            }
+
+            logged_gateways = set()
+            for uplink in uplinks:
+                retried += 1
+                deveui = uplink.deveui
+                gateway_eui = uplink.gateway_eui
+
+                if gateway_eui in new_gateways and gateway_eui not in logged_gateways:
+                    logged_gateways.add(gateway_eui)
+                    # Stamped just before the outcome row so it never ties as the latest log
+                    log_rows.append(log_row(uplink.uplink_uuid, Step.CONTEXT_ENRICHMENT, Status.PENDING, f"New orphan gateway: {gateway_eui}", now - timedelta(microseconds=1)))
+
+                device = contexts.get(deveui)
+
+                if device and device.device_type_id:
+                    processed_rows.append({
+                        "uplink_uuid": uplink.uplink_uuid,
+                        "deveui": uplink.deveui,
+                        "timestamp": uplink.timestamp,
+                        "payload": uplink.payload,
+                        "fport": uplink.fport,
+                        "source": uplink.source,
+                        "uplink_metadata": uplink.uplink_metadata,
+                        "device_type_id": device.device_type_id,
+                        "gateway_eui": device.last_gateway or gateway_eui,
+                        "inserted_at": uplink.inserted_at,
+                        "created_at": now,
+                        "updated_at": now,
+                    })
+                    log_rows.append(log_row(uplink.uplink_uuid, Step.CONTEXT_ENRICHMENT, Status.SUCCESS, "Retry resolved with device type", now))
+                    print(f"✅ Fixed: {uplink.uplink_uuid} ({deveui})")
+                    fixed += 1
+                else:
+                    # Missing device contexts are inserted as ORPHAN after the loop
+                    if device is None:
+                        orphans.setdefault(deveui, gateway_eui)
+
+                    log_rows.append(log_row(uplink.uplink_uuid, Step.CONTEXT_ENRICHMENT, Status.PENDING, "No matching device context found — ORPHAN inserted", now))
+                    print(f"❌ Unresolved: {uplink.uplink_uuid} ({deveui}) → ORPHAN inserted")
+                    unresolved += 1
+
+            insert_orphan_device_contexts(orphans, db)
+            upsert_processed_uplinks(processed_rows, db)
+            log_steps_bulk(db, log_rows)
+
+        print(f"\n📊 Retry Summary: 🔁 {retried} retried, ✅ {fixed} fixed, ❌ {unresolved} unresolved, 🛰️ {len(new_gateways)} gateways added")
 
     finally:
         db_gen.close()
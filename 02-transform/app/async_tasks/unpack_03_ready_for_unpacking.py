@@ -1,6 +1,9 @@
 # async_tasks/unpack_03_ready_for_unpacking.py
-# Version: 0.5.1 – 2025-07-23 10:45 UTC
+# Version: 0.7.0 – 2026-10-15 10:00 UTC
 # Changelog:
+# - Whole run is one transaction (with db.begin())
+# - Single INSERT ... SELECT, no uplinks loaded into Python
+# - READY logs written with one bulk insert instead of one per uplink
 # - Renamed from run_03_ready_for_unpacking.py
 # - Canonical unpacking header added
 
@@ -17,37 +20,48 @@ Triggers:
 
 from database.connections import get_sync_db_session
 from constants.enrichment_steps import Step, Status
-from logging_helpers.enrichment_logger import log_step
-from logging_helpers.query_latest_logs import find_uplinks_by_latest_log
+from logging_helpers.query_latest_logs import LATEST_MATCHING_LOGS
+from models import EnrichmentLog
+from sqlalchemy import insert, select, literal, bindparam, func
+from datetime import datetime
+
+# One INSERT ... SELECT: every uplink whose latest log is
+# (CONTEXT_ENRICHMENT, SUCCESS) gets an (UNPACKING_INIT, READY) log.
+# log_id is generated server-side per row (the model default is a
+# single Python uuid4, which would repeat across the SELECT).
+MARK_READY = insert(EnrichmentLog).from_select(
+    ["log_id", "uplink_uuid", "step", "status", "detail", "created_at"],
+    select(
+        func.gen_random_uuid(),
+        LATEST_MATCHING_LOGS.c.uplink_uuid,
+        literal(Step.UNPACKING_INIT),
+        literal(Status.READY),
+        literal("Enrichment complete, ready to unpack"),
+        bindparam("now")
+    )
+).returning(EnrichmentLog.uplink_uuid)
 
 def run():
     db_gen = get_sync_db_session()
     db = next(db_gen)
 
     try:
-        uplinks = find_uplinks_by_latest_log(db, Step.CONTEXT_ENRICHMENT, Status.SUCCESS)
-
-        if not uplinks:
-            print("✅ No enriched uplinks to mark for unpacking.")
-            return
-
-        print(f"📦 Marking {len(uplinks)} uplinks as ready for unpacking...")
+        # One transaction for the whole run; committed on exit, rolled back on error
+        with db.begin():
+            marked = db.execute(MARK_READY, {
+                "target_step": Step.CONTEXT_ENRICHMENT,
+                "target_status": Status.SUCCESS,
+                "now": datetime.utcnow(),
+            }).scalars().all()
 
-        marked = 0
+            if not marked:
+                print("✅ No enriched uplinks to mark for unpacking.")
+                return
 
-        for uplink in uplinks:
-            log_step(
-                db,
-                uplink.uplink_uuid,
-                Step.UNPACKING_INIT,
-                Status.READY,
-                "Enrichment complete, ready to unpack"
-            )
-            print(f"📘 Ready: {uplink.uplink_uuid} ({uplink.deveui})")
-            marked += 1
+            for uplink_uuid in marked:
+                print(f"📘 Ready: {uplink_uuid}")
 
-        db.commit()
-        print(f"\n📊 Summary: 📦 {marked} marked as ready for unpacking")
+        print(f"\n📊 Summary: 📦 {len(marked)} marked as ready for unpacking")
 
     finally:
         db_gen.close()
@@ -1,6 +1,11 @@
 # async_tasks/unpack_04_unpack_ready.py
-# Version: 0.5.8 – 2025-07-23 10:45 UTC
+# Version: 0.6.0 – 2026-10-15 10:00 UTC
 # Changelog:
+# - Unpacker functions resolved once per device type per run
+# - Whole run is one transaction (with db.begin())
+# - Streams uplinks with yield_per instead of loading the batch up front
+# - Per-uplink debug output goes to logger.debug instead of print
+# - Split into a decode phase and a bulk write phase (bulk_update_mappings + bulk logs)
 # - Renamed from run_04_unpack_ready.py
 # - Canonical unpacking pipeline header added
 
@@ -13,78 +18,87 @@ Sequence:
 - unpack_04_unpack_ready.py
 """
 
+import logging
 from database.connections import get_sync_db_session
 from constants.enrichment_steps import Step, Status
-from logging_helpers.enrichment_logger import log_step
+from logging_helpers.enrichment_logger import log_row, log_steps_bulk
 from unpackers.registry import get_unpacker
 from async_tasks.unpack_utils import get_uplinks_ready_for_unpacking, safe_unpack_and_catch
 from sqlalchemy.orm import Session
+from models import ProcessedUplink
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 def run():
     db_gen = get_sync_db_session()
     db: Session = next(db_gen)
 
     try:
-        results = get_uplinks_ready_for_unpacking(db)
-        if not results:
-            print("✅ No uplinks ready for unpacking.")
-            return
-
-        print(f"🧩 Attempting to unpack {len(results)} uplinks...")
-        unpacked, failed = 0, 0
-
-        for uplink, device_type in results:
-            try:
-                print(f"\n🧪 Uplink UUID: {uplink.uplink_uuid}")
-                print(f"🧪 DevEUI={uplink.deveui}, FPort={uplink.fport}")
-                print(f"🧪 Raw payload (type={type(uplink.payload)}): {uplink.payload}")
-
-                payload_bytes = uplink.payload
-                if isinstance(payload_bytes, memoryview):
-                    print("🔁 Converting memoryview to bytes")
-                    payload_bytes = payload_bytes.tobytes()
-
-                print(f"🧪 Payload HEX: {payload_bytes.hex()}")
-
-                unpacker_func = get_unpacker(device_type.unpacker)
-                if not unpacker_func:
-                    raise ValueError(f"Unpacker '{device_type.unpacker}' not found in registry")
-
-                # Inject cleaned payload back into uplink for decoding
-                uplink.payload = payload_bytes
-
-                decoded = safe_unpack_and_catch(uplink.deveui, uplink, unpacker_func)
-                if not isinstance(decoded, dict):
-                    decoded = {"status": "not_decoded"}
-
-                uplink.payload_decoded = decoded
-                uplink.updated_at = datetime.utcnow()
-                db.merge(uplink)
-
-                log_step(
-                    db,
-                    uplink.uplink_uuid,
-                    Step.UNPACKING,
-                    Status.SUCCESS,
-                    f"Payload unpacked by '{device_type.unpacker}'"
-                )
-
-                print(f"✅ Unpacked: {uplink.uplink_uuid} ({uplink.deveui}) → {decoded}")
-                unpacked += 1
-
-            except Exception as e:
-                log_step(
-                    db,
-                    uplink.uplink_uuid,
-                    Step.UNPACKING,
-                    Status.FAIL,
-                    f"{str(e)} | DevEUI={uplink.deveui}, Port={uplink.fport}, Len={len(uplink.payload or b'')}"
-                )
-                print(f"❌ Failed: {uplink.uplink_uuid} (DevEUI={uplink.deveui}, Port={uplink.fport}, Len={len(uplink.payload or b'')}) → {type(e).__name__}: {str(e)}")
-                failed += 1
-
-        db.commit()
+        # One transaction for the whole run; committed on exit, rolled back on error
+        with db.begin():
+            # Streamed from a server-side cursor; the count is known after the loop
+            results = get_uplinks_ready_for_unpacking(db, stream=True)
+            unpacked, failed = 0, 0
+
+            updates, log_rows = [], []
+            unpackers = {}  # device_types.unpacker → function, resolved once per run
+            now = datetime.utcnow()
+
+            # Decode phase: no DB access, uplink objects are left untouched
+            for uplink, device_type in results:
+                try:
+                    logger.debug(
+                        "🧪 Uplink UUID: %s DevEUI=%s, FPort=%s, raw payload: %r",
+                        uplink.uplink_uuid, uplink.deveui, uplink.fport, uplink.payload
+                    )
+
+                    name = device_type.unpacker
+                    if name not in unpackers:
+                        unpackers[name] = get_unpacker(name)
+                    unpacker_func = unpackers[name]
+                    if not unpacker_func:
+                        raise ValueError(f"Unpacker '{device_type.unpacker}' not found in registry")
+
+                    decoded = safe_unpack_and_catch(uplink.deveui, uplink, unpacker_func)
+                    if not isinstance(decoded, dict):
+                        decoded = {"status": "not_decoded"}
+
+                    updates.append({
+                        "uplink_uuid": uplink.uplink_uuid,
+                        "payload_decoded": decoded,
+                        "updated_at": now,
+                    })
+                    log_rows.append(log_row(
+                        uplink.uplink_uuid,
+                        Step.UNPACKING,
+                        Status.SUCCESS,
+                        f"Payload unpacked by '{device_type.unpacker}'",
+                        now
+                    ))
+
+                    print(f"✅ Unpacked: {uplink.uplink_uuid} ({uplink.deveui}) → {decoded}")
+                    unpacked += 1
+
+                except Exception as e:
+                    log_rows.append(log_row(
+                        uplink.uplink_uuid,
+                        Step.UNPACKING,
+                        Status.FAIL,
+                        f"{str(e)} | DevEUI={uplink.deveui}, Port={uplink.fport}, Len={len(uplink.payload or b'')}",
+                        now
+                    ))
+                    print(f"❌ Failed: {uplink.uplink_uuid} (DevEUI={uplink.deveui}, Port={uplink.fport}, Len={len(uplink.payload or b'')}) → {type(e).__name__}: {str(e)}")
+                    failed += 1
+
+            if not updates and not log_rows:
+                print("✅ No uplinks ready for unpacking.")
+                return
+
+            # Write phase: one executemany per table
+            db.bulk_update_mappings(ProcessedUplink, updates)
+            log_steps_bulk(db, log_rows)
+
         print(f"\n📊 Summary: ✅ {unpacked} unpacked, ❌ {failed} failed")
 
     finally:
@@ -1,6 +1,15 @@
 # async_tasks/unpack_utils.py
-# Version: 0.3.1 – 2025-07-23 11:55 UTC
+# Version: 0.4.0 – 2026-10-15 10:00 UTC
 # Changelog:
+# - Latest-log filtering uses DISTINCT ON via latest_log_subquery()
+# - get_failed_unpacks: one UPDATE ... FROM for device_type sync, one joined SELECT
+# - Queries are module-level statements with bound parameters
+# - Hex-ASCII payload detection uses a precompiled bytes regex
+# - ...then bytes.translate against a precomputed non-hex table
+# - Per-uplink debug output goes to logger.debug instead of print
+# - Unpack candidates load only the columns decoding needs
+# - stream=True option streams (uplink, device_type) rows with yield_per
+# - Payload normalization dispatches on type(payload) via _PAYLOAD_NORMALIZERS
 # - Updated header to match canonical unpacking format
 # - References constants/enrichment_steps.py for status filtering
 # - Clarified intended use by unpack_04 and unpack_05
@@ -22,81 +31,121 @@ Filtering logic relies on `constants/enrichment_steps.py` to match:
 - Step.UNPACKING + Status.FAIL
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from models import ProcessedUplink, EnrichmentLog, DeviceType
+import logging
+from sqlalchemy.orm import Session, load_only, noload
+from sqlalchemy import select, update, bindparam
+from models import ProcessedUplink, DeviceType, DeviceContext
 from constants.enrichment_steps import Step, Status
-
-def get_uplinks_ready_for_unpacking(db: Session, limit=100):
+from logging_helpers.query_latest_logs import LATEST_MATCHING_LOGS
+
+logger = logging.getLogger(__name__)
+
+# Every byte value that is not an ASCII hex digit; deleting them with
+# bytes.translate and comparing lengths validates hex in one C-level pass
+_NON_HEX_BYTES = bytes(b for b in range(256) if b not in b"0123456789abcdefABCDEF")
+
+def _is_hex_ascii(payload: bytes) -> bool:
+    return (
+        len(payload) % 2 == 0
+        and len(payload) > 0
+        and len(payload.translate(None, _NON_HEX_BYTES)) == len(payload)
+    )
+
+# Built once at import; calls only bind (target_step, target_status, limit)
+
+def _uplinks_with_unpacker(order_by):
+    return (
+        select(ProcessedUplink, DeviceType)
+        .join(LATEST_MATCHING_LOGS, ProcessedUplink.uplink_uuid == LATEST_MATCHING_LOGS.c.uplink_uuid)
+        .join(DeviceType, ProcessedUplink.device_type_id == DeviceType.device_type_id)
+        .where(DeviceType.unpacker.isnot(None))
+        # Decoding reads only these; skip uplink_metadata/payload_decoded JSONB
+        # and the joined eager load of device_type (already joined above)
+        .options(
+            load_only(ProcessedUplink.uplink_uuid, ProcessedUplink.deveui, ProcessedUplink.fport, ProcessedUplink.payload),
+            noload(ProcessedUplink.device_type)
+        )
+        .order_by(order_by)
+        .limit(bindparam("limit"))
+    )
+
+_READY_UPLINKS = _uplinks_with_unpacker(ProcessedUplink.inserted_at.asc())
+_FAILED_UPLINKS = _uplinks_with_unpacker(ProcessedUplink.updated_at.asc())
+
+# Rows per server-side cursor fetch when a caller streams results
+STREAM_BATCH_SIZE = 50
+
+def _fetch(db: Session, stmt, params, stream: bool):
+    if stream:
+        return db.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE), params)
+    return db.execute(stmt, params).all()
+
+# Sync stale device_type_id from device_context in one UPDATE ... FROM
+_SYNC_FAILED_DEVICE_TYPES = (
+    update(ProcessedUplink)
+    .where(
+        ProcessedUplink.uplink_uuid.in_(select(LATEST_MATCHING_LOGS.c.uplink_uuid)),
+        ProcessedUplink.deveui == DeviceContext.deveui,
+        ProcessedUplink.device_type_id.is_distinct_from(DeviceContext.device_type_id)
+    )
+    .values(device_type_id=DeviceContext.device_type_id)
+    .execution_options(synchronize_session=False)
+)
+
+def get_uplinks_ready_for_unpacking(db: Session, limit=100, stream=False):
     """
     Return list of (uplink, device_type) tuples where:
     - latest log is (step=UNPACKING_INIT, status=READY)
     - uplink.device_type_id is not null
     - device_type.unpacker is not null
+
+    With stream=True, returns an iterable result fetched STREAM_BATCH_SIZE
+    rows at a time from a server-side cursor instead of a list.
     """
-    latest_logs = db.query(
-        EnrichmentLog.uplink_uuid,
-        func.max(EnrichmentLog.created_at).label("max_time")
-    ).group_by(EnrichmentLog.uplink_uuid).subquery()
-
-    latest_matching_logs = db.query(EnrichmentLog.uplink_uuid).\
-        join(latest_logs, (EnrichmentLog.uplink_uuid == latest_logs.c.uplink_uuid) &
-                          (EnrichmentLog.created_at == latest_logs.c.max_time)).\
-        filter(
-            EnrichmentLog.step == Step.UNPACKING_INIT,
-            EnrichmentLog.status == Status.READY
-        ).subquery()
-
-    results = db.query(ProcessedUplink, DeviceType).\
-        join(latest_matching_logs, ProcessedUplink.uplink_uuid == latest_matching_logs.c.uplink_uuid).\
-        join(DeviceType, ProcessedUplink.device_type_id == DeviceType.device_type_id).\
-        filter(DeviceType.unpacker.isnot(None)).\
-        order_by(ProcessedUplink.inserted_at.asc()).\
-        limit(limit).all()
-
-    return results
-
-
-def get_failed_unpacks(db: Session, limit=100):
+    return _fetch(
+        db,
+        _READY_UPLINKS,
+        {"target_step": Step.UNPACKING_INIT, "target_status": Status.READY, "limit": limit},
+        stream
+    )
+
+
+def get_failed_unpacks(db: Session, limit=100, stream=False):
     """
     Return list of (uplink, device_type) where:
     - latest log is (step=UNPACKING, status=FAIL)
     - device_type is refreshed from device_context if stale
+
+    stream=True behaves as in get_uplinks_ready_for_unpacking().
     """
-    from models import DeviceContext  # inline import to avoid circulars
+    params = {"target_step": Step.UNPACKING, "target_status": Status.FAIL}
 
-    latest_logs = db.query(
-        EnrichmentLog.uplink_uuid,
-        func.max(EnrichmentLog.created_at).label("max_time")
-    ).group_by(EnrichmentLog.uplink_uuid).subquery()
+    synced = db.execute(_SYNC_FAILED_DEVICE_TYPES, params).rowcount
+    if synced:
+        print(f"♻️ Synced device_type_id from device_context for {synced} failed uplinks")
 
-    latest_matching_logs = db.query(EnrichmentLog.uplink_uuid).\
-        join(latest_logs, (EnrichmentLog.uplink_uuid == latest_logs.c.uplink_uuid) &
-                          (EnrichmentLog.created_at == latest_logs.c.max_time)).\
-        filter(
-            EnrichmentLog.step == Step.UNPACKING,
-            EnrichmentLog.status == Status.FAIL
-        ).subquery()
+    return _fetch(db, _FAILED_UPLINKS, {**params, "limit": limit}, stream)
 
-    uplinks = db.query(ProcessedUplink).\
-        join(latest_matching_logs, ProcessedUplink.uplink_uuid == latest_matching_logs.c.uplink_uuid).\
-        order_by(ProcessedUplink.updated_at.asc()).\
-        limit(limit).all()
 
-    results = []
-    for uplink in uplinks:
-        context = db.query(DeviceContext).filter_by(deveui=uplink.deveui).first()
-        if context and context.device_type_id != uplink.device_type_id:
-            print(f"♻️ Syncing device_type_id for DevEUI={uplink.deveui}: {uplink.device_type_id} → {context.device_type_id}")
-            uplink.device_type_id = context.device_type_id
-            db.merge(uplink)
+def _bytes_payload(payload: bytes) -> bytes:
+    if _is_hex_ascii(payload):
+        logger.debug("🔍 Payload looks like hex ASCII, decoding with fromhex()")
+        return bytes.fromhex(payload.decode("ascii"))
+    return payload
 
-        device_type = db.query(DeviceType).filter_by(device_type_id=uplink.device_type_id).first()
-        if device_type and device_type.unpacker:
-            results.append((uplink, device_type))
+def _memoryview_payload(payload: memoryview) -> bytes:
+    return _bytes_payload(payload.tobytes())
 
-    return results
+def _str_payload(payload: str) -> bytes:
+    return bytes.fromhex(payload)
 
+# processed_uplinks.payload is BYTEA (psycopg2 returns memoryview) while the
+# model declares String, so dispatch on the runtime type with one dict lookup
+_PAYLOAD_NORMALIZERS = {
+    memoryview: _memoryview_payload,
+    bytes: _bytes_payload,
+    str: _str_payload,
+}
 
 def safe_unpack_and_catch(dev_eui: str, uplink, unpacker_func):
     try:
@@ -105,44 +154,16 @@ def safe_unpack_and_catch(dev_eui: str, uplink, unpacker_func):
         if uplink.fport is None:
             raise ValueError("Missing fport")
 
-        payload = uplink.payload
-
-        # 🧪 Step 1: Convert memoryview to bytes
-        if isinstance(payload, memoryview):
-            print(f"🧪 Raw payload (type=<class 'memoryview'>): {payload}")
-            payload = payload.tobytes()
-
-        # 🧪 Step 2: Handle payload as bytes or str
-        if isinstance(payload, bytes):
-            print(f"🧪 Raw payload (type={type(payload)}): {repr(payload)}")
-            try:
-                payload_str = payload.decode("ascii")
-                is_hex_ascii = (
-                    len(payload_str) % 2 == 0 and
-                    all(c in "0123456789abcdefABCDEF" for c in payload_str)
-                )
-                if is_hex_ascii:
-                    print("🔍 Payload looks like hex ASCII, decoding with fromhex()")
-                    decoded_bytes = bytes.fromhex(payload_str)
-                    if len(decoded_bytes) >= len(payload) // 2:
-                        payload_bytes = decoded_bytes
-                    else:
-                        print("⚠️ Decoding result too short, using raw payload")
-                        payload_bytes = payload
-                else:
-                    payload_bytes = payload
-            except UnicodeDecodeError:
-                payload_bytes = payload
-
-        elif isinstance(payload, str):
-            print(f"🧪 Raw payload (type=str): {payload}")
-            payload_bytes = bytes.fromhex(payload)
-        else:
-            raise TypeError(f"Unsupported payload type: {type(payload)}")
-
-        print(f"🔁 Converting to binary for unpacking")
-        print(f"🧪 Payload HEX: {payload_bytes.hex()}")
-        print(f"🔧 Using unpacker function: {unpacker_func.__module__}.{unpacker_func.__name__}")
+        normalize = _PAYLOAD_NORMALIZERS.get(type(uplink.payload))
+        if normalize is None:
+            raise TypeError(f"Unsupported payload type: {type(uplink.payload)}")
+        payload_bytes = normalize(uplink.payload)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "🧪 Payload HEX: %s → %s.%s",
+                payload_bytes.hex(), unpacker_func.__module__, unpacker_func.__name__
+            )
 
         return unpacker_func(payload_bytes, uplink.fport)
 
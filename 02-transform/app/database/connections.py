@@ -1,6 +1,8 @@
 # connections.py - database
-# Version: 0.3.0 - 2025-07-19 20:45 UTC
+# Version: 0.4.1 - 2026-10-15 10:00 UTC
 # Changelog:
+# - Explicit query_cache_size on both engines for the compiled statement cache
+# - Sync engine pinned to psycopg2 with executemany_mode="values_plus_batch"
 # - Added sync engine and sessionmaker for CLI scripts
 # - Async engine remains default for FastAPI and background tasks
 
@@ -18,7 +20,11 @@ DB_PASSWORD = os.environ.get("TRANSFORM_DB_PASSWORD", "transformpass")
 
 # Async DB URL (FastAPI, background tasks)
 ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
+# Compiled SQL cache per engine; sized above the default 500 so every
+# filter combination of the router statements stays resident
+QUERY_CACHE_SIZE = 1200
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False, query_cache_size=QUERY_CACHE_SIZE)
 AsyncSessionLocal = sessionmaker(
     bind=async_engine,
     class_=AsyncSession,
@@ -26,8 +32,16 @@ AsyncSessionLocal = sessionmaker(
 )
 
 # Sync DB URL (CLI scripts)
-SYNC_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-sync_engine = create_engine(SYNC_DATABASE_URL)
+SYNC_DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# values_plus_batch: bulk INSERTs go out as multi-row VALUES and bulk
+# UPDATEs (bulk_update_mappings) through psycopg2's execute_batch
+sync_engine = create_engine(
+    SYNC_DATABASE_URL,
+    executemany_mode="values_plus_batch",
+    executemany_batch_page_size=500,
+    insertmanyvalues_page_size=1000,
+    query_cache_size=QUERY_CACHE_SIZE,
+)
 SyncSessionLocal = sessionmaker(bind=sync_engine, expire_on_commit=True)
 
 # ✅ FastAPI-compatible async dependency
@@ -23,3 +23,28 @@ def log_step(db, uplink_uuid, step, status, detail=""):
         created_at=datetime.utcnow()
     )
     db.add(log)
+
+def log_row(uplink_uuid, step, status, detail="", created_at=None):
+    """
+    Build an enrichment_logs mapping for log_steps_bulk().
+    Same defaults as log_step().
+    """
+    return {
+        "uplink_uuid": uplink_uuid,
+        "step": step,
+        "status": status,
+        "detail": detail or "(no detail)",
+        "created_at": created_at or datetime.utcnow(),
+    }
+
+def log_steps_bulk(db, rows):
+    """
+    Insert many enrichment_logs rows in one executemany instead of one
+    ORM flush per log_step() call.
+
+    Args:
+        db: Active SQLAlchemy session
+        rows (list[dict]): Mappings built with log_row()
+    """
+    if rows:
+        db.bulk_insert_mappings(EnrichmentLog, rows)
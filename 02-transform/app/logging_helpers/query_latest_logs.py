@@ -1,11 +1,58 @@
 # query_latest_logs.py
 # Purpose: Select uplinks whose most recent log matches a given (step, status) pair.
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import select, bindparam, case
+from constants.enrichment_steps import Status
 from models import IngestUplink, EnrichmentLog
 
-def find_uplinks_by_latest_log(db: Session, target_step: str, target_status: str, limit=100):
+# Statements are built once at import; only the bound parameters
+# (target_step, target_status, limit) change between calls, so each
+# execution is a compiled-cache hit with no query construction.
+
+# Rows written in one transaction can share created_at (NOW(), or one
+# `now` per batched run). Ties go to a settled outcome over new/pending,
+# then to log_id, so every stage picks the same row.
+_latest_logs = (
+    select(EnrichmentLog.uplink_uuid, EnrichmentLog.step, EnrichmentLog.status)
+    .distinct(EnrichmentLog.uplink_uuid)
+    .order_by(
+        EnrichmentLog.uplink_uuid,
+        EnrichmentLog.created_at.desc(),
+        case((EnrichmentLog.status.in_([Status.NEW, Status.PENDING]), 1), else_=0),
+        EnrichmentLog.log_id,
+    )
+    .subquery()
+)
+
+# uplink_uuids whose latest log is (:target_step, :target_status).
+# DISTINCT ON (uplink_uuid) ... ORDER BY uplink_uuid, created_at DESC is
+# served by idx_enrichment_logs_uplink_time instead of aggregating the
+# whole log history and joining it back.
+LATEST_MATCHING_LOGS = (
+    select(_latest_logs.c.uplink_uuid)
+    .where(
+        _latest_logs.c.step == bindparam("target_step"),
+        _latest_logs.c.status == bindparam("target_status")
+    )
+    .subquery()
+)
+
+_FIND_UPLINKS = (
+    select(IngestUplink)
+    .join(LATEST_MATCHING_LOGS, IngestUplink.uplink_uuid == LATEST_MATCHING_LOGS.c.uplink_uuid)
+    .order_by(IngestUplink.inserted_at.asc())
+    .limit(bindparam("limit"))
+)
+
+# Only the columns unpack_01/02 enrichment reads (skips error_message, last_updated, ...)
+ENRICH_COLUMNS = (
+    IngestUplink.uplink_uuid, IngestUplink.deveui, IngestUplink.timestamp,
+    IngestUplink.payload, IngestUplink.fport, IngestUplink.source,
+    IngestUplink.uplink_metadata, IngestUplink.gateway_eui, IngestUplink.inserted_at,
+)
+
+def find_uplinks_by_latest_log(db: Session, target_step: str, target_status: str, limit=100, columns=None):
     """
     Return uplinks whose latest log is exactly (target_step, target_status).
 
@@ -14,31 +61,14 @@ def find_uplinks_by_latest_log(db: Session, target_step: str, target_status: str
         target_step (str): e.g. 'enrichment'
         target_status (str): e.g. 'pending'
         limit (int): Max rows to return
+        columns (tuple): Optional IngestUplink attributes to load (load_only);
+            the rest are deferred
 
     Returns:
         List of IngestUplink rows
     """
-    subq = (
-        db.query(
-            EnrichmentLog.uplink_uuid,
-            func.max(EnrichmentLog.created_at).label("latest_time")
-        )
-        .group_by(EnrichmentLog.uplink_uuid)
-        .subquery()
-    )
-
-    matching = (
-        db.query(EnrichmentLog.uplink_uuid)
-        .join(subq, (EnrichmentLog.uplink_uuid == subq.c.uplink_uuid) & (EnrichmentLog.created_at == subq.c.latest_time))
-        .filter(EnrichmentLog.step == target_step)
-        .filter(EnrichmentLog.status == target_status)
-        .subquery()
-    )
-
-    return (
-        db.query(IngestUplink)
-        .join(matching, IngestUplink.uplink_uuid == matching.c.uplink_uuid)
-        .order_by(IngestUplink.inserted_at.asc())
-        .limit(limit)
-        .all()
-    )
+    stmt = _FIND_UPLINKS.options(load_only(*columns)) if columns else _FIND_UPLINKS
+    return db.execute(
+        stmt,
+        {"target_step": target_step, "target_status": target_status, "limit": limit}
+    ).scalars().all()
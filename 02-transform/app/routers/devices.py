@@ -1,20 +1,36 @@
 # app/routers/devices.py
-# Version: 0.5.1 - 2025-08-20 07:17 UTC
+# Version: 0.8.6 - 2026-10-15 10:00 UTC
 # Changelog:
+# - Suggestions query is a module-level text() with typed bind and result columns
+# - GET /devices serializes the list in one pydantic-core dump_json() call
+# - updated_at comes from the column's onupdate=func.now(); assigned_at uses now() in SQL
+# - DevEUI lookups match upper(deveui) (idx_devctx_deveui_upper), not the stored case
+# - /locations/hierarchy: SQL filters and orders by type; rows are grouped in one groupby pass
+# - Response schemas validate from attributes (rows/ORM objects), no intermediate dicts
+# - PUT /devices/{deveui}: UPDATE ... RETURNING + one listing query, no refresh()
+# - Key-path tables are compiled into straight-line extractor functions at import
+# - extract_metadata dispatches on source via _EXTRACTORS and module-level key paths
+# - /full-metadata fetches plain column tuples instead of IngestUplink objects
+# - last_uplink subquery uses DISTINCT ON (deveui) over idx_pu_deveui_ts
+# - Added PUT /devices: batch updates via UPDATE ... FROM (VALUES ...)
+# - GET /devices is a module-level select(); filters bind by name
+# - enrich_device_data reads the type name from the eager-loaded relationship
+# - GET /devices loads type name, location name and last uplink in one query
 # - Added `last_uplink` field to GET /devices based on latest processed uplink
 # - Uses subquery on transform.processed_uplinks.timestamp
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
-from sqlalchemy import text
+from sqlalchemy import text, and_, select, bindparam, update, values, column, cast, String, Integer, Float
 from typing import List, Dict, Optional, Any
 from database.connections import get_sync_db_session
 from models import DeviceContext, DeviceType, IngestUplink, ProcessedUplink, Location as LocationORM
 from datetime import datetime
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, validator, TypeAdapter
 import uuid
 import json
+from itertools import groupby
 
 router = APIRouter()
 
@@ -45,17 +61,24 @@ class DeviceUpdate(BaseModel):
     zone_id: Optional[str] = None
     lifecycle_state: Optional[str] = None
 
+class DeviceBulkUpdate(DeviceUpdate):
+    deveui: str
+
+class BulkUpdateResult(BaseModel):
+    updated: List[str]
+    not_found: List[str]
+
 class DeviceOut(BaseModel):
     deveui: str
     name: Optional[str]
     device_type_id: Optional[int]
     device_type: Optional[str] = None
-    location_id: Optional[str]
+    location_id: Optional[uuid.UUID]
     location_name: Optional[str] = None
-    site_id: Optional[str]
-    floor_id: Optional[str]
-    room_id: Optional[str]
-    zone_id: Optional[str]
+    site_id: Optional[uuid.UUID]
+    floor_id: Optional[uuid.UUID]
+    room_id: Optional[uuid.UUID]
+    zone_id: Optional[uuid.UUID]
     last_gateway: Optional[str]
     lifecycle_state: Optional[str]
     created_at: Optional[datetime]
@@ -64,13 +87,19 @@ class DeviceOut(BaseModel):
     unassigned_at: Optional[datetime]
     last_uplink: Optional[datetime] = None
 
+    class Config:
+        from_attributes = True
+
 class DeviceTypeOut(BaseModel):
     device_type_id: int
     device_type: str
     description: Optional[str]
     unpacker: Optional[str]
     created_at: Optional[datetime]
-    
+
+    class Config:
+        from_attributes = True
+
 class DeviceConfig(BaseModel):
     device_type_id: int
     location_id: str
@@ -78,10 +107,13 @@ class DeviceConfig(BaseModel):
     assigned_at: datetime
 
 class LocationResponse(BaseModel):
-    location_id: str
+    location_id: uuid.UUID
     name: str
     type: str
-    parent_id: Optional[str] = None
+    parent_id: Optional[uuid.UUID] = None
+
+    class Config:
+        from_attributes = True
 
 class LocationHierarchy(BaseModel):
     sites: List[LocationResponse]
@@ -96,38 +128,68 @@ class SmartSuggestion(BaseModel):
     confidence: float
     recent_usage: int
 
-# -----------------------------
-# UTILITY: Device with Relationships + Last Seen
-# -----------------------------
-def enrich_device_data(db: Session, device: DeviceContext) -> Dict:
-    """Enrich device data with related information"""
-    data = device.as_dict()
-
-    # Add device type name
-    if device.device_type_id:
-        dt = db.query(DeviceType).filter_by(device_type_id=device.device_type_id).first()
-        if dt:
-            data["device_type"] = dt.device_type
-
-    # Add location name
-    if device.location_id:
-        loc = db.query(LocationORM).filter_by(location_id=device.location_id, archived_at=None).first()
-        if loc:
-            data["location_name"] = loc.name
-
-    # Add last seen timestamp from processed uplinks
-    last_uplink = (
-        db.query(func.max(ProcessedUplink.timestamp))
-        .filter(ProcessedUplink.deveui == device.deveui)
-        .scalar()
-    )
-    data["last_uplink"] = last_uplink
-
-    return data
+    class Config:
+        from_attributes = True
 
 # -----------------------------
 # GET /devices
 # -----------------------------
+# Latest uplink timestamp per device, read in index order from
+# idx_pu_deveui_ts (deveui, timestamp DESC) rather than aggregated.
+# NULL timestamps are skipped so the result matches max(timestamp).
+_last_uplink_sq = (
+    select(
+        ProcessedUplink.deveui,
+        ProcessedUplink.timestamp.label("max_ts")
+    )
+    .distinct(ProcessedUplink.deveui)
+    .where(ProcessedUplink.timestamp.isnot(None))
+    .order_by(ProcessedUplink.deveui, ProcessedUplink.timestamp.desc())
+    .subquery()
+)
+
+# Device, type name, live location name and last uplink in one round-trip,
+# selected as flat columns named after the DeviceOut fields.
+# Built once; get_devices only appends bound-parameter filters, so each
+# filter combination compiles once and is then served from the engine cache.
+_DEVICE_LISTING = (
+    select(
+        DeviceContext.deveui, DeviceContext.name, DeviceContext.device_type_id,
+        DeviceType.device_type,
+        DeviceContext.location_id, LocationORM.name.label("location_name"),
+        DeviceContext.site_id, DeviceContext.floor_id, DeviceContext.room_id, DeviceContext.zone_id,
+        DeviceContext.last_gateway, DeviceContext.lifecycle_state,
+        DeviceContext.created_at, DeviceContext.updated_at,
+        DeviceContext.assigned_at, DeviceContext.unassigned_at,
+        _last_uplink_sq.c.max_ts.label("last_uplink")
+    )
+    .outerjoin(DeviceType, DeviceContext.device_type_id == DeviceType.device_type_id)
+    .outerjoin(LocationORM, and_(
+        DeviceContext.location_id == LocationORM.location_id,
+        LocationORM.archived_at.is_(None)
+    ))
+    .outerjoin(_last_uplink_sq, _last_uplink_sq.c.deveui == DeviceContext.deveui)
+    .where(DeviceContext.archived_at.is_(None))
+)
+
+# Query parameter -> column it filters on
+_DEVICE_FILTERS = {
+    "device_type": DeviceType.device_type,
+    "location_id": DeviceContext.location_id,
+    "site_id": DeviceContext.site_id,
+    "floor_id": DeviceContext.floor_id,
+    "room_id": DeviceContext.room_id,
+    "zone_id": DeviceContext.zone_id,
+    "lifecycle_state": DeviceContext.lifecycle_state,
+}
+
+# :deveui is passed uppercased; upper(deveui) matches rows stored in any case
+_DEVICE_BY_EUI = _DEVICE_LISTING.where(func.upper(DeviceContext.deveui) == bindparam("deveui"))
+
+# Encodes the whole listing to JSON bytes in pydantic-core, skipping
+# FastAPI's per-field jsonable_encoder pass over every device
+_DEVICE_LIST_JSON = TypeAdapter(List[DeviceOut])
+
 @router.get("", response_model=List[DeviceOut])
 def get_devices(
     db: Session = Depends(get_sync_db_session),
@@ -141,117 +203,183 @@ def get_devices(
     assigned_only: Optional[bool] = None
 ):
     """Get all devices with optional filtering"""
-    query = db.query(DeviceContext).filter(DeviceContext.archived_at == None)
-
-    if device_type:
-        query = query.join(DeviceType).filter(DeviceType.device_type == device_type)
-    if location_id:
-        query = query.filter(DeviceContext.location_id == location_id)
-    if site_id:
-        query = query.filter(DeviceContext.site_id == site_id)
-    if floor_id:
-        query = query.filter(DeviceContext.floor_id == floor_id)
-    if room_id:
-        query = query.filter(DeviceContext.room_id == room_id)
-    if zone_id:
-        query = query.filter(DeviceContext.zone_id == zone_id)
-    if lifecycle_state:
-        query = query.filter(DeviceContext.lifecycle_state == lifecycle_state)
+    given = {
+        "device_type": device_type,
+        "location_id": location_id,
+        "site_id": site_id,
+        "floor_id": floor_id,
+        "room_id": room_id,
+        "zone_id": zone_id,
+        "lifecycle_state": lifecycle_state,
+    }
+    params = {name: value for name, value in given.items() if value}
+
+    stmt = _DEVICE_LISTING
+    for name in params:
+        stmt = stmt.where(_DEVICE_FILTERS[name] == bindparam(name))
     if assigned_only is True:
-        query = query.filter(DeviceContext.location_id.isnot(None))
+        stmt = stmt.where(DeviceContext.location_id.isnot(None))
     elif assigned_only is False:
-        query = query.filter(DeviceContext.location_id.is_(None))
-
-    devices = query.all()
-    return [DeviceOut(**enrich_device_data(db, device)) for device in devices]
+        stmt = stmt.where(DeviceContext.location_id.is_(None))
 
+    devices = [DeviceOut.model_validate(row) for row in db.execute(stmt, params).all()]
+    return Response(_DEVICE_LIST_JSON.dump_json(devices), media_type="application/json")
 
 # -----------------------------
 # GET /devices/full-metadata
 # -----------------------------
+def _walk(node, path):
+    """Follow a key path through nested dicts/lists; None if any step is missing"""
+    for key in path:
+        try:
+            node = node[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return node
+
+_LOOKUP_MISSES = (KeyError, IndexError, TypeError)
+
+def _compile_paths(name: str, paths: dict):
+    """
+    Generate a function equivalent to
+    {field: _walk(node, path) for field, path in paths.items()}
+    as straight-line code: one try/except per key, and each shared
+    prefix (e.g. CustomerData) looked up once into a local.
+    Only used on the module-level path tables below, never on input data.
+    """
+    lines = [f"def {name}(node):"]
+    local_for = {(): "node"}
+
+    def resolve(prefix):
+        if prefix not in local_for:
+            parent = resolve(prefix[:-1])
+            local = f"n{len(local_for)}"
+            lines.append(f"    try:\n        {local} = {parent}[{prefix[-1]!r}]")
+            lines.append(f"    except _LOOKUP_MISSES:\n        {local} = None")
+            local_for[prefix] = local
+        return local_for[prefix]
+
+    fields = [f"{field!r}: {resolve(tuple(path))}" for field, path in paths.items()]
+    lines.append("    return {" + ", ".join(fields) + "}")
+
+    namespace = {"_LOOKUP_MISSES": _LOOKUP_MISSES}
+    exec(compile("\n".join(lines), f"<extractor {name}>", "exec"), namespace)
+    return namespace[name]
+
+# Key paths per source, resolved once at import
+
+# Relative to meta["DevEUI_uplink"]
+_ACTILITY_PATHS = {
+    "deveui": ("DevEUI",),
+    "last_uplink": ("Time",),
+    "fport": ("FPort",),
+    "rssi": ("LrrRSSI",),
+    "snr": ("LrrSNR",),
+    "gateway_eui": ("Lrrid",),
+    "gateway_name": ("BaseStationData", "name"),
+    "device_label": ("CustomerData", "name"),
+    "device_group": ("CustomerData", "doms", 0, "n"),
+    "device_model": ("DriverCfg", "mod", "pId"),
+    "device_type_lns": ("CustomerData", "alr", "pro"),
+}
+
+_NETMORE_PATHS = {
+    "deveui": ("devEui",),
+    "last_uplink": ("timestamp",),
+    "gateway_eui": ("gatewayIdentifier",),
+    "device_type_lns": ("sensorType",),
+}
+
+# Numeric netmore fields: (key, type); missing or empty values become 0
+_NETMORE_NUMBERS = {
+    "fport": ("fPort", int),
+    "rssi": ("rssi", int),
+    "snr": ("snr", float),
+}
+
+# Relative to uplink_message (or uplink_normalized)
+_TTI_UPLINK_PATHS = {
+    "fport": ("f_port",),
+    "rssi": ("rx_metadata", 0, "rssi"),
+    "snr": ("rx_metadata", 0, "snr"),
+    "gateway_eui": ("rx_metadata", 0, "gateway_ids", "eui"),
+    "gateway_id": ("rx_metadata", 0, "gateway_ids", "gateway_id"),
+    "device_model": ("version_ids", "model_id"),
+    "device_vendor": ("version_ids", "brand_id"),
+}
+
+_actility_fields = _compile_paths("_actility_fields", _ACTILITY_PATHS)
+_netmore_fields = _compile_paths("_netmore_fields", _NETMORE_PATHS)
+_tti_uplink_fields = _compile_paths("_tti_uplink_fields", _TTI_UPLINK_PATHS)
+
+def _extract_actility(meta: dict) -> dict:
+    if "DevEUI_uplink" not in meta:
+        return {}
+    return _actility_fields(meta["DevEUI_uplink"])
+
+def _extract_netmore(meta: dict) -> dict:
+    result = _netmore_fields(meta)
+    for field, (key, number) in _NETMORE_NUMBERS.items():
+        result[field] = number(meta.get(key) or 0)
+    return result
+
+def _extract_tti(meta: dict) -> dict:
+    uplink = meta.get("uplink_message") or meta.get("uplink_normalized") or {}
+    result = {
+        "deveui": _walk(meta, ("end_device_ids", "dev_eui")),
+        "last_uplink": uplink.get("received_at") or meta.get("received_at"),
+    }
+    result.update(_tti_uplink_fields(uplink))
+    return result
+
+_EXTRACTORS = {
+    "actility": _extract_actility,
+    "netmore": _extract_netmore,
+    "tti": _extract_tti,
+}
+
 def extract_metadata(source: str, meta: dict) -> dict:
-    result = {}
+    extractor = _EXTRACTORS.get(source)
+    if extractor is None:
+        return {}
 
     try:
-        if source == "actility" and "DevEUI_uplink" in meta:
-            uplink = meta["DevEUI_uplink"]
-            result.update({
-                "deveui": uplink.get("DevEUI"),
-                "last_uplink": uplink.get("Time"),
-                "fport": uplink.get("FPort"),
-                "rssi": uplink.get("LrrRSSI"),
-                "snr": uplink.get("LrrSNR"),
-                "gateway_eui": uplink.get("Lrrid"),
-                "gateway_name": uplink.get("BaseStationData", {}).get("name"),
-                "device_label": uplink.get("CustomerData", {}).get("name"),
-                "device_group": uplink.get("CustomerData", {}).get("doms", [{}])[0].get("n"),
-                "device_model": uplink.get("DriverCfg", {}).get("mod", {}).get("pId"),
-                "device_type_lns": uplink.get("CustomerData", {}).get("alr", {}).get("pro")
-            })
-
-        elif source == "netmore":
-            result.update({
-                "deveui": meta.get("devEui"),
-                "last_uplink": meta.get("timestamp"),
-                "fport": int(meta.get("fPort") or 0),
-                "rssi": int(meta.get("rssi") or 0),
-                "snr": float(meta.get("snr") or 0),
-                "gateway_eui": meta.get("gatewayIdentifier"),
-                "device_type_lns": meta.get("sensorType")
-            })
-
-        elif source == "tti":
-            ids = meta.get("end_device_ids", {})
-            uplink = meta.get("uplink_message") or meta.get("uplink_normalized") or {}
-            rx = (uplink.get("rx_metadata") or [{}])[0]
-            version = uplink.get("version_ids", {})
-
-            result.update({
-                "deveui": ids.get("dev_eui"),
-                "last_uplink": uplink.get("received_at") or meta.get("received_at"),
-                "fport": uplink.get("f_port"),
-                "rssi": rx.get("rssi"),
-                "snr": rx.get("snr"),
-                "gateway_eui": rx.get("gateway_ids", {}).get("eui"),
-                "gateway_id": rx.get("gateway_ids", {}).get("gateway_id"),
-                "device_model": version.get("model_id"),
-                "device_vendor": version.get("brand_id")
-            })
-
+        return extractor(meta)
     except Exception as e:
-        result["parse_error"] = str(e)
+        return {"parse_error": str(e)}
 
-    return result
 
+_latest_ingest_sq = (
+    select(
+        IngestUplink.deveui,
+        func.max(IngestUplink.timestamp).label("max_ts")
+    )
+    .group_by(IngestUplink.deveui)
+    .subquery()
+)
+
+# Read-only: plain column tuples, no IngestUplink instances or identity map
+_LATEST_INGEST_METADATA = (
+    select(IngestUplink.deveui, IngestUplink.source, IngestUplink.timestamp, IngestUplink.uplink_metadata)
+    .join(_latest_ingest_sq, and_(
+        IngestUplink.deveui == _latest_ingest_sq.c.deveui,
+        IngestUplink.timestamp == _latest_ingest_sq.c.max_ts
+    ))
+)
 
 @router.get("/full-metadata")
 def get_full_device_metadata(db: Session = Depends(get_sync_db_session)) -> List[Dict[str, Any]]:
     """Get latest uplink metadata for each known device from ingest_uplinks"""
-    subquery = (
-        db.query(
-            IngestUplink.deveui,
-            func.max(IngestUplink.timestamp).label("max_ts")
-        )
-        .group_by(IngestUplink.deveui)
-        .subquery()
-    )
-
-    results = (
-        db.query(IngestUplink)
-        .join(subquery, (IngestUplink.deveui == subquery.c.deveui) & (IngestUplink.timestamp == subquery.c.max_ts))
-        .all()
-    )
-
     enriched = []
-    for row in results:
+    for deveui, source, timestamp, uplink_metadata in db.execute(_LATEST_INGEST_METADATA):
         base = {
-            "deveui": row.deveui,
-            "source": row.source,
-            "timestamp": row.timestamp
+            "deveui": deveui,
+            "source": source,
+            "timestamp": timestamp
         }
         try:
-            meta = row.uplink_metadata or {}
-            enriched_meta = extract_metadata(row.source, meta)
+            meta = uplink_metadata or {}
+            enriched_meta = extract_metadata(source, meta)
             base.update(enriched_meta)
         except Exception as e:
             base["parse_error"] = str(e)
@@ -264,64 +392,106 @@ def get_full_device_metadata(db: Session = Depends(get_sync_db_session)) -> List
 # PUT /devices/{deveui} - Update Device Assignment
 # -----------------------------
 @router.put("/{deveui}", response_model=DeviceOut)
-def update_device(deveui: str, update: DeviceUpdate, db: Session = Depends(get_sync_db_session)):
+def update_device(deveui: str, payload: DeviceUpdate, db: Session = Depends(get_sync_db_session)):
     """Update existing device assignment (type, location, name)"""
-    device = db.query(DeviceContext).filter_by(deveui=deveui.upper(), archived_at=None).first()
-    if not device:
+    deveui = deveui.upper()
+
+    # Update only provided fields; updated_at is set by the column's onupdate
+    changes = payload.dict(exclude_unset=True)
+    if payload.location_id:
+        changes["assigned_at"] = func.now()
+
+    updated = db.execute(
+        update(DeviceContext)
+        .where(func.upper(DeviceContext.deveui) == deveui, DeviceContext.archived_at.is_(None))
+        .values(**changes)
+        .returning(DeviceContext.deveui)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    if not updated:
         raise HTTPException(status_code=404, detail="Device not found")
 
-    # Update only provided fields
-    for key, value in update.dict(exclude_unset=True).items():
-        if hasattr(device, key):
-            setattr(device, key, value)
-    
-    # Update timestamps
-    device.updated_at = datetime.utcnow()
-    if update.location_id:
-        device.assigned_at = datetime.utcnow()
+    # Same transaction, so the listing row already reflects the update
+    device = DeviceOut.model_validate(db.execute(_DEVICE_BY_EUI, {"deveui": deveui}).one())
+    db.commit()
+    return device
 
+# -----------------------------
+# PUT /devices - Batch Update Device Assignments
+# -----------------------------
+_device_table = DeviceContext.__table__
+
+def _bulk_update_statement(keys, rows, assign: bool):
+    """
+    UPDATE device_context SET ... FROM (VALUES ...) for rows sharing the same keys.
+    updated_at comes from the column's onupdate; assign also sets assigned_at = now().
+    """
+    data = values(*[column(key, _device_table.c[key].type) for key in keys], name="data").data(
+        [tuple(row[key] for key in keys) for row in rows]
+    )
+    return (
+        update(_device_table)
+        .where(func.upper(_device_table.c.deveui) == data.c.deveui, _device_table.c.archived_at.is_(None))
+        # cast: a VALUES column that is NULL in every row is typed text
+        .values({key: cast(data.c[key], _device_table.c[key].type) for key in keys if key != "deveui"})
+        .values(**({"assigned_at": func.now()} if assign else {}))
+        .returning(func.upper(_device_table.c.deveui))
+    )
+
+@router.put("", response_model=BulkUpdateResult)
+def update_devices(updates: List[DeviceBulkUpdate], db: Session = Depends(get_sync_db_session)):
+    """Update many device assignments in one transaction (same rules as PUT /devices/{deveui})"""
+    # One statement per distinct set of provided fields, not one per device
+    groups = {}
+    for item in updates:
+        row = item.dict(exclude_unset=True)
+        row["deveui"] = item.deveui.upper()
+        groups.setdefault((tuple(sorted(row)), bool(item.location_id)), []).append(row)
+
+    updated = []
+    for (keys, assign), rows in groups.items():
+        updated.extend(db.execute(_bulk_update_statement(keys, rows, assign)).scalars().all())
     db.commit()
-    db.refresh(device)
-    return DeviceOut(**enrich_device_data(db, device))
+
+    requested = [item.deveui.upper() for item in updates]
+    found = set(updated)
+    return BulkUpdateResult(
+        updated=updated,
+        not_found=[deveui for deveui in requested if deveui not in found]
+    )
 
 @router.get("/device-types", response_model=List[DeviceTypeOut])
 def get_device_types(db: Session = Depends(get_sync_db_session)):
     """Get all available device types for the dropdown."""
     query = db.query(DeviceType).filter(DeviceType.archived_at == None).order_by(DeviceType.device_type)
     device_types = query.all()
-    return [DeviceTypeOut(**d.__dict__) for d in device_types]
+    return [DeviceTypeOut.model_validate(d) for d in device_types]
+
+# Location type -> LocationHierarchy field
+_HIERARCHY_KEYS = {"site": "sites", "floor": "floors", "room": "rooms", "zone": "zones"}
+
+# Served by idx_locations_live_type_name
+_LIVE_LOCATIONS_BY_TYPE = (
+    select(LocationORM.location_id, LocationORM.name, LocationORM.type, LocationORM.parent_id)
+    .where(LocationORM.archived_at.is_(None), LocationORM.type.in_(list(_HIERARCHY_KEYS)))
+    .order_by(LocationORM.type, LocationORM.name)
+)
 
 @router.get("/locations/hierarchy", response_model=LocationHierarchy)
 def get_location_hierarchy(db: Session = Depends(get_sync_db_session)):
     """Get location hierarchy for cascading selectors."""
-    locations = db.query(LocationORM).filter(LocationORM.archived_at == None).order_by(LocationORM.type, LocationORM.name).all()
-    
-    # Group by type
-    hierarchy = {
-        'sites': [],
-        'floors': [],
-        'rooms': [],
-        'zones': []
-    }
-    
-    for loc in locations:
-        location_response = LocationResponse(**loc.__dict__)
-        if location_response.type == 'site':
-            hierarchy['sites'].append(location_response)
-        elif location_response.type == 'floor':
-            hierarchy['floors'].append(location_response)
-        elif location_response.type == 'room':
-            hierarchy['rooms'].append(location_response)
-        elif location_response.type == 'zone':
-            hierarchy['zones'].append(location_response)
-    
+    hierarchy = {key: [] for key in _HIERARCHY_KEYS.values()}
+
+    # Rows arrive ordered by (type, name), so each type is one contiguous run
+    rows = db.execute(_LIVE_LOCATIONS_BY_TYPE).all()
+    for loc_type, group in groupby(rows, key=lambda row: row.type):
+        hierarchy[_HIERARCHY_KEYS[loc_type]] = [LocationResponse.model_validate(row) for row in group]
+
     return LocationHierarchy(**hierarchy)
 
-@router.get("/{deveui}/suggestions", response_model=List[SmartSuggestion])
-def get_device_suggestions(deveui: str, db: Session = Depends(get_sync_db_session)):
-    """Get smart device type suggestions based on payload analysis."""
-    # This query analyzes recent payloads to suggest device types
-    query = """
+# This query analyzes recent payloads to suggest device types.
+# Built once with typed bind/result columns so the compiled form is reused.
+_SUGGESTIONS = text("""
     WITH recent_payloads AS (
         SELECT 
             pu.payload_decoded,
@@ -352,11 +522,20 @@ def get_device_suggestions(deveui: str, db: Session = Depends(get_sync_db_sessio
     FROM confidence_scores
     ORDER BY confidence DESC
     LIMIT 5
-    """
-    
-    # Execute the raw SQL query
-    result = db.execute(text(query), {'deveui': deveui.upper()})
-    suggestions = result.fetchall()
-    
+""").bindparams(
+    bindparam("deveui", type_=String)
+).columns(
+    device_type_id=Integer,
+    device_type=String,
+    description=String,
+    confidence=Float,
+    recent_usage=Integer
+)
+
+@router.get("/{deveui}/suggestions", response_model=List[SmartSuggestion])
+def get_device_suggestions(deveui: str, db: Session = Depends(get_sync_db_session)):
+    """Get smart device type suggestions based on payload analysis."""
+    suggestions = db.execute(_SUGGESTIONS, {"deveui": deveui.upper()}).all()
+
     # Convert results to Pydantic models
-    return [SmartSuggestion(**dict(s._mapping)) for s in suggestions]
+    return [SmartSuggestion.model_validate(s) for s in suggestions]
@@ -1,11 +1,17 @@
 # routers/gateways.py
-# Version: 0.3.1 - 2025-08-05 13:25 UTC
+# Version: 0.4.4 - 2026-10-15 10:00 UTC
 # Changelog:
+# - archive_gateway confirm path is one core UPDATE ... RETURNING; only the dry run reads the row
+# - create_gateway is one INSERT ... ON CONFLICT DO NOTHING RETURNING (no pre-check)
+# - Sessions come from Depends(get_sync_db_session) like routers/devices.py
+# - create/update use INSERT/UPDATE ... RETURNING instead of commit() + refresh()
 # - Fixed GET /gateways/{gw_eui} to return archived gateways
 # - Allows unarchiving from UI
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from sqlalchemy.orm import Session
+from sqlalchemy import update, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import List, Dict
 from database.connections import get_sync_db_session
 from models import Gateway
@@ -16,80 +22,74 @@ router = APIRouter(tags=["Gateways"])
 
 @router.get("", response_model=List[GatewayOut])
 @router.get("/", response_model=List[GatewayOut])
-def list_gateways(includeArchived: bool = Query(False)):
-    db_gen = get_sync_db_session()
-    db = next(db_gen)
-    try:
-        query = db.query(Gateway)
-        if not includeArchived:
-            query = query.filter(Gateway.archived_at == None)
-        gateways = query.all()
-        return gateways
-    finally:
-        db_gen.close()
+def list_gateways(includeArchived: bool = Query(False), db: Session = Depends(get_sync_db_session)):
+    query = db.query(Gateway)
+    if not includeArchived:
+        query = query.filter(Gateway.archived_at == None)
+    gateways = query.all()
+    return gateways
 
 @router.get("/{gw_eui}", response_model=GatewayOut)
-def get_gateway(gw_eui: str):
-    db_gen = get_sync_db_session()
-    db = next(db_gen)
-    try:
-        gateway = db.query(Gateway).filter_by(gw_eui=gw_eui).first()  # ✅ no archived filter
-        if not gateway:
-            raise HTTPException(status_code=404, detail="Gateway not found")
-        return gateway
-    finally:
-        db_gen.close()
+def get_gateway(gw_eui: str, db: Session = Depends(get_sync_db_session)):
+    gateway = db.query(Gateway).filter_by(gw_eui=gw_eui).first()  # ✅ no archived filter
+    if not gateway:
+        raise HTTPException(status_code=404, detail="Gateway not found")
+    return gateway
 
 @router.post("/", response_model=GatewayOut)
-def create_gateway(payload: GatewayIn):
-    db_gen = get_sync_db_session()
-    db = next(db_gen)
-    try:
-        if db.query(Gateway).filter_by(gw_eui=payload.gw_eui, archived_at=None).first():
-            raise HTTPException(status_code=400, detail="Gateway already exists")
-        new_gateway = Gateway(**payload.dict())
-        db.add(new_gateway)
-        db.commit()
-        db.refresh(new_gateway)
-        return new_gateway
-    finally:
-        db_gen.close()
+def create_gateway(payload: GatewayIn, db: Session = Depends(get_sync_db_session)):
+    # gw_eui is the primary key: no row back means it already exists
+    new_gateway = db.execute(
+        pg_insert(Gateway)
+        .values(**payload.dict())
+        .on_conflict_do_nothing(index_elements=[Gateway.gw_eui])
+        .returning(Gateway)
+    ).scalar_one_or_none()
+    if new_gateway is None:
+        raise HTTPException(status_code=400, detail="Gateway already exists")
+    # Serialize before commit() expires the returned row
+    result = GatewayOut.model_validate(new_gateway)
+    db.commit()
+    return result
 
 @router.put("/{gw_eui}", response_model=GatewayOut)
-def update_gateway(gw_eui: str, update: GatewayUpdate):
-    db_gen = get_sync_db_session()
-    db = next(db_gen)
-    try:
-        gateway = db.query(Gateway).filter_by(gw_eui=gw_eui).first()  # ✅ also include archived
-        if not gateway:
-            raise HTTPException(status_code=404, detail="Gateway not found")
-        for key, value in update.dict(exclude_unset=True).items():
-            setattr(gateway, key, value)
-        db.commit()
-        db.refresh(gateway)
-        return gateway
-    finally:
-        db_gen.close()
+def update_gateway(gw_eui: str, payload: GatewayUpdate, db: Session = Depends(get_sync_db_session)):
+    gateway = db.execute(
+        update(Gateway)
+        .where(Gateway.gw_eui == gw_eui)  # ✅ also include archived
+        .values(**payload.dict(exclude_unset=True))
+        .returning(Gateway)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    if not gateway:
+        raise HTTPException(status_code=404, detail="Gateway not found")
+    result = GatewayOut.model_validate(gateway)
+    db.commit()
+    return result
 
 @router.patch("/{gw_eui}/archive", response_model=Dict)
-def archive_gateway(gw_eui: str, confirm: bool = Query(False)):
+def archive_gateway(gw_eui: str, confirm: bool = Query(False), db: Session = Depends(get_sync_db_session)):
     """Soft-archive a gateway by setting `archived_at`"""
-    db_gen = get_sync_db_session()
-    db = next(db_gen)
-    try:
-        gateway = db.query(Gateway).filter_by(gw_eui=gw_eui, archived_at=None).first()
-        if not gateway:
+    if not confirm:
+        found = db.execute(
+            select(Gateway.gw_eui).where(Gateway.gw_eui == gw_eui, Gateway.archived_at.is_(None))
+        ).scalar_one_or_none()
+        if not found:
             raise HTTPException(status_code=404, detail="Gateway not found")
+        return {
+            "dry_run": True,
+            "gw_eui": found,
+            "confirm_url": f"/v1/gateways/{gw_eui}/archive?confirm=true"
+        }
 
-        if not confirm:
-            return {
-                "dry_run": True,
-                "gw_eui": gateway.gw_eui,
-                "confirm_url": f"/v1/gateways/{gw_eui}/archive?confirm=true"
-            }
-
-        gateway.archived_at = datetime.utcnow()
-        db.commit()
-        return {"archived": True, "gw_eui": gw_eui}
-    finally:
-        db_gen.close()
+    archived = db.execute(
+        update(Gateway)
+        .where(Gateway.gw_eui == gw_eui, Gateway.archived_at.is_(None))
+        .values(archived_at=datetime.utcnow())
+        .returning(Gateway.gw_eui)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    if not archived:
+        raise HTTPException(status_code=404, detail="Gateway not found")
+    db.commit()
+    return {"archived": True, "gw_eui": gw_eui}
@@ -1,18 +1,30 @@
 # locations.py - Location API Router
-# Version: 0.3.3
-# Last Updated: 2025-08-05 17:25 UTC+2
+# Version: 0.5.2
+# Last Updated: 2026-10-15 10:00 UTC
 # Changelog:
+# - Tree nodes grouped with defaultdict(list) by parent_id; roots are the None bucket
+# - Tree nesting walks from the roots with an explicit stack and a seen set (cycle-safe)
+# - Descendants CTE uses UNION so a parent_id cycle cannot recurse forever
+# - All endpoints async on AsyncSession via Depends(get_db_session); writes use RETURNING
+# - GET /locations selects plain columns and returns row mappings (no ORM instances)
+# - Archive runs as one UPDATE ... FROM the descendants CTE; dry run is one SELECT
+# - GET /tree caches and returns the encoded JSON body, not the dict tree
+# - Tree nesting is one linear attach pass plus one sort per sibling list (no recursion)
+# - GET /tree served from an in-process cache, cleared by every write endpoint
 # - Loggind and defensive logic for nesting
 
 
-from fastapi import APIRouter, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from fastapi import APIRouter, HTTPException, Query, Response, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, select, insert, update
 from typing import List, Dict, Optional
-from database.connections import get_sync_db_session
+from database.connections import get_db_session
 from models import Location
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
+import time
+from collections import defaultdict
+import uuid
 
 router = APIRouter()
 
@@ -31,10 +43,10 @@ class LocationUpdate(BaseModel):
     parent_id: Optional[str] = None
 
 class LocationOut(BaseModel):
-    location_id: str
+    location_id: uuid.UUID
     name: str
     type: str
-    parent_id: Optional[str]
+    parent_id: Optional[uuid.UUID]
     uplink_metadata: Optional[Dict]
     created_at: Optional[datetime]
     updated_at: Optional[datetime]
@@ -43,19 +55,31 @@ class LocationOut(BaseModel):
 # ─────────────────────────────────────────────────────────────
 # UTILITY: Recursive Location Tree
 # ─────────────────────────────────────────────────────────────
-def get_descendant_location_ids(db: Session, root_id: str) -> List[str]:
-    query = text("""
-        WITH RECURSIVE descendants AS (
-            SELECT location_id FROM transform.locations WHERE location_id = :root_id
-            UNION ALL
-            SELECT l.location_id
-            FROM transform.locations l
-            JOIN descendants d ON l.parent_id = d.location_id
-        )
-        SELECT location_id FROM descendants;
-    """)
-    result = db.execute(query, {"root_id": root_id})
-    return [row[0] for row in result.fetchall()]
+_DESCENDANTS_CTE = """
+    WITH RECURSIVE descendants AS (
+        SELECT location_id FROM transform.locations WHERE location_id = :root_id
+        UNION
+        SELECT l.location_id
+        FROM transform.locations l
+        JOIN descendants d ON l.parent_id = d.location_id
+    )
+"""
+
+# Root and every descendant, with names (archive dry run)
+_SUBTREE = text(_DESCENDANTS_CTE + """
+    SELECT l.location_id, l.name
+    FROM transform.locations l
+    JOIN descendants d ON l.location_id = d.location_id;
+""")
+
+# Archive root and every descendant in one statement
+_ARCHIVE_SUBTREE = text(_DESCENDANTS_CTE + """
+    UPDATE transform.locations l
+    SET archived_at = now()
+    FROM descendants d
+    WHERE l.location_id = d.location_id
+    RETURNING l.location_id;
+""")
 
 # ─────────────────────────────────────────────────────────────
 # GET /locations/tree
@@ -72,10 +96,30 @@ class LocationTreeOut(BaseModel):
 
 LocationTreeOut.update_forward_refs()
 
+_TREE_JSON = TypeAdapter(List[LocationTreeOut])
+
+# Encoded tree per `archived` filter: {archived: (built_at, json_bytes)}.
+# Hits return the bytes as-is: no per-node validation or encoding.
+# Every write endpoint below clears it; the TTL only bounds staleness
+# from writes made outside this API (SQL console, other services).
+_TREE_CACHE: Dict[str, tuple] = {}
+_TREE_TTL_SECONDS = 60
+
+def invalidate_tree_cache():
+    _TREE_CACHE.clear()
+
+def _name_key(node: Dict) -> str:
+    return node["name"].lower()
+
 @router.get("/tree", response_model=List[LocationTreeOut])
-def get_location_tree(archived: str = Query("false", pattern="^(true|false|all)$")):
-    db_gen = get_sync_db_session()
-    db = next(db_gen)
+async def get_location_tree(
+    archived: str = Query("false", pattern="^(true|false|all)$"),
+    db: AsyncSession = Depends(get_db_session)
+):
+    cached = _TREE_CACHE.get(archived)
+    if cached and time.monotonic() - cached[0] < _TREE_TTL_SECONDS:
+        return Response(cached[1], media_type="application/json")
+
     try:
         # Apply archive filter in WHERE clause
         archive_filter = ""
@@ -122,192 +166,185 @@ def get_location_tree(archived: str = Query("false", pattern="^(true|false|all)$
         ORDER BY level, name;
         """
 
-        rows = db.execute(text(sql)).mappings().all()
+        rows = (await db.execute(text(sql))).mappings().all()
 
-        # Step 1: Build node map
-        node_map = {}
+        # Step 1: Group nodes under their parent_id; roots land under None
+        children_by_parent = defaultdict(list)
         for r in rows:
-            node_map[str(r["location_id"])] = {
+            parent_id = str(r["parent_id"]) if r["parent_id"] else None
+            children_by_parent[parent_id].append({
                 "location_id": str(r["location_id"]),
                 "name": r["name"],
                 "type": r["type"],
-                "parent_id": str(r["parent_id"]) if r["parent_id"] else None,
+                "parent_id": parent_id,
                 "path_string": r["path_string"],
                 "level": r["level"],
-                "children": []
-            }
-
-        # Step 2: Nest children into parents
-        for node_id, node in node_map.items():
-            pid = node["parent_id"]
-            if pid and pid in node_map:
-                node_map[pid]["children"].append(node)
-
-        def build_tree(node):
-            node["children"].sort(key=lambda c: c["name"].lower())
-            for child in node["children"]:
-                build_tree(child)
-            return node
-
-        # Final tree: only root nodes
-        tree = []
-        for node in node_map.values():
-            if node["parent_id"] is None:
-                tree.append(build_tree(node))
-
-        tree.sort(key=lambda n: n["name"].lower())
-        return tree
+            })
+
+        # Step 2: Walk down from the roots with an explicit stack, attaching
+        # and sorting each sibling list once. A child already seen
+        # (self-reference, parent_id cycle) is dropped instead of nesting
+        # the tree into itself.
+        tree = sorted(children_by_parent[None], key=_name_key)
+        seen = set()
+        stack = list(tree)
+        while stack:
+            node = stack.pop()
+            seen.add(node["location_id"])
+            node["children"] = sorted(
+                (child for child in children_by_parent.get(node["location_id"], ()) if child["location_id"] not in seen),
+                key=_name_key
+            )
+            stack.extend(node["children"])
+
+        body = _TREE_JSON.dump_json(_TREE_JSON.validate_python(tree))
+        _TREE_CACHE[archived] = (time.monotonic(), body)
+        return Response(body, media_type="application/json")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to process location tree")
-    finally:
-        db_gen.close()
 
 # ─────────────────────────────────────────────────────────────
 # GET /locations
 # ─────────────────────────────────────────────────────────────
+
+# Plain columns for the read-only listing: rows come back as mappings
+# without building Location instances or touching the identity map
+_LOCATION_ROWS = select(
+    Location.location_id, Location.name, Location.type, Location.parent_id,
+    Location.uplink_metadata, Location.created_at, Location.updated_at, Location.archived_at,
+)
+
 @router.get("", response_model=List[LocationOut])
-def get_locations(
+async def get_locations(
     type: Optional[str] = None,
     parent_id: Optional[str] = None,
-    archived: str = Query("false", pattern="^(true|false|all)$")
+    archived: str = Query("false", pattern="^(true|false|all)$"),
+    db: AsyncSession = Depends(get_db_session)
 ):
-    db_gen = get_sync_db_session()
-    db = next(db_gen)
-    try:
-        query = db.query(Location)
+    query = _LOCATION_ROWS
 
-        if archived == "false":
-            query = query.filter(Location.archived_at.is_(None))
-        elif archived == "true":
-            query = query.filter(Location.archived_at.is_not(None))
-        # if "all", do not filter
+    if archived == "false":
+        query = query.where(Location.archived_at.is_(None))
+    elif archived == "true":
+        query = query.where(Location.archived_at.is_not(None))
+    # if "all", do not filter
 
-        if type:
-            query = query.filter(Location.type == type)
-        if parent_id:
-            query = query.filter(Location.parent_id == parent_id)
+    if type:
+        query = query.where(Location.type == type)
+    if parent_id:
+        query = query.where(Location.parent_id == parent_id)
 
-        return [loc.as_dict() for loc in query.all()]
-    finally:
-        db_gen.close()
+    return (await db.execute(query)).mappings().all()
 
 # ─────────────────────────────────────────────────────────────
 # GET /locations/{id}
 # ─────────────────────────────────────────────────────────────
 @router.get("/{location_id}", response_model=LocationOut)
-def get_location_by_id(location_id: str):
-    db_gen = get_sync_db_session()
-    db = next(db_gen)
-    try:
-        loc = db.query(Location).filter_by(location_id=location_id, archived_at=None).first()
-        if not loc:
-            raise HTTPException(status_code=404, detail="Location not found")
-        return loc.as_dict()
-    finally:
-        db_gen.close()
+async def get_location_by_id(location_id: str, db: AsyncSession = Depends(get_db_session)):
+    loc = (await db.execute(
+        _LOCATION_ROWS.where(Location.location_id == location_id, Location.archived_at.is_(None))
+    )).mappings().first()
+    if not loc:
+        raise HTTPException(status_code=404, detail="Location not found")
+    return loc
 
 # ─────────────────────────────────────────────────────────────
 # POST /locations
 # ─────────────────────────────────────────────────────────────
 @router.post("", response_model=LocationOut)
-def create_location(location_data: LocationIn):
-    db_gen = get_sync_db_session()
-    db = next(db_gen)
-    try:
-        loc = Location(
+async def create_location(location_data: LocationIn, db: AsyncSession = Depends(get_db_session)):
+    loc = (await db.execute(
+        insert(Location)
+        .values(
             name=location_data.name,
             type=location_data.type,
             parent_id=location_data.parent_id,
             uplink_metadata=location_data.uplink_metadata or {},
             created_at=datetime.utcnow(),
         )
-        db.add(loc)
-        db.commit()
-        db.refresh(loc)
-        return loc.as_dict()
-    finally:
-        db_gen.close()
+        .returning(*_LOCATION_ROWS.selected_columns)
+    )).mappings().one()
+    await db.commit()
+    invalidate_tree_cache()
+    return loc
 
 # ─────────────────────────────────────────────────────────────
 # PUT /locations/{id}
 # ─────────────────────────────────────────────────────────────
 @router.put("/{location_id}", response_model=LocationOut)
-def update_location(location_id: str, location_data: LocationUpdate):
-    db_gen = get_sync_db_session()
-    db = next(db_gen)
-    try:
-        loc = db.query(Location).filter_by(location_id=location_id, archived_at=None).first()
-        if not loc:
-            raise HTTPException(status_code=404, detail="Location not found")
-
-        if location_data.name:
-            loc.name = location_data.name
-        if location_data.uplink_metadata is not None:
-            loc.uplink_metadata = location_data.uplink_metadata
-        if location_data.parent_id is not None:
-            loc.parent_id = location_data.parent_id
-
-        loc.updated_at = datetime.utcnow()
-        db.commit()
-        return loc.as_dict()
-    finally:
-        db_gen.close()
+async def update_location(location_id: str, location_data: LocationUpdate, db: AsyncSession = Depends(get_db_session)):
+    changes = {"updated_at": datetime.utcnow()}
+    if location_data.name:
+        changes["name"] = location_data.name
+    if location_data.uplink_metadata is not None:
+        changes["uplink_metadata"] = location_data.uplink_metadata
+    if location_data.parent_id is not None:
+        changes["parent_id"] = location_data.parent_id
+
+    loc = (await db.execute(
+        update(Location)
+        .where(Location.location_id == location_id, Location.archived_at.is_(None))
+        .values(**changes)
+        .returning(*_LOCATION_ROWS.selected_columns)
+        .execution_options(synchronize_session=False)
+    )).mappings().first()
+    if not loc:
+        raise HTTPException(status_code=404, detail="Location not found")
+
+    await db.commit()
+    invalidate_tree_cache()
+    return loc
 
 # ─────────────────────────────────────────────────────────────
 # PUT /locations/{id}/archive
 # ─────────────────────────────────────────────────────────────
 @router.put("/{location_id}/archive", response_model=Dict)
-def archive_location(location_id: str, confirm: bool = Query(False)):
-    db_gen = get_sync_db_session()
-    db = next(db_gen)
-    try:
-        all_ids = get_descendant_location_ids(db, location_id)
-        locations = db.query(Location).filter(Location.location_id.in_(all_ids)).all()
-
+async def archive_location(location_id: str, confirm: bool = Query(False), db: AsyncSession = Depends(get_db_session)):
+    if not confirm:
+        locations = (await db.execute(_SUBTREE, {"root_id": location_id})).all()
         if not locations:
             raise HTTPException(status_code=404, detail="No locations found")
-
-        if not confirm:
-            return {
-                "dry_run": True,
-                "affected_count": len(locations),
-                "affected_names": [l.name for l in locations],
-                "confirm_url": f"/locations/{location_id}/archive?confirm=true"
-            }
-
-        for loc in locations:
-            loc.archived_at = datetime.utcnow()
-        db.commit()
-
         return {
-            "archived_count": len(locations),
-            "archived_ids": all_ids
+            "dry_run": True,
+            "affected_count": len(locations),
+            "affected_names": [l.name for l in locations],
+            "confirm_url": f"/locations/{location_id}/archive?confirm=true"
         }
-    finally:
-        db_gen.close()
+
+    all_ids = [str(i) for i in (await db.execute(_ARCHIVE_SUBTREE, {"root_id": location_id})).scalars()]
+    if not all_ids:
+        raise HTTPException(status_code=404, detail="No locations found")
+    await db.commit()
+    invalidate_tree_cache()
+
+    return {
+        "archived_count": len(all_ids),
+        "archived_ids": all_ids
+    }
 
 # ─────────────────────────────────────────────────────────────
 # PUT /locations/{id}/unarchive
 # ─────────────────────────────────────────────────────────────
 @router.put("/{location_id}/unarchive", response_model=Dict)
-def unarchive_location(location_id: str):
-    db_gen = get_sync_db_session()
-    db = next(db_gen)
-    try:
-        loc = db.query(Location).filter_by(location_id=location_id).first()
-
-        if not loc:
-            raise HTTPException(status_code=404, detail="Location not found")
-
-        if loc.archived_at is None:
-            return {"unarchived": False, "message": "Location is already active"}
-
-        loc.archived_at = None
-        loc.updated_at = datetime.utcnow()
-        db.commit()
-
-        return {"unarchived": True, "location_id": location_id}
-    finally:
-        db_gen.close()
-
+async def unarchive_location(location_id: str, db: AsyncSession = Depends(get_db_session)):
+    loc = (await db.execute(
+        select(Location.archived_at).where(Location.location_id == location_id)
+    )).first()
+
+    if not loc:
+        raise HTTPException(status_code=404, detail="Location not found")
+
+    if loc.archived_at is None:
+        return {"unarchived": False, "message": "Location is already active"}
+
+    await db.execute(
+        update(Location)
+        .where(Location.location_id == location_id)
+        .values(archived_at=None, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    invalidate_tree_cache()
+
+    return {"unarchived": True, "location_id": location_id}
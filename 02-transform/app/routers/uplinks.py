@@ -1,6 +1,9 @@
 # app/routers/uplinks.py
-# Version: 0.4.1 - 2025-08-05 13:15 UTC
+# Version: 0.4.4 - 2026-10-15 10:00 UTC
 # Changelog:
+# - One utcnow() per request: received_at fallback and log created_at share it
+# - Payload/gateway tracing via logger.debug (lazy %s, no json.dumps per uplink)
+# - Uplink insert, gateway update and enrichment log commit together once
 # - Updates gateways.last_seen_at when gateway_eui is present
 
 from fastapi import APIRouter, Request, HTTPException, Depends
@@ -9,20 +12,19 @@ from sqlalchemy import text
 from datetime import datetime
 from dateutil.parser import isoparse
 import uuid
-import json
-import sys
-import traceback
+import logging
 
 from database.connections import get_db_session
 from models import IngestUplink
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.post("/uplink")
 async def receive_uplink(req: Request, db: AsyncSession = Depends(get_db_session)):
     try:
         payload = await req.json()
-        print("📥 Received payload:", json.dumps(payload), file=sys.stderr)
+        logger.debug("📥 Received payload: %s", payload)
 
         deveui = payload.get("deveui")
         if not deveui:
@@ -33,8 +35,9 @@ async def receive_uplink(req: Request, db: AsyncSession = Depends(get_db_session
             raise HTTPException(status_code=400, detail="Missing ingest_uplink_id from ingest")
 
         uplink_uuid = str(uuid.uuid4())  # Transform UUID (our local PK)
-        raw_ts = payload.get("received_at") or datetime.utcnow().isoformat()
-        parsed_ts = isoparse(raw_ts).replace(tzinfo=None)
+        now = datetime.utcnow()
+        raw_ts = payload.get("received_at")
+        parsed_ts = isoparse(raw_ts).replace(tzinfo=None) if raw_ts else now
 
         payload_hex = payload.get("payload")
         uplink_metadata = payload.get("uplink_metadata", {})
@@ -55,11 +58,13 @@ async def receive_uplink(req: Request, db: AsyncSession = Depends(get_db_session
             gateway_eui=gateway_eui
         )
         db.add(new_uplink)
-        await db.commit()
+        # Flush (no commit) so the enrichment log FK below sees the row;
+        # all three writes commit together at the end
+        await db.flush()
 
         # ✅ Update gateway last_seen_at if gateway_eui present
         if gateway_eui:
-            print(f"🔄 Updating last_seen_at for gateway {gateway_eui}", file=sys.stderr)
+            logger.debug("🔄 Updating last_seen_at for gateway %s", gateway_eui)
             await db.execute(text("""
                 UPDATE transform.gateways
                 SET last_seen_at = :ts,
@@ -69,7 +74,6 @@ async def receive_uplink(req: Request, db: AsyncSession = Depends(get_db_session
                 "ts": parsed_ts,
                 "eui": gateway_eui
             })
-            await db.commit()
 
         # ✅ Insert enrichment log
         await db.execute(text("""
@@ -80,13 +84,12 @@ async def receive_uplink(req: Request, db: AsyncSession = Depends(get_db_session
             "step": "ingestion_received",
             "detail": f"Uplink stored with ingest_uplink_id {ingest_uplink_id}",
             "status": "new",
-            "created_at": datetime.utcnow()
+            "created_at": now
         })
         await db.commit()
 
         return {"status": "stored", "uplink_uuid": uplink_uuid}
 
     except Exception as e:
-        print("❌ Uplink insert failed:", str(e), file=sys.stderr)
-        traceback.print_exc(file=sys.stderr)
+        logger.exception("❌ Uplink insert failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Uplink insert failed: {e}")
@@ -1,6 +1,10 @@
 # 01_check_device_type.py
-# Version: 0.2.0 - 2025-07-20 09:43 UTC
+# Version: 0.3.3 - 2026-10-15 10:00 UTC
 # Changelog:
+# - Progress output goes through a module logger; per-uplink lines at debug
+# - Plain tuple cursor; rows are unpacked positionally instead of RealDictCursor dicts
+# - get_db() hands out connections from a process-wide ThreadedConnectionPool
+# - One DISTINCT ON lookup for all DevEUIs, one execute_values UPDATE, one for logs
 # - Preserve NULL for device_type_id when no match is found (no fake strings)
 # - Log reason explicitly in enrichment_logs.detail (e.g. 'No matching twinning record')
 # - Compatible with device_type_id foreign key constraint
@@ -10,8 +14,10 @@
 
 import os
 import uuid
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import logging
+from contextlib import contextmanager
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import execute_values
 from datetime import datetime
 
 DB_HOST = os.getenv("TRANSFORM_DB_HOST", "transform-database")
@@ -20,28 +26,53 @@ DB_NAME = os.getenv("TRANSFORM_DB_NAME", "transform_db")
 DB_USER = os.getenv("TRANSFORM_DB_USER", "transform_user")
 DB_PASS = os.getenv("TRANSFORM_DB_PASSWORD", "secret")
 
+logger = logging.getLogger(__name__)
+
+_pool = None
+
+def _get_pool() -> ThreadedConnectionPool:
+    # Created on first use so importing this module does not connect
+    global _pool
+    if _pool is None:
+        _pool = ThreadedConnectionPool(
+            minconn=1,
+            maxconn=5,
+            host=DB_HOST,
+            port=DB_PORT,
+            dbname=DB_NAME,
+            user=DB_USER,
+            password=DB_PASS,
+        )
+    return _pool
+
+@contextmanager
 def get_db():
-    return psycopg2.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASS,
-    )
-
-def log_enrichment(cur, uplink_uuid, step, detail, status):
-    cur.execute("""
+    """
+    Borrow a pooled connection. Same transaction semantics as the plain
+    `with psycopg2.connect(...) as conn` it replaces (commit on success,
+    rollback on error), but the connection goes back to the pool instead
+    of staying open.
+    """
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            yield conn
+    finally:
+        pool.putconn(conn)
+
+def log_enrichments(cur, rows):
+    """Insert enrichment_logs rows of (uplink_uuid, step, detail, status) with one execute_values"""
+    execute_values(cur, """
         INSERT INTO transform.enrichment_logs (log_id, uplink_uuid, step, detail, status, timestamp)
-        VALUES (%s, %s, %s, %s, %s, NOW())
-    """, (
-        str(uuid.uuid4()), uplink_uuid, step, detail, status
-    ))
+        VALUES %s
+    """, [(str(uuid.uuid4()), *row) for row in rows], template="(%s, %s, %s, %s, %s, NOW())")
 
 def enrich_device_type():
-    print("🔍 Checking for uplinks missing device_type_id...")
+    logger.info("🔍 Checking for uplinks missing device_type_id...")
 
     with get_db() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with conn.cursor() as cur:
             cur.execute("""
                 SELECT uplink_uuid, deveui
                 FROM transform.processed_uplinks
@@ -51,44 +82,51 @@ def enrich_device_type():
             """)
             rows = cur.fetchall()
 
-            print(f"🧠 Found {len(rows)} uplinks to process")
-
-            for row in rows:
-                uplink_uuid = row["uplink_uuid"]
-                deveui = row["deveui"]
-
-                cur.execute("""
-                    SELECT device_type_id
-                    FROM transform.device_context
-                    WHERE deveui = %s AND unassigned_at IS NULL
-                    ORDER BY assigned_at DESC
-                    LIMIT 1
-                """, (deveui,))
-                twin = cur.fetchone()
-
-                if twin and twin.get("device_type_id"):
-                    device_type_id = twin["device_type_id"]
-                    cur.execute("""
-                        UPDATE transform.processed_uplinks
-                        SET device_type_id = %s, updated_at = NOW()
-                        WHERE uplink_uuid = %s
-                    """, (device_type_id, uplink_uuid))
-
-                    log_enrichment(
-                        cur, uplink_uuid, "check_device_type",
+            logger.info("🧠 Found %d uplinks to process", len(rows))
+            if not rows:
+                return
+
+            # Latest active context per DevEUI, for the whole batch at once
+            cur.execute("""
+                SELECT DISTINCT ON (deveui) deveui, device_type_id
+                FROM transform.device_context
+                WHERE deveui = ANY(%s) AND unassigned_at IS NULL
+                ORDER BY deveui, assigned_at DESC
+            """, (list({deveui for _, deveui in rows}),))
+            twins = dict(cur.fetchall())
+
+            updates = []
+            logs = []
+            for uplink_uuid, deveui in rows:
+                device_type_id = twins.get(deveui)
+
+                if device_type_id:
+                    updates.append((uplink_uuid, device_type_id))
+                    logs.append((
+                        uplink_uuid, "check_device_type",
                         f"Assigned device_type_id {device_type_id} from context", "success"
-                    )
-                    print(f"[✓] {deveui} → {device_type_id}")
+                    ))
+                    logger.debug("[✓] %s → %s", deveui, device_type_id)
 
                 else:
                     # No device_type_id found, log but do NOT insert bogus string
-                    log_enrichment(
-                        cur, uplink_uuid, "check_device_type",
+                    logs.append((
+                        uplink_uuid, "check_device_type",
                         "No matching twinning record", "error"
-                    )
-                    print(f"[!] {deveui} → NULL (no context)")
+                    ))
+                    logger.debug("[!] %s → NULL (no context)", deveui)
+
+            if updates:
+                execute_values(cur, """
+                    UPDATE transform.processed_uplinks AS p
+                    SET device_type_id = v.dt, updated_at = NOW()
+                    FROM (VALUES %s) AS v(uu, dt)
+                    WHERE p.uplink_uuid = v.uu
+                """, updates, template="(%s::uuid, %s::integer)")
 
+            log_enrichments(cur, logs)
             conn.commit()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     enrich_device_type()
\ No newline at end of file
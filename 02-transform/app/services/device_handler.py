@@ -1,7 +1,7 @@
 """
 SenseMy IoT: Device Handler
-Version: 0.1.0
-Last Updated: 2025-08-06 16:50 UTC+2
+Version: 0.3.1
+Last Updated: 2026-10-15 10:00 UTC
 
 Handles automatic insertion of missing DevEUIs as ORPHAN entries in transform.device_context.
 """
@@ -9,29 +9,62 @@ Handles automatic insertion of missing DevEUIs as ORPHAN entries in transform.de
 from models import DeviceContext
 from datetime import datetime
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import logging
+
+logger = logging.getLogger(__name__)
 
 def ensure_device_context_exists(deveui: str, gateway_eui: str, db):
     if not deveui:
-        print("⚠️ Skipping device context check: DevEUI is null")
-        return
-
-    existing = db.query(DeviceContext).filter_by(deveui=deveui).first()
-    if existing:
-        print(f"ℹ️ DeviceContext already exists: {deveui}")
+        logger.debug("⚠️ Skipping device context check: DevEUI is null")
         return
 
-    print(f"🆕 New orphan DevEUI detected: {deveui} → inserting into device_context")
-    new_device = DeviceContext(
+    now = datetime.utcnow()
+    stmt = pg_insert(DeviceContext.__table__).values(
         deveui=deveui,
         lifecycle_state="ORPHAN",
         last_gateway=gateway_eui,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow(),
-    )
-    db.add(new_device)
+        created_at=now,
+        updated_at=now,
+    ).on_conflict_do_nothing(index_elements=[DeviceContext.__table__.c.deveui])
     try:
+        # One round trip instead of EXISTS + INSERT; rowcount is 0 when the
+        # DevEUI was already there (or a concurrent insert won the race)
+        inserted = db.execute(stmt).rowcount
         db.commit()
-        print(f"✅ ORPHAN DeviceContext inserted: {deveui}")
     except SQLAlchemyError as e:
         db.rollback()
-        print(f"❌ Failed to insert ORPHAN DevEUI {deveui}: {e}")
+        logger.error("❌ Failed to insert ORPHAN DevEUI %s: %s", deveui, e)
+        return
+
+    if inserted:
+        logger.debug("✅ ORPHAN DeviceContext inserted: %s", deveui)
+    else:
+        logger.debug("ℹ️ DeviceContext already exists: %s", deveui)
+
+def insert_orphan_device_contexts(orphans: dict, db):
+    """
+    Batch variant of ensure_device_context_exists: insert every
+    {deveui: gateway_eui} pair as ORPHAN with one
+    INSERT ... ON CONFLICT (deveui) DO NOTHING. Does not commit.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {
+            "deveui": deveui,
+            "lifecycle_state": "ORPHAN",
+            "last_gateway": gateway_eui,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for deveui, gateway_eui in orphans.items()
+        if deveui
+    ]
+    if not rows:
+        return
+
+    stmt = pg_insert(DeviceContext.__table__).values(rows).on_conflict_do_nothing(
+        index_elements=[DeviceContext.__table__.c.deveui]
+    )
+    inserted = db.execute(stmt).rowcount
+    logger.debug("✅ ORPHAN DeviceContexts inserted: %d of %d", inserted, len(rows))
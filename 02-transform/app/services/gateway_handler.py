@@ -1,14 +1,27 @@
 # app/services/gateway_handler.py
-# Version: 0.6.1 – 2025-08-05 10:50 UTC
+# Version: 0.7.4 – 2026-10-15 10:00 UTC
 # Changelog:
+# - Per-uplink print() calls replaced by a module logger (debug; failures at error)
+# - normalize_gateway_eui memoized with lru_cache (small, repeating set of gateways)
+# - insert_or_update_processed_uplink records its gateway with one UPSERT, same commit as the uplink
+# - ensure_gateway_exists uses SELECT EXISTS instead of fetching the row
+# - Added mark_gateways_seen(); batch helpers leave the commit to the caller
+# - One utcnow() per call for created/updated/last_seen timestamps
+# - Added upsert_processed_uplinks() for batched INSERT ... ON CONFLICT
 # - Normalized gateway_eui in all functions (last 16 hex chars, uppercase)
 # - Prevents mismatches between ingest and DB
 
 from sqlalchemy.orm import Session
 from models import ProcessedUplink, Gateway
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import datetime
+from functools import lru_cache
+import logging
 
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=4096)
 def normalize_gateway_eui(eui: str) -> str:
     """
     Normalize gateway EUI by stripping and taking last 16 characters (uppercase).
@@ -24,32 +37,32 @@ def ensure_gateway_exists(gateway_eui: str, db: Session):
     """
     gateway_eui = normalize_gateway_eui(gateway_eui)
     if not gateway_eui:
-        print("⚠️ Skipping gateway check: gateway_eui is null")
+        logger.debug("⚠️ Skipping gateway check: gateway_eui is null")
         return
 
-    existing = db.query(Gateway).filter_by(gw_eui=gateway_eui).first()
-    if existing:
-        print(f"ℹ️ Gateway already exists: {gateway_eui}")
+    if db.query(db.query(Gateway).filter_by(gw_eui=gateway_eui).exists()).scalar():
+        logger.debug("ℹ️ Gateway already exists: %s", gateway_eui)
         return
 
-    print(f"🛰️ New orphan gateway detected: {gateway_eui} → inserting...")
+    logger.debug("🛰️ New orphan gateway detected: %s → inserting...", gateway_eui)
+    now = datetime.utcnow()
     new_gateway = Gateway(
         gw_eui=gateway_eui,
         gateway_name=None,
         site_id=None,
         location_id=None,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow(),
-        last_seen_at=datetime.utcnow(),
+        created_at=now,
+        updated_at=now,
+        last_seen_at=now,
         status='online'
     )
     db.add(new_gateway)
     try:
         db.commit()
-        print(f"✅ Orphan gateway inserted: {gateway_eui}")
+        logger.debug("✅ Orphan gateway inserted: %s", gateway_eui)
     except SQLAlchemyError as e:
         db.rollback()
-        print(f"❌ Failed to insert orphan gateway {gateway_eui}: {e}")
+        logger.error("❌ Failed to insert orphan gateway %s: %s", gateway_eui, e)
 
 def mark_gateway_online(gateway_eui: str, db: Session):
     """
@@ -59,20 +72,21 @@ def mark_gateway_online(gateway_eui: str, db: Session):
     if not gateway_eui:
         return
 
+    now = datetime.utcnow()
     try:
         updated = db.query(Gateway).filter_by(gw_eui=gateway_eui).update({
             "status": "online",
-            "last_seen_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "last_seen_at": now,
+            "updated_at": now
         })
         if updated:
             db.commit()
-            print(f"🔄 Gateway marked online: {gateway_eui}")
+            logger.debug("🔄 Gateway marked online: %s", gateway_eui)
         else:
-            print(f"⚠️ No matching gateway found for: {gateway_eui}")
+            logger.debug("⚠️ No matching gateway found for: %s", gateway_eui)
     except SQLAlchemyError as e:
         db.rollback()
-        print(f"❌ Failed to update gateway status: {e}")
+        logger.error("❌ Failed to update gateway status: %s", e)
 
 def insert_or_update_processed_uplink(uplink, db: Session):
     """
@@ -87,20 +101,21 @@ def insert_or_update_processed_uplink(uplink, db: Session):
         return getattr(uplink, field, None)
 
     gateway_eui = extract("gateway_eui")
-    ensure_gateway_exists(gateway_eui, db)
-    mark_gateway_online(gateway_eui, db)
+    # Insert-or-mark-online in one statement; committed with the uplink below
+    mark_gateways_seen([gateway_eui], db)
 
     if isinstance(uplink, ProcessedUplink):
         try:
             db.merge(uplink)
             db.commit()
-            print(f"✅ Enriched uplink stored: {uplink.uplink_uuid} for DevEUI={uplink.deveui}")
+            logger.debug("✅ Enriched uplink stored: %s for DevEUI=%s", uplink.uplink_uuid, uplink.deveui)
         except SQLAlchemyError as e:
             db.rollback()
-            print(f"❌ Error storing enriched uplink: {e}")
+            logger.error("❌ Error storing enriched uplink: %s", e)
             raise
         return
 
+    now = datetime.utcnow()
     processed = ProcessedUplink(
         uplink_uuid=extract("uplink_uuid"),
         deveui=extract("deveui"),
@@ -116,16 +131,66 @@ def insert_or_update_processed_uplink(uplink, db: Session):
         source=extract("source"),
         ingest_uplink_id=extract("ingest_uplink_id"),
         gateway_eui=normalize_gateway_eui(gateway_eui),
-        inserted_at=datetime.utcnow(),
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        inserted_at=now,
+        created_at=now,
+        updated_at=now
     )
 
     try:
         db.merge(processed)
         db.commit()
-        print(f"✅ Enriched uplink stored: {processed.uplink_uuid} for DevEUI={processed.deveui}")
+        logger.debug("✅ Enriched uplink stored: %s for DevEUI=%s", processed.uplink_uuid, processed.deveui)
     except SQLAlchemyError as e:
         db.rollback()
-        print(f"❌ Error storing enriched uplink: {e}")
+        logger.error("❌ Error storing enriched uplink: %s", e)
         raise
+
+def mark_gateways_seen(gateway_euis, db: Session, now=None):
+    """
+    Batch variant of ensure_gateway_exists + mark_gateway_online: one
+    INSERT ... ON CONFLICT (gw_eui) DO UPDATE that inserts unknown gateways
+    as online orphans and marks known ones online. Does not commit.
+    """
+    euis = {normalize_gateway_eui(eui) for eui in gateway_euis} - {None}
+    if not euis:
+        return
+
+    now = now or datetime.utcnow()
+    stmt = pg_insert(Gateway.__table__).values([
+        {"gw_eui": eui, "created_at": now, "updated_at": now, "last_seen_at": now, "status": "online"}
+        for eui in euis
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[Gateway.__table__.c.gw_eui],
+        set_={
+            "status": stmt.excluded.status,
+            "last_seen_at": stmt.excluded.last_seen_at,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    ))
+    logger.debug("🔄 Gateways marked online: %d", len(euis))
+
+def upsert_processed_uplinks(rows: list, db: Session):
+    """
+    Batch variant of insert_or_update_processed_uplink: store many enriched
+    uplinks with a single INSERT ... ON CONFLICT (uplink_uuid) DO UPDATE,
+    after recording their gateways with mark_gateways_seen().
+
+    Rows must all carry the same keys (ProcessedUplink column names).
+    Does not commit; the caller owns the transaction.
+    """
+    if not rows:
+        return
+
+    mark_gateways_seen((row.get("gateway_eui") for row in rows), db, rows[0].get("updated_at"))
+
+    stmt = pg_insert(ProcessedUplink.__table__).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[ProcessedUplink.__table__.c.uplink_uuid],
+        set_={
+            key: stmt.excluded[key]
+            for key in rows[0]
+            if key not in ("uplink_uuid", "created_at")
+        }
+    ))
+    logger.debug("✅ Enriched uplinks stored: %d", len(rows))
@@ -0,0 +1,10 @@
+# tests/_helpers.py
+# Version: 0.1.0 - 2026-10-15 10:00 UTC
+# Shared helpers for the unpacker debug scripts in this folder
+
+from functools import lru_cache
+
+@lru_cache(maxsize=256)
+def hex_to_bytes(hex_payload: str) -> bytes:
+    """Decode a fixture hex string once; repeated fixtures reuse the bytes."""
+    return bytes.fromhex(hex_payload)
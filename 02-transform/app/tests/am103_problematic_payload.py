@@ -3,6 +3,7 @@
 # Tests unpacker on real-world payload that previously unpacked incorrectly
 
 from unpackers.environment import milesight_am103
+from tests._helpers import hex_to_bytes
 
 def main():
     # Real-world payload that previously gave unrealistic temperature (691.3°C)
@@ -13,7 +14,7 @@ def main():
     print(f"🔢 HEX: {hex_payload}")
     print(f"📦 FPort: {fport}")
 
-    payload = bytes.fromhex(hex_payload)
+    payload = hex_to_bytes(hex_payload)
 
     try:
         decoded = milesight_am103.unpack(payload, fport)
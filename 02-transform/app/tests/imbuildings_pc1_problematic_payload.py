@@ -1,9 +1,10 @@
 from unpackers.monitoring import imbuildings_pc1
+from tests._helpers import hex_to_bytes
 
 print("\n🔬 Test: Real-world imBuildings PC1 payload previously misparsed")
 payload_hex = "02060004a30b00fb671300012a0000000082000000008b"
 fport = 1
-payload_bytes = bytes.fromhex(payload_hex)
+payload_bytes = hex_to_bytes(payload_hex)
 
 print(f"🔢 HEX: {payload_hex}")
 print(f"📦 FPort: {fport}")
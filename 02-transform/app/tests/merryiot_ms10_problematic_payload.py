@@ -2,10 +2,11 @@
 # Version: 0.1.0 - 2025-07-23 14:30 UTC
 
 from unpackers.monitoring import merryiot_ms10
+from tests._helpers import hex_to_bytes
 
 payload_hex = "0008fe00340000000000"
 fport = 122
-payload_bytes = bytes.fromhex(payload_hex)
+payload_bytes = hex_to_bytes(payload_hex)
 
 print("\n🔬 Test: Real-world MerryIoT MS10 payload previously misparsed")
 print(f"🔢 HEX: {payload_hex}")
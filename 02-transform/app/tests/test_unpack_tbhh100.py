@@ -1,8 +1,9 @@
 # test_unpack_tbhh100.py
 from unpackers.environment import browan_tbhh100
+from tests._helpers import hex_to_bytes
 
 # Simulate DB-provided memoryview (what causes failure)
-payload = memoryview(bytes.fromhex("08fa0b4affffffff"))
+payload = memoryview(hex_to_bytes("08fa0b4affffffff"))
 fport = 103
 
 try:
@@ -3,10 +3,11 @@
 # Test case for Winext AN-102C payload that failed previously (FPort=46)
 
 from unpackers.monitoring import winext_an102c
+from tests._helpers import hex_to_bytes
 
 hex_payload = "010100080e003b0000001f"
 fport = 46
-payload_bytes = bytes.fromhex(hex_payload)
+payload_bytes = hex_to_bytes(hex_payload)
 
 print("🔬 Test: Real-world Winext AN-102C payload previously misparsed")
 print(f"🔢 HEX: {hex_payload}")
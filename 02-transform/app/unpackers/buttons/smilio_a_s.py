@@ -1,95 +1,117 @@
-# smilio_a_s.py - Version: 0.3.0 - 2025-07-23 12:15 UTC
+# smilio_a_s.py - Version: 0.4.2 - 2026-10-15 10:00 UTC
 # Changelog:
+# - Per-frame flags computed with a comparison instead of a bool() call (still JSON true/false)
+# - Works on the caller's bytes/memoryview directly (no tobytes() copy per uplink)
+# - Frame types dispatched through _FRAME_DECODERS (one dict lookup, no if/elif chain)
+# - Frame fields read with prebuilt struct.Struct layouts (one unpack_from per frame)
 # - Canonicalized with memoryview/bytes handling
 # - Preserved full frame decoding for keep-alive, normal, pulse, hall-effect, and code frames
 # - Added comments for maintainability
 
+import struct
+
+# Big-endian frame bodies, read from offset 1 (after the frame type byte)
+_KEEP_ALIVE = struct.Struct(">HHB")   # battery idle mV, battery tx mV, terminator
+_COUNTERS = struct.Struct(">HHHHH")   # five 16-bit counters / button states
+_CODE = struct.Struct(">HHII")        # time last, time tx, code 2, code 1
+
 def unpack(payload, fport: int) -> dict:
     if fport != 2:
         raise ValueError(f"Unexpected port {fport}, expected 2")
 
-    if isinstance(payload, memoryview):
-        b = payload.tobytes()
-    elif isinstance(payload, bytes):
-        b = payload
-    else:
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
+    b = payload
 
     if len(b) < 2:
         raise ValueError(f"Payload too short: {len(b)} bytes")
 
     frame_type = b[0]
+    decode = _FRAME_DECODERS.get(frame_type)
+    if decode is None:
+        raise ValueError(f"Unexpected frame type: 0x{frame_type:02X}")
+    return decode(b, frame_type)
+
 
-    # Frame type 0x01: Keep Alive (6 bytes)
-    if frame_type == 0x01:
-        if len(b) != 6:
-            raise ValueError(f"Unexpected payload length for keep-alive: {len(b)} bytes, expected 6")
-        battery_idle_mV = int.from_bytes(b[1:3], 'big')
-        battery_tx_mV = int.from_bytes(b[3:5], 'big')
-        terminator = b[5]
-        if terminator != 0x64:
-            raise ValueError(f"Unexpected terminator byte: 0x{terminator:02X}, expected 0x64")
-        return {
-            "frame_type": "keep_alive",
-            "battery_idle_mV": battery_idle_mV,
-            "battery_tx_mV": battery_tx_mV,
-            "terminator": terminator
-        }
+# Frame type 0x01: Keep Alive (6 bytes)
+def _decode_keep_alive(b, frame_type) -> dict:
+    if len(b) != 6:
+        raise ValueError(f"Unexpected payload length for keep-alive: {len(b)} bytes, expected 6")
+    battery_idle_mV, battery_tx_mV, terminator = _KEEP_ALIVE.unpack_from(b, 1)
+    if terminator != 0x64:
+        raise ValueError(f"Unexpected terminator byte: 0x{terminator:02X}, expected 0x64")
+    return {
+        "frame_type": "keep_alive",
+        "battery_idle_mV": battery_idle_mV,
+        "battery_tx_mV": battery_tx_mV,
+        "terminator": terminator
+    }
 
-    # Frame type 0x02: Normal (button press counters)
-    elif frame_type == 0x02:
-        if len(b) != 11:
-            raise ValueError(f"Unexpected payload length for normal: {len(b)} bytes, expected 11")
-        return {
-            "frame_type": "normal",
-            "counter_1": int.from_bytes(b[1:3], 'big'),
-            "counter_2": int.from_bytes(b[3:5], 'big'),
-            "counter_3": int.from_bytes(b[5:7], 'big'),
-            "counter_4": int.from_bytes(b[7:9], 'big'),
-            "counter_5": int.from_bytes(b[9:11], 'big')
-        }
+# Frame type 0x02: Normal (button press counters)
+def _decode_normal(b, frame_type) -> dict:
+    if len(b) != 11:
+        raise ValueError(f"Unexpected payload length for normal: {len(b)} bytes, expected 11")
+    c1, c2, c3, c4, c5 = _COUNTERS.unpack_from(b, 1)
+    return {
+        "frame_type": "normal",
+        "counter_1": c1,
+        "counter_2": c2,
+        "counter_3": c3,
+        "counter_4": c4,
+        "counter_5": c5
+    }
 
-    # Frame type 0x03: Hall Effect (magnet detection)
-    elif frame_type == 0x03:
-        if len(b) != 12:
-            raise ValueError(f"Unexpected payload length for hall effect: {len(b)} bytes, expected 12")
-        return {
-            "frame_type": "hall_effect",
-            "counter_1": int.from_bytes(b[1:3], 'big'),
-            "counter_2": int.from_bytes(b[3:5], 'big'),
-            "counter_3": int.from_bytes(b[5:7], 'big'),
-            "counter_4": int.from_bytes(b[7:9], 'big'),
-            "counter_5": int.from_bytes(b[9:11], 'big')
-        }
+# Frame type 0x03: Hall Effect (magnet detection)
+def _decode_hall_effect(b, frame_type) -> dict:
+    if len(b) != 12:
+        raise ValueError(f"Unexpected payload length for hall effect: {len(b)} bytes, expected 12")
+    c1, c2, c3, c4, c5 = _COUNTERS.unpack_from(b, 1)
+    return {
+        "frame_type": "hall_effect",
+        "counter_1": c1,
+        "counter_2": c2,
+        "counter_3": c3,
+        "counter_4": c4,
+        "counter_5": c5
+    }
 
-    # Frame type 0x40: Pulse mode (binary on/off states)
-    elif frame_type == 0x40:
-        if len(b) != 12:
-            raise ValueError(f"Unexpected payload length for pulse: {len(b)} bytes, expected 12")
-        return {
-            "frame_type": "pulse",
-            "button_1": bool(int.from_bytes(b[1:3], 'big')),
-            "button_2": bool(int.from_bytes(b[3:5], 'big')),
-            "button_3": bool(int.from_bytes(b[5:7], 'big')),
-            "button_4": bool(int.from_bytes(b[7:9], 'big')),
-            "button_5": bool(int.from_bytes(b[9:11], 'big'))
-        }
+# Frame type 0x40: Pulse mode (binary on/off states)
+def _decode_pulse(b, frame_type) -> dict:
+    if len(b) != 12:
+        raise ValueError(f"Unexpected payload length for pulse: {len(b)} bytes, expected 12")
+    b1, b2, b3, b4, b5 = _COUNTERS.unpack_from(b, 1)
+    return {
+        "frame_type": "pulse",
+        "button_1": b1 != 0,
+        "button_2": b2 != 0,
+        "button_3": b3 != 0,
+        "button_4": b4 != 0,
+        "button_5": b5 != 0
+    }
 
-    # Frame type 0x10–0x1F: Code mode (ack + 2 x 4-byte codes)
-    elif frame_type & 0xF0 == 0x10:
-        if len(b) != 15:
-            raise ValueError(f"Unexpected payload length for code mode: {len(b)} bytes, expected 15")
-        ack_1 = (frame_type & 0x0C) >> 2
-        ack_2 = frame_type & 0x03
-        return {
-            "frame_type": "code",
-            "ack_1": ack_1,
-            "ack_2": ack_2,
-            "time_last": int.from_bytes(b[1:3], 'big'),
-            "time_tx": int.from_bytes(b[3:5], 'big'),
-            "code_2": int.from_bytes(b[5:9], 'big'),
-            "code_1": int.from_bytes(b[9:13], 'big')
-        }
+# Frame type 0x10–0x1F: Code mode (ack + 2 x 4-byte codes)
+def _decode_code(b, frame_type) -> dict:
+    if len(b) != 15:
+        raise ValueError(f"Unexpected payload length for code mode: {len(b)} bytes, expected 15")
+    ack_1 = (frame_type & 0x0C) >> 2
+    ack_2 = frame_type & 0x03
+    time_last, time_tx, code_2, code_1 = _CODE.unpack_from(b, 1)
+    return {
+        "frame_type": "code",
+        "ack_1": ack_1,
+        "ack_2": ack_2,
+        "time_last": time_last,
+        "time_tx": time_tx,
+        "code_2": code_2,
+        "code_1": code_1
+    }
 
-    else:
-        raise ValueError(f"Unexpected frame type: 0x{frame_type:02X}")
\ No newline at end of file
+# Frame type byte -> decoder; the code-mode range is expanded to its 16
+# concrete values so every lookup is a single exact-match hit
+_FRAME_DECODERS = {
+    0x01: _decode_keep_alive,
+    0x02: _decode_normal,
+    0x03: _decode_hall_effect,
+    0x40: _decode_pulse,
+    **{frame_type: _decode_code for frame_type in range(0x10, 0x20)},
+}
@@ -1,19 +1,20 @@
-# browan_tbhh100.py - Version: 0.2.0 - 2025-07-23 08:05 UTC
+# browan_tbhh100.py - Version: 0.2.2 - 2026-10-15 10:00 UTC
 # Changelog:
+# - Battery voltage and temperature read from unpackers/tables.py lookup tables
+# - Works on the caller's bytes/memoryview directly (no tobytes() copy per uplink)
 # - Accepts bytes or memoryview safely
 # - Confirmed unpacking -21°C for freezer TBHH100
 # - Supports ports 102, 103, 107
 
+from unpackers.tables import BATTERY_V_BROWAN, TEMPERATURE_C
+
 def unpack(payload: bytes, fport: int) -> dict:
     if fport not in [102, 103, 107]:
         raise ValueError(f"Unexpected port {fport}, expected 102, 103, or 107")
 
-    if isinstance(payload, memoryview):
-        b = payload.tobytes()
-    elif isinstance(payload, bytes):
-        b = payload
-    else:
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
+    b = payload
 
     if len(b) < 4:
         raise ValueError(f"Payload too short: {len(b)} bytes, expected at least 4")
@@ -22,8 +23,8 @@ def unpack(payload: bytes, fport: int) -> dict:
     temp_raw = b[2]
     humidity_raw = b[3]
 
-    battery_voltage = (25 + (battery & 0x0F)) / 10
-    temperature_c = (temp_raw & 0x7F) - 32
+    battery_voltage = BATTERY_V_BROWAN[battery & 0x0F]
+    temperature_c = TEMPERATURE_C[temp_raw & 0x7F]
     humidity_pct = humidity_raw & 0x7F
     humidity_error = humidity_pct == 127
 
@@ -1,9 +1,32 @@
-# browan_tbhv110.py - Version: 0.2.0 - 2025-07-23 12:45 UTC
+# browan_tbhv110.py - Version: 0.2.4 - 2026-10-15 10:00 UTC
 # Changelog:
+# - Battery voltage and temperatures read from unpackers/tables.py lookup tables
+# - Works on the caller's bytes/memoryview directly (no tobytes() copy per uplink)
+# - Status flags come from a 256-entry table built at import (one lookup per frame)
+# - Status frame read with one prebuilt struct.Struct unpack
 # - Canonicalized for memoryview/bytes safety
 # - Preserved full IAQ decoding logic
 # - Improved validation, field names, and inline comments
 
+import struct
+
+from unpackers.tables import BATTERY_V_BROWAN, TEMPERATURE_C
+
+# Status frame: status, battery, PCB temp, RH, CO₂ eq (ppm), VOC (ppb), IAQ, env temp
+_STATUS = struct.Struct(">BBBBHHHB")
+
+# Decoded status-byte flags for every possible byte value; merged (copied)
+# into each result, never returned directly
+_STATUS_FLAGS = tuple(
+    {
+        "trigger_event": bool(s & 0x01),
+        "temp_changed": bool(s & 0x10),
+        "humidity_changed": bool(s & 0x20),
+        "iaq_changed": bool(s & 0x40),
+    }
+    for s in range(256)
+)
+
 def unpack(payload, fport: int) -> dict:
     if fport == 103:
         return unpack_status(payload)
@@ -14,41 +37,22 @@ def unpack(payload, fport: int) -> dict:
 
 def unpack_status(payload) -> dict:
     # Accept bytes or memoryview
-    if isinstance(payload, memoryview):
-        b = payload.tobytes()
-    elif isinstance(payload, bytes):
-        b = payload
-    else:
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
+    b = payload
 
     if len(b) != 11:
         raise ValueError(f"Unexpected payload length for status: {len(b)} bytes, expected 11")
 
-    status = b[0]
-    battery = b[1]
-    pcb_temp = b[2]
-    humidity = b[3]
-    co2_eq = int.from_bytes(b[4:6], 'big')   # CO₂ equivalent in ppm
-    voc = int.from_bytes(b[6:8], 'big')      # VOC level in ppb
-    iaq = int.from_bytes(b[8:10], 'big')     # IAQ index
-    env_temp = b[10]
+    status, battery, pcb_temp, humidity, co2_eq, voc, iaq, env_temp = _STATUS.unpack(b)
 
-    # Flags from status byte
-    trigger_event = bool(status & 0x01)
-    temp_changed = bool(status & 0x10)
-    humidity_changed = bool(status & 0x20)
-    iaq_changed = bool(status & 0x40)
-
-    battery_voltage = (25 + (battery & 0x0F)) / 10
-    pcb_temp_c = (pcb_temp & 0x7F) - 32
-    env_temp_c = (env_temp & 0x7F) - 32
+    battery_voltage = BATTERY_V_BROWAN[battery & 0x0F]
+    pcb_temp_c = TEMPERATURE_C[pcb_temp & 0x7F]
+    env_temp_c = TEMPERATURE_C[env_temp & 0x7F]
     humidity_pct = humidity & 0x7F
 
     return {
-        "trigger_event": trigger_event,
-        "temp_changed": temp_changed,
-        "humidity_changed": humidity_changed,
-        "iaq_changed": iaq_changed,
+        **_STATUS_FLAGS[status],  # Flags from status byte
         "battery_voltage": battery_voltage,
         "pcb_temperature": pcb_temp_c,
         "humidity": humidity_pct,
@@ -59,12 +63,9 @@ def unpack_status(payload) -> dict:
     }
 
 def unpack_config_response(payload) -> dict:
-    if isinstance(payload, memoryview):
-        b = payload.tobytes()
-    elif isinstance(payload, bytes):
-        b = payload
-    else:
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
+    b = payload
 
     if len(b) != 8:
         raise ValueError(f"Unexpected payload length for config response: {len(b)} bytes, expected 8")
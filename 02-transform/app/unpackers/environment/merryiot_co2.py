@@ -1,49 +1,56 @@
-# merryiot_cd10.py - Version: 0.2.0 - 2025-07-22 13:20 UTC
+# merryiot_cd10.py - Version: 0.2.4 - 2026-10-15 10:00 UTC
 # Changelog:
+# - Battery voltage read from the unpackers/tables.py lookup table
+# - Works on the caller's bytes/memoryview directly (no tobytes() copy per uplink)
+# - Status flags come from a 256-entry table built at import (one lookup per frame)
+# - Whole frame read with one prebuilt struct.Struct unpack
 # - Supports CO₂ sensor uplinks on port 127
 # - Parses 7-byte payload: status, battery, temp, RH, CO₂
 # - Handles bytes or memoryview input safely
 
+import struct
+
+from unpackers.tables import BATTERY_V_MERRYIOT
+
+# status, battery, temperature (int16 LE, 0.1 °C), humidity, CO₂ ppm (uint16 LE)
+_FRAME = struct.Struct("<BBhBH")
+
+# Decoded status-byte flags for every possible byte value; merged (copied)
+# into each result, never returned directly
+_STATUS_FLAGS = tuple(
+    {
+        "trigger_event": bool(s & 0x01),
+        "button_pressed": bool(s & 0x02),
+        "co2_high_alarm": bool(s & 0x10),
+        "co2_calibration_flag": bool(s & 0x20),
+    }
+    for s in range(256)
+)
+
 def unpack(payload: bytes, fport: int) -> dict:
     if fport != 127:
         raise ValueError(f"Unexpected fport: {fport}, expected 127")
 
-    if isinstance(payload, memoryview):
-        b = payload.tobytes()
-    elif isinstance(payload, bytes):
-        b = payload
-    else:
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
+    b = payload
 
     if len(b) != 7:
         raise ValueError(f"Unexpected payload length: {len(b)} bytes, expected 7")
 
-    # Byte 0: Status bits
-    status = b[0]
-    trigger_event = bool(status & 0x01)
-    button_pressed = bool(status & 0x02)
-    co2_high = bool(status & 0x10)
-    co2_calibration = bool(status & 0x20)
+    status, battery, temp_raw, humidity_raw, co2_ppm = _FRAME.unpack(b)
 
     # Byte 1: Battery
-    battery_raw = b[1] & 0x0F
-    battery_voltage = (21 + battery_raw) / 10.0
+    battery_voltage = BATTERY_V_MERRYIOT[battery & 0x0F]
 
     # Bytes 2-3: Temperature (signed, little-endian)
-    temp_raw = int.from_bytes(b[2:4], "little", signed=True)
     temperature_c = temp_raw / 10.0
 
     # Byte 4: Humidity (7 bits)
-    humidity = b[4] & 0x7F
-
-    # Bytes 5-6: CO₂ ppm (unsigned, little-endian)
-    co2_ppm = int.from_bytes(b[5:7], "little")
+    humidity = humidity_raw & 0x7F
 
     return {
-        "trigger_event": trigger_event,
-        "button_pressed": button_pressed,
-        "co2_high_alarm": co2_high,
-        "co2_calibration_flag": co2_calibration,
+        **_STATUS_FLAGS[status],  # Byte 0: Status bits
         "battery_voltage": battery_voltage,
         "temperature": temperature_c,
         "humidity": humidity,
@@ -1,20 +1,29 @@
-# milesight_am103.py - Version: 0.2.1 - 2025-07-22 16:55 UTC
+# milesight_am103.py - Version: 0.3.2 - 2026-10-15 10:00 UTC
 # Changelog:
+# - Per-frame flags computed with a comparison instead of a bool() call (still JSON true/false)
+# - Fast path: the standard 14-byte battery/temp/RH/CO₂ frame is read with one struct unpack
+# - TLV walker looks up (size, decoder) by packed channel/type key in _TLV_DECODERS
+# - Works on the caller's bytes/memoryview directly (no tobytes() copy per uplink)
 # - Fixed temperature and CO₂ decoding: uses 'little' byte order (not 'big')
 # - Accepts bytes or memoryview
 # - Parses TLV-encoded telemetry and FF-prefixed metadata frames
 # - Returns temperature, humidity, battery %, and CO₂ ppm
 
+import struct
+
+# The periodic report the AM103 sends almost every time: battery, temperature,
+# humidity, CO₂ TLVs in this order. Tags are read as 2-byte strings and
+# compared as a tuple; anything else goes through the TLV walker.
+_STANDARD_FRAME = struct.Struct("<2sB2sh2sB2sH")
+_STANDARD_TAGS = (b"\x01\x75", b"\x03\x67", b"\x04\x68", b"\x07\x7d")
+
 def unpack(payload, fport: int) -> dict:
     if fport != 85:
         raise ValueError(f"Unexpected fport: {fport}, expected 85")
 
-    if isinstance(payload, memoryview):
-        b = payload.tobytes()
-    elif isinstance(payload, bytes):
-        b = payload
-    else:
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
+    b = payload
 
     if not b:
         return {"status": "not_decoded", "error": "empty payload"}
@@ -23,48 +32,69 @@ def unpack(payload, fport: int) -> dict:
     if b[0] == 0xFF:
         return unpack_basic_info(b)
 
+    if len(b) == _STANDARD_FRAME.size:
+        t1, battery, t2, temp, t3, humidity, t4, co2 = _STANDARD_FRAME.unpack(b)
+        if (t1, t2, t3, t4) == _STANDARD_TAGS:
+            return {
+                'battery_raw': battery,
+                'battery_pct': round((battery / 254) * 100),
+                'temperature': temp / 10.0,
+                'humidity': humidity / 2.0,
+                'co2_ppm': co2,
+            }
+
     result = {}
     index = 0
-    while index + 1 < len(b):
+    end = len(b)
+    while index + 1 < end:
         channel = b[index]
         data_type = b[index + 1]
 
         try:
-            size = data_size(channel, data_type)
-            data = b[index + 2: index + 2 + size]
+            size, decode = _TLV_DECODERS[channel << 8 | data_type]
+        except KeyError:
+            result[f"error_at_index_{index}"] = f"Unknown channel/type ({channel:#x}, {data_type:#x})"
+            break
 
-            if (channel, data_type) == (0x01, 0x75):  # Battery (1 byte)
-                result['battery_raw'] = data[0]
-                result['battery_pct'] = round((data[0] / 254) * 100)
+        try:
+            decode(result, b[index + 2: index + 2 + size])
+        except Exception as e:
+            result[f"error_at_index_{index}"] = str(e)
+            break
 
-            elif (channel, data_type) == (0x03, 0x67):  # Temperature (2 bytes, little endian)
-                temp = int.from_bytes(data, 'little', signed=True)
-                result['temperature'] = temp / 10.0
+        index += 2 + size
 
-            elif (channel, data_type) == (0x04, 0x68):  # Humidity (1 byte)
-                result['humidity'] = data[0] / 2.0
+    return result
 
-            elif (channel, data_type) == (0x07, 0x7D):  # CO₂ (2 bytes, little endian)
-                result['co2_ppm'] = int.from_bytes(data, 'little')
 
-            else:
-                result[f"unknown_{channel:02X}_{data_type:02X}"] = data.hex()
+def _decode_battery(result, data):  # Battery (1 byte)
+    result['battery_raw'] = data[0]
+    result['battery_pct'] = round((data[0] / 254) * 100)
 
-            index += 2 + size
+def _decode_temperature(result, data):  # Temperature (2 bytes, little endian)
+    result['temperature'] = int.from_bytes(data, 'little', signed=True) / 10.0
 
-        except Exception as e:
-            result[f"error_at_index_{index}"] = str(e)
-            break
+def _decode_humidity(result, data):  # Humidity (1 byte)
+    result['humidity'] = data[0] / 2.0
 
-    return result
+def _decode_co2(result, data):  # CO₂ (2 bytes, little endian)
+    result['co2_ppm'] = int.from_bytes(data, 'little')
+
+# (channel << 8 | data_type) -> (data size, decoder): one dict lookup per
+# TLV instead of the data_size() chain plus per-type tuple comparisons
+_TLV_DECODERS = {
+    0x0175: (1, _decode_battery),
+    0x0367: (2, _decode_temperature),
+    0x0468: (1, _decode_humidity),
+    0x077D: (2, _decode_co2),
+}
 
 
 def data_size(channel, data_type):
-    if (channel, data_type) == (0x01, 0x75): return 1  # Battery
-    if (channel, data_type) == (0x03, 0x67): return 2  # Temperature
-    if (channel, data_type) == (0x04, 0x68): return 1  # Humidity
-    if (channel, data_type) == (0x07, 0x7D): return 2  # CO₂
-    raise ValueError(f"Unknown channel/type ({channel:#x}, {data_type:#x})")
+    try:
+        return _TLV_DECODERS[channel << 8 | data_type][0]
+    except KeyError:
+        raise ValueError(f"Unknown channel/type ({channel:#x}, {data_type:#x})")
 
 
 def unpack_basic_info(b):
@@ -90,9 +120,9 @@ def unpack_basic_info(b):
                 result["device_sn"] = data.hex()
             elif (channel, data_type) == (0xFF, 0x18):
                 val = data[0]
-                result["temp_sensor"] = bool(val & 0x01)
-                result["hum_sensor"] = bool(val & 0x02)
-                result["co2_sensor"] = bool(val & 0x10)
+                result["temp_sensor"] = (val & 0x01) != 0
+                result["hum_sensor"] = (val & 0x02) != 0
+                result["co2_sensor"] = (val & 0x10) != 0
             else:
                 result[f"unknown_basic_{channel:02X}_{data_type:02X}"] = data.hex()
 
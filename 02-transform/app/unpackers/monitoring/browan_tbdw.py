@@ -1,33 +1,39 @@
-# browan_tbdw.py - Version: 0.2.0 - 2025-07-23 13:50 UTC
+# browan_tbdw.py - Version: 0.2.4 - 2026-10-15 10:00 UTC
 # Changelog:
+# - Per-frame flags computed with a comparison instead of a bool() call (still JSON true/false)
+# - Battery voltage and temperatures read from unpackers/tables.py lookup tables
+# - Works on the caller's bytes/memoryview directly (no tobytes() copy per uplink)
+# - Frame read with one prebuilt struct.Struct unpack; 24-bit count from two fields
 # - Rewritten using canonical unpacking structure
 # - Accepts bytes or memoryview safely
 # - Validates port 100 and length 8
 # - Correctly decodes open/closed status, battery, temp, and event counters
 
+import struct
+
+from unpackers.tables import BATTERY_V_BROWAN, TEMPERATURE_C
+
+# status, battery, PCB temp, minutes since last event (uint16 LE),
+# event count as uint16 LE low part + high byte (24-bit LE total)
+_FRAME = struct.Struct("<BBBHHB")
+
 def unpack(payload: bytes, fport: int) -> dict:
     if fport != 100:
         raise ValueError(f"Unexpected port {fport}, expected 100")
 
-    if isinstance(payload, memoryview):
-        b = payload.tobytes()
-    elif isinstance(payload, bytes):
-        b = payload
-    else:
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
+    b = payload
 
     if len(b) != 8:
         raise ValueError(f"Payload length is {len(b)} bytes, expected 8")
 
-    status_byte = b[0]
-    battery_byte = b[1]
-    pcb_temp_byte = b[2]
-    time_minutes = int.from_bytes(b[3:5], byteorder="little")
-    event_count = int.from_bytes(b[5:8], byteorder="little")
+    status_byte, battery_byte, pcb_temp_byte, time_minutes, count_lo, count_hi = _FRAME.unpack(b)
+    event_count = count_lo | count_hi << 16
 
-    open_shut_status = bool(status_byte & 0x01)
-    battery_voltage = (25 + (battery_byte & 0x0F)) / 10
-    temperature_c = (pcb_temp_byte & 0x7F) - 32
+    open_shut_status = (status_byte & 0x01) == 1
+    battery_voltage = BATTERY_V_BROWAN[battery_byte & 0x0F]
+    temperature_c = TEMPERATURE_C[pcb_temp_byte & 0x7F]
 
     return {
         "status": 1 if open_shut_status else 0,
@@ -1,17 +1,30 @@
-# browan_tbms100.py - Version: 0.2.0 - 2025-07-23 14:00 UTC
+# browan_tbms100.py - Version: 0.2.5 - 2026-10-15 10:00 UTC
 # Changelog:
+# - Config response read with one prebuilt struct.Struct unpack_from
+# - Per-frame flags computed with a comparison instead of a bool() call (still JSON true/false)
+# - Battery voltage and temperatures read from unpackers/tables.py lookup tables
+# - Works on the caller's bytes/memoryview directly (no tobytes() copy per uplink)
+# - Status frame read with one prebuilt struct.Struct unpack
 # - Rewritten to follow canonical unpacker structure
 # - Accepts bytes or memoryview safely
 # - Handles FPort 102 (Status) and 204 (Config Response)
 # - Validates payload lengths and performs correct decoding
 
+import struct
+
+from unpackers.tables import BATTERY_V_BROWAN, TEMPERATURE_C
+
+# Status: status, battery, PCB temp, time since last event (uint16 LE),
+# event count as uint16 LE low part + high byte (24-bit LE total)
+_STATUS = struct.Struct("<BBBHHB")
+# Config response from offset 1 (all LE): reporting interval, occupied
+# interval, (skip), free detection time, (skip), trigger count, (skip), PIR config
+_CONFIG = struct.Struct("<HHxBxHxI")
+
 def unpack(payload, fport: int) -> dict:
-    if isinstance(payload, memoryview):
-        b = payload.tobytes()
-    elif isinstance(payload, bytes):
-        b = payload
-    else:
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
+    b = payload
 
     if fport == 102:
         return unpack_status(b)
@@ -25,15 +38,12 @@ def unpack_status(b: bytes) -> dict:
     if len(b) != 8:
         raise ValueError(f"Unexpected payload length for status: {len(b)} bytes, expected 8")
 
-    status = b[0]
-    battery = b[1]
-    temp_raw = b[2]
-    time_since = int.from_bytes(b[3:5], byteorder="little")
-    count = int.from_bytes(b[5:8], byteorder="little")
+    status, battery, temp_raw, time_since, count_lo, count_hi = _STATUS.unpack(b)
+    count = count_lo | count_hi << 16
 
-    occupied = bool(status & 0x01)
-    battery_voltage = (25 + (battery & 0x0F)) / 10
-    temperature_c = (temp_raw & 0x7F) - 32
+    occupied = (status & 0x01) == 1
+    battery_voltage = BATTERY_V_BROWAN[battery & 0x0F]
+    temperature_c = TEMPERATURE_C[temp_raw & 0x7F]
 
     return {
         "occupied": occupied,
@@ -48,11 +58,7 @@ def unpack_config_response(b: bytes) -> dict:
     if len(b) != 16:
         raise ValueError(f"Unexpected payload length for config response: {len(b)} bytes, expected 16")
 
-    reporting_interval = int.from_bytes(b[1:3], byteorder="little")
-    occupied_interval = int.from_bytes(b[3:5], byteorder="little")
-    free_time = b[6]
-    trigger_count = int.from_bytes(b[8:10], byteorder="little")
-    pir_config = int.from_bytes(b[11:15], byteorder="little")
+    reporting_interval, occupied_interval, free_time, trigger_count, pir_config = _CONFIG.unpack_from(b, 1)
 
     return {
         "reporting_interval": reporting_interval,
@@ -1,17 +1,38 @@
-# browan_tbwl100.py - Version: 0.2.0 - 2025-07-23 14:15 UTC
+# browan_tbwl100.py - Version: 0.2.4 - 2026-10-15 10:00 UTC
 # Changelog:
+# - Config response read with one prebuilt struct.Struct unpack_from
+# - Battery voltage and temperatures read from unpackers/tables.py lookup tables
+# - Works on the caller's bytes/memoryview directly (no tobytes() copy per uplink)
+# - Status flags come from a 256-entry table built at import (one lookup per frame)
 # - Uses canonical pattern (like TBHH100)
 # - Accepts bytes or memoryview safely
 # - Handles FPort 106 (status) and 204 (config)
 # - Validates payload lengths and returns unpacked values
 
+import struct
+
+from unpackers.tables import BATTERY_V_BROWAN, TEMPERATURE_C
+
+# Config response from offset 1 (all LE): keep-alive interval, temperature
+# delta, (skip), humidity delta, (skip), detection interval
+_CONFIG = struct.Struct("<HBxBxH")
+
+# Decoded status-byte flags for every possible byte value; merged (copied)
+# into each result, never returned directly
+_STATUS_FLAGS = tuple(
+    {
+        "leak_detected": bool(s & 0x01),
+        "leak_interrupt": bool(s & 0x10),
+        "temperature_changed": bool(s & 0x20),
+        "humidity_changed": bool(s & 0x40),
+    }
+    for s in range(256)
+)
+
 def unpack(payload, fport: int) -> dict:
-    if isinstance(payload, memoryview):
-        b = payload.tobytes()
-    elif isinstance(payload, bytes):
-        b = payload
-    else:
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
+    b = payload
 
     if fport == 106:
         return unpack_status(b)
@@ -31,23 +52,15 @@ def unpack_status(b: bytes) -> dict:
     humidity_raw = b[3]
     env_temp = b[4]
 
-    leak_detected = bool(status & 0x01)
-    leak_interrupt = bool(status & 0x10)
-    temperature_changed = bool(status & 0x20)
-    humidity_changed = bool(status & 0x40)
-
-    battery_voltage = (25 + (battery & 0x0F)) / 10
-    pcb_temperature = (pcb_temp & 0x7F) - 32
-    environment_temperature = (env_temp & 0x7F) - 32
+    battery_voltage = BATTERY_V_BROWAN[battery & 0x0F]
+    pcb_temperature = TEMPERATURE_C[pcb_temp & 0x7F]
+    environment_temperature = TEMPERATURE_C[env_temp & 0x7F]
 
     humidity = humidity_raw & 0x7F
     humidity_error = humidity_raw == 0x7F
 
     return {
-        "leak_detected": leak_detected,
-        "leak_interrupt": leak_interrupt,
-        "temperature_changed": temperature_changed,
-        "humidity_changed": humidity_changed,
+        **_STATUS_FLAGS[status],
         "battery_voltage": battery_voltage,
         "pcb_temperature": pcb_temperature,
         "humidity": humidity,
@@ -60,10 +73,7 @@ def unpack_config_response(b: bytes) -> dict:
     if len(b) != 10:
         raise ValueError(f"Unexpected payload length for config response: {len(b)} bytes, expected 10")
 
-    keep_alive_interval = int.from_bytes(b[1:3], byteorder="little")
-    temp_delta = b[3]
-    humidity_delta = b[5]
-    detection_interval = int.from_bytes(b[7:9], byteorder="little")
+    keep_alive_interval, temp_delta, humidity_delta, detection_interval = _CONFIG.unpack_from(b, 1)
 
     return {
         "keep_alive_interval": keep_alive_interval,
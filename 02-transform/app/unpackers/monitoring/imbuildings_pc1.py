@@ -1,15 +1,23 @@
 # imbuildings_pc1.py
-# Version: 0.3.0 - 2025-07-22 13:58 UTC
+# Version: 0.3.2 - 2026-10-15 10:00 UTC
 # Changelog:
+# - Works on the caller's bytes/memoryview directly (no bytes() copy per uplink)
+# - Fields after the DevEUI read with one prebuilt struct.Struct unpack
 # - Fully rewritten unpacker for Type 0x02 / Variant 0x06 based on official IMBUILDINGS spec
 # - Strict 23-byte payload check
 # - Fields: DevEUI, battery voltage, counters, status flags, payload counter
 
+import struct
+
+# From byte 10: status, battery mV, counter A, counter B, status flags,
+# total counter A, total counter B, payload counter (all big-endian)
+_BODY = struct.Struct(">BHHHBHHB")
+
 def unpack(payload, fport):
-    if not isinstance(payload, (bytes, memoryview)):
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
 
-    b = bytes(payload)
+    b = payload
     if len(b) != 23:
         raise ValueError(f"Expected 23-byte payload for Type 2 Variant 6, got {len(b)} bytes")
 
@@ -18,17 +26,10 @@ def unpack(payload, fport):
 
     # Start unpacking
     deveui = b[2:10].hex()
-    status = b[10]
-    battery_voltage_mv = int.from_bytes(b[11:13], 'big')  # mV
+    (status, battery_voltage_mv, counter_a, counter_b, status_flags,
+     total_counter_a, total_counter_b, payload_counter) = _BODY.unpack_from(b, 10)
     battery_voltage_v = round(battery_voltage_mv / 1000, 3)
 
-    counter_a = int.from_bytes(b[13:15], 'big')
-    counter_b = int.from_bytes(b[15:17], 'big')
-    status_flags = b[17]
-    total_counter_a = int.from_bytes(b[18:20], 'big')
-    total_counter_b = int.from_bytes(b[20:22], 'big')
-    payload_counter = b[22]
-
     return {
         "dev_eui": deveui,
         "status_byte": status,
@@ -1,9 +1,36 @@
-# merryiot_ms10.py – Version: 0.2.1 – 2025-07-23 14:25 UTC
+# merryiot_ms10.py – Version: 0.2.6 – 2026-10-15 10:00 UTC
 # Changelog:
+# - Per-frame flags computed with a comparison instead of a bool() call (still JSON true/false)
+# - Battery voltage read from the unpackers/tables.py lookup table
+# - Works on the caller's bytes/memoryview directly (no tobytes() copy per uplink)
+# - Status flags come from a 256-entry table built at import (one lookup per frame)
+# - Status and config frames read with prebuilt struct.Struct layouts
 # - Corrected temperature parsing using little-endian signed int16
 # - Canonical unpacker pattern: accepts bytes or memoryview
 # - Field-by-field decoding of MS10 motion sensor status frame
 
+import struct
+
+from unpackers.tables import BATTERY_V_MERRYIOT
+
+# Status: status, battery, temp (int16 LE, 0.1 °C), RH, time (uint16 LE),
+# event count as uint16 LE low part + high byte (24-bit LE total)
+_STATUS = struct.Struct("<BBhBHHB")
+# Config response from offset 1: keepalive, (skip), occupied interval, (skip),
+# free time, (skip), trigger count, (skip), PIR config, (skip), tamper byte
+_CONFIG = struct.Struct("<HxHxBxHxIxB")
+
+# Decoded status-byte flags for every possible byte value; merged (copied)
+# into each result, never returned directly
+_STATUS_FLAGS = tuple(
+    {
+        "occupied": bool(s & 0x01),
+        "button_pressed": bool(s & 0x02),
+        "tamper_detected": bool(s & 0x04),
+    }
+    for s in range(256)
+)
+
 def unpack(payload, fport: int) -> dict:
     if fport == 122:
         return unpack_status(payload)
@@ -13,35 +40,22 @@ def unpack(payload, fport: int) -> dict:
         raise ValueError(f"Unexpected fport: {fport}")
 
 def unpack_status(payload):
-    if isinstance(payload, memoryview):
-        b = payload.tobytes()
-    elif isinstance(payload, bytes):
-        b = payload
-    else:
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
+    b = payload
 
     if len(b) != 10:
         raise ValueError(f"Unexpected payload length for status: {len(b)} bytes, expected 10")
 
-    status = b[0]
-    battery = b[1]
-    temp_raw = int.from_bytes(b[2:4], 'little', signed=True)
-    humidity = b[4]
-    time = int.from_bytes(b[5:7], 'little')
-    count = int.from_bytes(b[7:10], 'little')  # 3-byte event count
+    status, battery, temp_raw, humidity, time, count_lo, count_hi = _STATUS.unpack(b)
+    count = count_lo | count_hi << 16  # 3-byte event count
 
-    occupied = bool(status & 0x01)
-    button_pressed = bool(status & 0x02)
-    tamper_detected = bool(status & 0x04)
-
-    battery_voltage = (21 + (battery & 0x0F)) / 10
+    battery_voltage = BATTERY_V_MERRYIOT[battery & 0x0F]
     temp_c = temp_raw / 10.0
     humidity_pct = humidity & 0x7F
 
     return {
-        "occupied": occupied,
-        "button_pressed": button_pressed,
-        "tamper_detected": tamper_detected,
+        **_STATUS_FLAGS[status],
         "battery_voltage": battery_voltage,
         "temperature": temp_c,
         "humidity": humidity_pct,
@@ -50,22 +64,15 @@ def unpack_status(payload):
     }
 
 def unpack_config_response(payload):
-    if isinstance(payload, memoryview):
-        b = payload.tobytes()
-    elif isinstance(payload, bytes):
-        b = payload
-    else:
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
+    b = payload
 
     if len(b) != 18:
         raise ValueError(f"Unexpected payload length for config response: {len(b)} bytes, expected 18")
 
-    keepalive_interval = int.from_bytes(b[1:3], 'little')
-    occupied_interval = int.from_bytes(b[4:6], 'little')
-    free_time = b[7]
-    trigger_count = int.from_bytes(b[9:11], 'little')
-    pir_config = int.from_bytes(b[12:16], 'little')
-    tamper_enabled = bool(b[17] & 0x01)
+    keepalive_interval, occupied_interval, free_time, trigger_count, pir_config, tamper = _CONFIG.unpack_from(b, 1)
+    tamper_enabled = (tamper & 0x01) == 1
 
     return {
         "keepalive_interval": keepalive_interval,
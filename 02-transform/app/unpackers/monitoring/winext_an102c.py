@@ -1,20 +1,26 @@
-# winext_an102c.py – Version: 0.3.0 – 2025-07-23 14:45 UTC
+# winext_an102c.py – Version: 0.4.1 – 2026-10-15 10:00 UTC
 # Changelog:
+# - Works on the caller's bytes/memoryview directly (no tobytes() copy per uplink)
+# - Frame types dispatched through _FRAME_DECODERS instead of an if/elif chain
+# - Alarm/fault/self-test flags precomputed for all 256 byte values at import
+# - Signed big-endian temperature read with a prebuilt struct.Struct
 # - Fully rewritten to align with official spec (uplinks on FPort 46)
 # - Supports heartbeat (0x01), self-test (0x02), and alarm (0x03) frames
 # - Accepts memoryview or bytes input
 # - All values decoded according to Winext 2019.7.23 manual
 
+import struct
+
+# Temperature: signed int16 big-endian, 0.01 °C
+_TEMPERATURE = struct.Struct(">h")
+
 def unpack(payload, fport: int) -> dict:
     if fport != 46:
         raise ValueError(f"Unexpected port {fport}, expected 46")
 
-    if isinstance(payload, memoryview):
-        b = payload.tobytes()
-    elif isinstance(payload, bytes):
-        b = payload
-    else:
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
+    b = payload
 
     if len(b) < 2:
         raise ValueError(f"Payload too short: {len(b)} bytes")
@@ -25,49 +31,59 @@ def unpack(payload, fport: int) -> dict:
     if sensor_type != 0x01:
         raise ValueError(f"Unexpected sensor type: 0x{sensor_type:02X}, expected 0x01")
 
-    if frame_type == 0x01:  # Heartbeat
-        if len(b) != 11:
-            raise ValueError(f"Unexpected heartbeat length: {len(b)} bytes, expected 11")
-        return {
-            "frame_type": "heartbeat",
-            "smoke_concentration": b[2] / 100,
-            "temperature": int.from_bytes(b[3:5], 'big', signed=True) / 100,
-            "humidity": b[5],
-            "battery_percent": b[6],
-            **parse_alarm_flags(b[7]),
-            **parse_fault_flags(b[8]),
-            "pollution": b[9],
-            "voltage": b[10] / 10
-        }
-
-    elif frame_type == 0x02:  # Self-test
-        if len(b) != 3:
-            raise ValueError(f"Unexpected self-test length: {len(b)} bytes, expected 3")
-        return {
-            "frame_type": "self_test",
-            **parse_self_test_flags(b[2])
-        }
-
-    elif frame_type == 0x03:  # Alarm
-        if len(b) != 10:
-            raise ValueError(f"Unexpected alarm length: {len(b)} bytes, expected 10")
-        return {
-            "frame_type": "alarm",
-            **parse_alarm_flags(b[2]),
-            **parse_fault_flags(b[3]),
-            "smoke_concentration": b[4] / 100,
-            "temperature": int.from_bytes(b[5:7], 'big', signed=True) / 100,
-            "humidity": b[7],
-            "battery_percent": b[8],
-            "pollution": b[9]
-        }
-
-    else:
+    decode = _FRAME_DECODERS.get(frame_type)
+    if decode is None:
         raise ValueError(f"Unknown frame type: 0x{frame_type:02X}")
+    return decode(b)
+
+
+def _decode_heartbeat(b) -> dict:
+    if len(b) != 11:
+        raise ValueError(f"Unexpected heartbeat length: {len(b)} bytes, expected 11")
+    return {
+        "frame_type": "heartbeat",
+        "smoke_concentration": b[2] / 100,
+        "temperature": _TEMPERATURE.unpack_from(b, 3)[0] / 100,
+        "humidity": b[5],
+        "battery_percent": b[6],
+        **parse_alarm_flags(b[7]),
+        **parse_fault_flags(b[8]),
+        "pollution": b[9],
+        "voltage": b[10] / 10
+    }
+
+def _decode_self_test(b) -> dict:
+    if len(b) != 3:
+        raise ValueError(f"Unexpected self-test length: {len(b)} bytes, expected 3")
+    return {
+        "frame_type": "self_test",
+        **parse_self_test_flags(b[2])
+    }
+
+def _decode_alarm(b) -> dict:
+    if len(b) != 10:
+        raise ValueError(f"Unexpected alarm length: {len(b)} bytes, expected 10")
+    return {
+        "frame_type": "alarm",
+        **parse_alarm_flags(b[2]),
+        **parse_fault_flags(b[3]),
+        "smoke_concentration": b[4] / 100,
+        "temperature": _TEMPERATURE.unpack_from(b, 5)[0] / 100,
+        "humidity": b[7],
+        "battery_percent": b[8],
+        "pollution": b[9]
+    }
+
+# Frame type byte (b[1]) -> decoder
+_FRAME_DECODERS = {
+    0x01: _decode_heartbeat,
+    0x02: _decode_self_test,
+    0x03: _decode_alarm,
+}
 
 
 # 🧩 Helper: Alarm bitflags
-def parse_alarm_flags(byte):
+def _alarm_flags(byte):
     return {
         "alarm_smoke": bool(byte & 0x01),
         "alarm_temperature": bool(byte & 0x02),
@@ -75,16 +91,31 @@ def parse_alarm_flags(byte):
     }
 
 # 🧩 Helper: Fault bitflags
-def parse_fault_flags(byte):
+def _fault_flags(byte):
     return {
         "fault_smoke_sensor": bool(byte & 0x01),
         "fault_temp_rh_sensor": bool(byte & 0x02)
     }
 
 # 🧩 Helper: Self-test bitflags
-def parse_self_test_flags(byte):
+def _self_test_flags(byte):
     return {
         "self_test_active": bool(byte & 0x80),
         "self_test_smoke_sensor_fail": bool(byte & 0x01),
         "self_test_temp_rh_sensor_fail": bool(byte & 0x02)
-    }
\ No newline at end of file
+    }
+
+# Every flag byte decoded once at import. parse_*_flags() return the shared
+# table entry; unpack() only merges them with ** into a new dict.
+_ALARM_FLAGS = tuple(_alarm_flags(i) for i in range(256))
+_FAULT_FLAGS = tuple(_fault_flags(i) for i in range(256))
+_SELF_TEST_FLAGS = tuple(_self_test_flags(i) for i in range(256))
+
+def parse_alarm_flags(byte):
+    return _ALARM_FLAGS[byte]
+
+def parse_fault_flags(byte):
+    return _FAULT_FLAGS[byte]
+
+def parse_self_test_flags(byte):
+    return _SELF_TEST_FLAGS[byte]
@@ -1,5 +1,6 @@
-# netvox_r716.py – Version: 0.2.0 – 2025-07-23 15:20 UTC
+# netvox_r716.py – Version: 0.2.1 – 2026-10-15 10:00 UTC
 # Changelog:
+# - Works on the caller's bytes/memoryview directly (no tobytes() copy per uplink)
 # - Updated to canonical unpacker format (payload, fport)
 # - Accepts both bytes and memoryview inputs
 # - Handles known button press frame (0x00 * 11)
@@ -10,12 +11,9 @@ def unpack(payload, fport: int) -> dict:
         raise ValueError(f"Unexpected fport: {fport}, expected 6")
 
     # Accept memoryview or bytes
-    if isinstance(payload, memoryview):
-        b = payload.tobytes()
-    elif isinstance(payload, bytes):
-        b = payload
-    else:
-        raise TypeError(f"Expected bytes or memoryview, got {type(payload)}")
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got {type(payload)}")
+    b = payload
 
     # Known payload from documentation and field testing: 11 zero bytes
     if b == b'\x00' * 11:
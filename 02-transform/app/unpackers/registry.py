@@ -1,6 +1,7 @@
 # unpackers/registry.py
-# Version: 0.3.0 - 2025-07-21 05:50 UTC
+# Version: 0.3.1 - 2026-10-15 10:00 UTC
 # Changelog:
+# - get_unpacker memoizes resolved functions by raw name
 # - Synced with device_types table
 # - Added unpackers: merryiot_ms10, browan_tbms100, browan_tbdw100, imbuildings_pc1
 
@@ -40,5 +41,15 @@ UNPACKER_REGISTRY = {
     "milesight_am103": unpack_milesight_am103, 
 }
 
+# Resolved unpackers keyed by the raw device_types.unpacker value,
+# so repeated lookups skip the strip() and the registry lookup
+_UNPACKER_CACHE = {}
+
 def get_unpacker(name: str):
-    return UNPACKER_REGISTRY.get(name.strip())
\ No newline at end of file
+    try:
+        return _UNPACKER_CACHE[name]
+    except KeyError:
+        fn = UNPACKER_REGISTRY.get(name.strip())
+        if fn is not None:
+            _UNPACKER_CACHE[name] = fn
+        return fn
@@ -0,0 +1,20 @@
+# unpackers/tables.py
+# Version: 0.1.0 - 2026-10-15 10:00 UTC
+# Changelog:
+# - Battery voltage and PCB/environment temperature lookup tables shared by
+#   the Browan and MerryIoT unpackers
+
+"""
+Precomputed decodings for single-byte fields whose input domain is tiny.
+Indexing a tuple replaces the add/divide per frame and hands back the same
+float objects every time instead of allocating new ones.
+"""
+
+# Battery nibble (byte & 0x0F) → volts, Browan: (25 + n) / 10
+BATTERY_V_BROWAN = tuple((25 + n) / 10 for n in range(16))
+
+# Battery nibble (byte & 0x0F) → volts, MerryIoT: (21 + n) / 10
+BATTERY_V_MERRYIOT = tuple((21 + n) / 10 for n in range(16))
+
+# 7-bit temperature (byte & 0x7F) → °C, offset -32
+TEMPERATURE_C = tuple(t - 32 for t in range(128))
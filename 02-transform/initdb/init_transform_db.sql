@@ -2,7 +2,7 @@
 -- Version: 1.1.0 - 2025-08-11 07:30 UTC
 -- FINAL VERSION - VERIFIED 100% MATCH WITH LIVE DATABASE
 -- Verified against live database schema query results 2025-08-11
--- Tables: 7 | Indexes: 12 | Foreign Keys: 16
+-- Tables: 7 | Indexes: 22 | Foreign Keys: 16
 
 -- ─── EXTENSIONS ─────────────────────────────────────────────
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
@@ -168,10 +168,55 @@ ON transform.ingest_uplinks (deveui);
 CREATE INDEX IF NOT EXISTS idx_transform_ingest_timestamp 
 ON transform.ingest_uplinks (timestamp);
 
+-- Lookup by ingest ID (verify_and_replay missing-uplink diff)
+CREATE INDEX IF NOT EXISTS idx_ingest_uplinks_ingest_uplink_id 
+ON transform.ingest_uplinks (ingest_uplink_id);
+
 -- Enrichment logs index
 CREATE INDEX IF NOT EXISTS idx_enrichment_logs_uplink_uuid 
 ON transform.enrichment_logs (uplink_uuid);
 
+-- Latest log per uplink (DISTINCT ON uplink_uuid ORDER BY created_at DESC)
+CREATE INDEX IF NOT EXISTS idx_enrichment_logs_uplink_time 
+ON transform.enrichment_logs (uplink_uuid, created_at DESC);
+
+-- Case-insensitive DevEUI lookups (routers/devices.py: upper(deveui) = :deveui)
+CREATE INDEX IF NOT EXISTS idx_devctx_deveui_upper 
+ON transform.device_context (upper(deveui));
+
+-- Active-set partial indexes: the routers filter archived_at IS NULL on
+-- every listing, so these stay small as archived rows accumulate
+CREATE INDEX IF NOT EXISTS idx_devctx_active 
+ON transform.device_context (deveui) WHERE archived_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_gateways_active 
+ON transform.gateways (gw_eui) WHERE archived_at IS NULL;
+
+-- Live locations by type, name order (GET /devices/locations/hierarchy)
+CREATE INDEX IF NOT EXISTS idx_locations_live_type_name 
+ON transform.locations (type, name) WHERE archived_at IS NULL;
+
+-- Location hierarchy walks (GET /locations/tree recursive step, archive
+-- descendants CTE): parent_id lookups for live rows are index-only scans
+CREATE INDEX IF NOT EXISTS idx_locations_live_parent 
+ON transform.locations (parent_id) INCLUDE (location_id, name, type, archived_at) 
+WHERE archived_at IS NULL;
+
+-- Latest uplink per device (GET /devices last_uplink: DISTINCT ON deveui
+-- ORDER BY timestamp DESC, and max(timestamp) WHERE deveui = ...)
+CREATE INDEX IF NOT EXISTS idx_pu_deveui_ts 
+ON transform.processed_uplinks (deveui, timestamp DESC);
+
+-- Gateway status sweep (gateways_06_mark_offline): each UPDATE only
+-- looks at gateways in one status, ordered by last_seen_at.
+-- btree indexes NULLs, so "last_seen_at IS NULL OR < cutoff" can use a
+-- BitmapOr over the online index.
+CREATE INDEX IF NOT EXISTS idx_gw_stale 
+ON transform.gateways (last_seen_at) WHERE status = 'online';
+
+CREATE INDEX IF NOT EXISTS idx_gw_fresh 
+ON transform.gateways (last_seen_at) WHERE status = 'offline';
+
 -- Note: Primary key indexes are created automatically:
 -- - device_context_pkey ON device_context (deveui)
 -- - device_types_pkey ON device_types (device_type_id) 